@@ -0,0 +1,64 @@
+"""Report how active task deadlines cluster in time.
+
+Run from the project root against the bot's database:
+
+    python -m benchmarks.deadline_histogram --hours 48 --bucket 5
+
+Quick deadline buttons put many tasks on the same minutes (today 21:00,
+tomorrow 10:00 and 18:00); the peaks show what the overdue sweep and the
+reminders at each horizon before them have to absorb at once. Times are
+Moscow time. Buckets with at least BURST_PREWARM_MIN_TASKS deadlines are
+marked; with --bucket 1 those are the minutes the scheduler prewarms.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+from database.engine import sweep_session, dispose_engines
+from database.task_repo import get_deadline_histogram
+from bot.time_utils import INPUT_TIMEZONE, UTC_TIMEZONE
+from config import BURST_PREWARM_MIN_TASKS
+
+BAR_WIDTH = 50
+
+
+def local_time(moment: datetime) -> str:
+    return moment.replace(tzinfo=UTC_TIMEZONE).astimezone(INPUT_TIMEZONE).strftime("%d.%m %H:%M")
+
+
+async def report(hours: int, bucket_minutes: int, top: int) -> None:
+    now = datetime.utcnow()
+    async with sweep_session() as session:
+        buckets = await get_deadline_histogram(
+            session, now, now + timedelta(hours=hours), timedelta(minutes=bucket_minutes)
+        )
+    await dispose_engines()
+
+    if not buckets:
+        print(f"No active deadlines in the next {hours} hours")
+        return
+
+    total = sum(count for _, count in buckets)
+    peak = max(count for _, count in buckets)
+    print(f"{total} active deadlines in the next {hours} hours, {bucket_minutes} min buckets")
+    for start, count in buckets:
+        bar = "█" * max(1, round(BAR_WIDTH * count / peak))
+        mark = "  ← burst" if count >= BURST_PREWARM_MIN_TASKS else ""
+        print(f"{local_time(start)}  {count:>7}  {bar}{mark}")
+
+    print(f"\nTop {top} buckets:")
+    for start, count in sorted(buckets, key=lambda bucket: bucket[1], reverse=True)[:top]:
+        print(f"{local_time(start)}  {count:>7}  {100 * count / total:5.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--hours", type=int, default=48, help="how far ahead to look")
+    parser.add_argument("--bucket", type=int, default=5, help="bucket size in minutes")
+    parser.add_argument("--top", type=int, default=10, help="largest buckets to list")
+    args = parser.parse_args()
+    asyncio.run(report(args.hours, args.bucket, args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Measure the cost of rendering screens (text + keyboard) without I/O.
+
+Run from the project root:
+
+    python -m benchmarks.render --number 20000
+
+Each screen is rendered the way handlers do it and, for comparison, with
+the memoized/prebuilt layers bypassed (their __wrapped__ builders).
+"""
+import argparse
+import timeit
+from datetime import datetime
+
+from database.user_cache import UserSnapshot
+from bot import keyboards, texts
+
+USER = UserSnapshot(
+    id=1, telegram_id=1000, username="bench", level=7, xp=120, hp=85, max_hp=130,
+    total_completed=42, total_failed=5, max_level_reached=7,
+    created_at=datetime(2025, 1, 1), active_task_count=3
+)
+
+
+def uncached(func):
+    return getattr(func, "__wrapped__", func)
+
+
+def screens(cached: bool) -> dict:
+    """Render callables per screen, with or without the caches."""
+    kb = (lambda f: f) if cached else uncached
+    u = USER
+    if cached:
+        menu_text = lambda: texts.main_menu_message(u, u.active_task_count)
+        character_text = lambda: texts.character_screen_message(u, u.active_task_count, "01.02, 18:00")
+        stats_text = lambda: texts.statistics_screen_message(u)
+    else:
+        menu_text = lambda: uncached(texts._main_menu_text)(u.level, u.hp, u.max_hp)
+        character_text = lambda: uncached(texts._character_text)(
+            u.level, u.xp, u.hp, u.max_hp, u.active_task_count, "01.02, 18:00"
+        )
+        stats_text = lambda: uncached(texts._statistics_text)(
+            u.total_completed, u.total_failed, u.max_level_reached, u.created_at
+        )
+    deadline_keyboard = keyboards.deadline_quick_keyboard if cached else uncached(keyboards._deadline_quick_keyboard)
+
+    return {
+        "menu": lambda: (menu_text(), kb(keyboards.main_menu_keyboard)(u.active_task_count)),
+        "character": lambda: (character_text(), kb(keyboards.back_to_menu_keyboard)()),
+        "stats": lambda: (stats_text(), kb(keyboards.back_to_menu_keyboard)()),
+        "difficulty": lambda: (texts.task_create_step2("title"), kb(keyboards.difficulty_keyboard)()),
+        "deadline": lambda: (
+            texts.task_create_step3("title", "hard"),
+            deadline_keyboard() if cached else deadline_keyboard(0)
+        ),
+        "completed": lambda: (texts.task_completed_message(u, 50), kb(keyboards.task_completed_keyboard)()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--number", type=int, default=20000, help="renders per screen")
+    args = parser.parse_args()
+
+    before = screens(cached=False)
+    after = screens(cached=True)
+    print(f"{'screen':<12}{'uncached µs':>14}{'cached µs':>12}{'speedup':>10}")
+    for name in before:
+        cold = timeit.timeit(before[name], number=args.number) / args.number * 1e6
+        after[name]()  # warm the caches
+        warm = timeit.timeit(after[name], number=args.number) / args.number * 1e6
+        print(f"{name:<12}{cold:>14.1f}{warm:>12.1f}{cold / warm:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
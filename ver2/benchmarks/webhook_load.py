@@ -0,0 +1,155 @@
+"""Replay recorded updates against the webhook endpoint and measure throughput.
+
+Run from the project root:
+
+    python -m benchmarks.webhook_load --requests 5000 --concurrency 50
+
+Without --url the webhook app runs in-process on the configured DATABASE_URL
+with a stub Telegram session, so no requests leave the machine. With --url
+(and --secret) the updates are posted to a running bot in webhook mode;
+that bot will call the real Bot API for every update.
+
+Each user replays the updates from --updates (one JSON update per line,
+starting with /start) with fresh update_ids; users are spread over --users
+IDs, so later rounds hit existing users.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import time
+from datetime import datetime
+from aiohttp import ClientSession, web
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage
+from aiogram.types import Message, Chat
+
+from database.engine import init_db, dispose_engines
+from bot.fsm_storage import SQLStorage
+from bot.webhook import WebhookHandler, create_webhook_app, SECRET_HEADER
+from main import build_dispatcher
+
+
+class StubSession(BaseSession):
+    """Bot API session answering every call locally."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls += 1
+        if isinstance(method, SendMessage):
+            return Message(
+                message_id=self.calls,
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=method.text
+            )
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def load_updates(path: str, count: int, users: int):
+    """Generate `count` updates, each user replays the recorded sequence in order."""
+    with open(path, encoding="utf-8") as f:
+        recorded = [json.loads(line) for line in f if line.strip()]
+
+    for update_id in range(1, count + 1):
+        position, template = divmod(update_id - 1, len(recorded))
+        update = copy.deepcopy(recorded[template])
+        update["update_id"] = update_id
+        user_id = 1_000_000 + position % users
+        event = update.get("message") or update["callback_query"]
+        event["from"]["id"] = user_id
+        message = update.get("message") or event.get("message")
+        if message:
+            message["chat"]["id"] = user_id
+        yield update
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def post_all(url: str, secret: str, updates, concurrency: int) -> list[float]:
+    """POST updates with `concurrency` parallel clients, returns latencies."""
+    latencies = []
+    queue = asyncio.Queue()
+    for update in updates:
+        queue.put_nowait(update)
+    headers = {SECRET_HEADER: secret} if secret else {}
+
+    async with ClientSession() as http:
+        async def client():
+            while not queue.empty():
+                update = queue.get_nowait()
+                start = time.perf_counter()
+                async with http.post(url, json=update, headers=headers) as response:
+                    if response.status != 200:
+                        raise RuntimeError(f"Webhook returned {response.status}")
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*[client() for _ in range(concurrency)])
+    return latencies
+
+
+async def run(args) -> None:
+    # Per-update log lines would dominate the measurement
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+    updates = list(load_updates(args.updates, args.requests, args.users))
+
+    handler = None
+    runner = None
+    url = args.url
+    if url is None:
+        await init_db()
+        bot = Bot(token="42:BENCH", session=StubSession())
+        handler = WebhookHandler(build_dispatcher(SQLStorage()), bot, args.secret, args.max_concurrency)
+        runner = web.AppRunner(create_webhook_app(handler, "/webhook"))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", args.port)
+        await site.start()
+        url = f"http://127.0.0.1:{args.port}/webhook"
+
+    start = time.perf_counter()
+    latencies = await post_all(url, args.secret, updates, args.concurrency)
+    posted = time.perf_counter() - start
+    print(f"Posted {len(latencies)} updates in {posted:.2f}s: {len(latencies) / posted:.0f} req/s")
+    print(f"Ack latency p50 {1000 * percentile(latencies, 0.5):.1f} ms, "
+          f"p95 {1000 * percentile(latencies, 0.95):.1f} ms, "
+          f"p99 {1000 * percentile(latencies, 0.99):.1f} ms")
+
+    if handler is not None:
+        await handler.drain()
+        processed = time.perf_counter() - start
+        print(f"Processed {handler.received} updates in {processed:.2f}s: "
+              f"{handler.received / processed:.0f} updates/s, {handler.bot.session.calls} Bot API calls")
+        await runner.cleanup()
+        await handler.dp.storage.close()
+        await dispose_engines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--updates", default="benchmarks/updates.jsonl", help="recorded updates, JSON per line")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50, help="parallel HTTP clients")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--url", help="webhook URL of a running bot, default: in-process app")
+    parser.add_argument("--secret", default="", help="webhook secret token")
+    parser.add_argument("--port", type=int, default=8081, help="port of the in-process app")
+    parser.add_argument("--max-concurrency", type=int, default=100, help="in-process handler concurrency")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Callback data codec and routing for GameTODO Bot.
+
+Callback data is "<version><opcode><argument>", e.g. "1d2s" opens the task
+with ID 100 (base36). Buttons sent before the codec existed carry strings
+like "task:detail:100"; those are still decoded.
+"""
+import inspect
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any, Awaitable, Callable
+from aiogram import Router
+from aiogram.fsm.state import State
+from aiogram.types import CallbackQuery
+
+from database.task_repo import PageCursor
+from bot.texts import error_button_outdated
+
+logger = logging.getLogger(__name__)
+
+CALLBACK_VERSION = "1"
+CALLBACK_DATA_MAX_LEN = 64  # Telegram limit in bytes
+
+BASE36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+class Op(str, Enum):
+    """Button actions, the value is the one-character opcode."""
+    MENU = "m"
+    CHARACTER = "c"
+    STATS = "s"
+    TASK_NEW = "n"
+    TASK_CREATE_CANCEL = "x"
+    TASK_DIFFICULTY = "y"
+    TASK_DEADLINE = "w"
+    TASK_LIST = "l"
+    TASK_LIST_PAGE = "p"
+    TASK_FAILED = "f"
+    TASK_FAILED_PAGE = "q"
+    TASK_DETAIL = "d"
+    TASK_DONE = "k"
+    TASK_DELETE = "r"
+
+
+class CallbackDataError(ValueError):
+    """Callback data that can't be decoded."""
+
+
+def to_base36(value: int) -> str:
+    if value < 0:
+        raise ValueError("negative ID")
+    digits = ""
+    while True:
+        value, digit = divmod(value, 36)
+        digits = BASE36[digit] + digits
+        if value == 0:
+            return digits
+
+
+def from_base36(text: str) -> int:
+    if not text or any(char not in BASE36 for char in text):
+        raise ValueError(f"invalid base36 {text!r}")
+    return int(text, 36)
+
+
+class _IdArg:
+    """Database ID, base36 in compact data."""
+
+    def encode(self, value: int) -> str:
+        return to_base36(value)
+
+    def decode(self, text: str) -> int:
+        return from_base36(text)
+
+    def decode_legacy(self, text: str) -> int:
+        if not text.isdigit():
+            raise ValueError(f"invalid ID {text!r}")
+        return int(text)
+
+
+class _ChoiceArg:
+    """One of a fixed set of values, each with a short code."""
+
+    def __init__(self, codes: dict[str, str]):
+        self.codes = codes
+        self.values = {code: value for value, code in codes.items()}
+
+    def encode(self, value: str) -> str:
+        return self.codes[value]
+
+    def decode(self, text: str) -> str:
+        if text not in self.values:
+            raise ValueError(f"unknown choice {text!r}")
+        return self.values[text]
+
+    def decode_legacy(self, text: str) -> str:
+        if text not in self.codes:
+            raise ValueError(f"unknown choice {text!r}")
+        return text
+
+
+class _CursorArg:
+    """Page cursor: direction, deadline in microseconds and task ID, base36."""
+
+    EPOCH = datetime(1970, 1, 1)
+
+    def encode(self, cursor: PageCursor) -> str:
+        micros = (cursor.deadline - self.EPOCH) // timedelta(microseconds=1)
+        direction = "n" if cursor.forward else "p"
+        return f"{direction}{to_base36(micros)}.{to_base36(cursor.task_id)}"
+
+    def decode(self, text: str) -> PageCursor:
+        direction, micros, dot, task_id = text[:1], *text[1:].partition(".")
+        if direction not in ("n", "p") or not dot:
+            raise ValueError(f"invalid cursor {text!r}")
+        deadline = self.EPOCH + timedelta(microseconds=from_base36(micros))
+        return PageCursor(deadline, from_base36(task_id), forward=direction == "n")
+
+    def decode_legacy(self, text: str) -> PageCursor:
+        raise ValueError("no legacy format")
+
+
+TASK_ID = _IdArg()
+PAGE_CURSOR = _CursorArg()
+DIFFICULTY = _ChoiceArg({"easy": "e", "medium": "m", "hard": "h", "epic": "x"})
+QUICK_DEADLINE = _ChoiceArg({
+    "1h": "1", "3h": "3", "today": "t", "tom_morning": "m", "tom_evening": "e", "custom": "c"
+})
+
+# Argument codec of operations that take one
+ARGS = {
+    Op.TASK_DIFFICULTY: DIFFICULTY,
+    Op.TASK_DEADLINE: QUICK_DEADLINE,
+    Op.TASK_LIST_PAGE: PAGE_CURSOR,
+    Op.TASK_FAILED_PAGE: PAGE_CURSOR,
+    Op.TASK_DETAIL: TASK_ID,
+    Op.TASK_DONE: TASK_ID,
+    Op.TASK_DELETE: TASK_ID,
+}
+
+# Data of buttons sent before the codec: exact strings and "prefix:<arg>"
+LEGACY_EXACT = {
+    "menu": Op.MENU,
+    "screen:character": Op.CHARACTER,
+    "screen:stats": Op.STATS,
+    "task:new": Op.TASK_NEW,
+    "task:create_cancel": Op.TASK_CREATE_CANCEL,
+    "task:list": Op.TASK_LIST,
+    "task:failed": Op.TASK_FAILED,
+}
+LEGACY_PREFIX = {
+    "task:diff": Op.TASK_DIFFICULTY,
+    "task:dl": Op.TASK_DEADLINE,
+    "task:detail": Op.TASK_DETAIL,
+    "task:done": Op.TASK_DONE,
+    "task:del": Op.TASK_DELETE,
+}
+
+_OPS = {op.value: op for op in Op}
+
+
+@dataclass(frozen=True)
+class CallbackAction:
+    """Decoded button press."""
+    op: Op
+    arg: Any = None
+
+
+def encode_callback(op: Op, arg: Any = None) -> str:
+    """Build callback data for a button."""
+    codec = ARGS.get(op)
+    if (codec is None) != (arg is None):
+        raise ValueError(f"{op.name} takes {'no' if codec is None else 'an'} argument")
+    data = CALLBACK_VERSION + op.value + (codec.encode(arg) if codec else "")
+    if len(data.encode()) > CALLBACK_DATA_MAX_LEN:
+        raise ValueError(f"callback data too long: {data!r}")
+    return data
+
+
+def decode_callback(data: str | None) -> CallbackAction:
+    """
+    Parse callback data.
+
+    Raises:
+        CallbackDataError: Unknown version, opcode or invalid argument
+    """
+    if not data:
+        raise CallbackDataError("empty callback data")
+
+    if ":" in data or data in LEGACY_EXACT:
+        return _decode_legacy(data)
+
+    if data[0] != CALLBACK_VERSION:
+        raise CallbackDataError(f"unsupported version in {data!r}")
+    op = _OPS.get(data[1:2])
+    if op is None:
+        raise CallbackDataError(f"unknown opcode in {data!r}")
+    return _decode_arg(op, data[2:], legacy=False)
+
+
+def _decode_legacy(data: str) -> CallbackAction:
+    op = LEGACY_EXACT.get(data)
+    if op is not None:
+        return CallbackAction(op)
+
+    prefix, _, arg = data.rpartition(":")
+    op = LEGACY_PREFIX.get(prefix)
+    if op is None:
+        raise CallbackDataError(f"unknown legacy callback {data!r}")
+    return _decode_arg(op, arg, legacy=True)
+
+
+def _decode_arg(op: Op, text: str, legacy: bool) -> CallbackAction:
+    codec = ARGS.get(op)
+    if codec is None:
+        if text:
+            raise CallbackDataError(f"{op.name} takes no argument")
+        return CallbackAction(op)
+
+    try:
+        arg = codec.decode_legacy(text) if legacy else codec.decode(text)
+    except ValueError as e:
+        raise CallbackDataError(f"{op.name}: {e}") from None
+    return CallbackAction(op, arg)
+
+
+@dataclass(frozen=True)
+class _Route:
+    handler: Callable[..., Awaitable[Any]]
+    kwargs: frozenset[str]  # handler keyword parameters
+    state: State | None
+
+
+_routes: dict[Op, _Route] = {}
+
+
+def callback_handler(op: Op, state: State = None):
+    """
+    Register a button handler in the dispatch table.
+
+    The handler gets the CallbackQuery, the decoded argument for operations
+    that take one, and any of its keyword parameters found in the
+    middleware data (session, user, state, ...). With `state` the button
+    only works in that FSM state.
+    """
+    def register(handler):
+        if op in _routes:
+            raise ValueError(f"{op.name} already has a handler")
+        positional = 2 if op in ARGS else 1
+        params = list(inspect.signature(handler).parameters)[positional:]
+        _routes[op] = _Route(handler, frozenset(params), state)
+        return handler
+    return register
+
+
+def callback_takes(data: str | None, name: str) -> bool:
+    """Whether the handler of this button takes the middleware value `name`."""
+    try:
+        action = decode_callback(data)
+    except CallbackDataError:
+        return False
+    route = _routes.get(action.op)
+    return route is not None and name in route.kwargs
+
+
+callback_router = Router()
+
+
+@callback_router.callback_query()
+async def route_callback(callback: CallbackQuery, **data: Any) -> Any:
+    """Single entry point for buttons: decode once, one dict lookup."""
+    try:
+        action = decode_callback(callback.data)
+    except CallbackDataError as e:
+        logger.warning(f"Rejected callback from {callback.from_user.id}: {e}")
+        await callback.answer(error_button_outdated())
+        return None
+
+    route = _routes.get(action.op)
+    if route is None:
+        logger.warning(f"No handler for {action.op.name}")
+        await callback.answer(error_button_outdated())
+        return None
+
+    if route.state is not None and await data["state"].get_state() != route.state.state:
+        await callback.answer(error_button_outdated())
+        return None
+
+    args = (callback,) if action.op not in ARGS else (callback, action.arg)
+    kwargs = {name: data[name] for name in route.kwargs if name in data}
+    return await route.handler(*args, **kwargs)
@@ -0,0 +1,204 @@
+"""Database-backed FSM storage for GameTODO Bot."""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey, StateType
+
+from database.engine import async_session
+from database.fsm_repo import (
+    get_fsm_record, upsert_fsm_records, delete_fsm_records, purge_expired_fsm_records
+)
+from config import FSM_STATE_TTL_MINUTES, FSM_FLUSH_DELAY_SECONDS, FSM_CACHE_SIZE, FSM_CACHE_FRESH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    updated_at: datetime = field(default_factory=datetime.utcnow)
+    checked_at: float = 0.0  # clock() when the entry last matched the database
+
+
+class SQLStorage(BaseStorage):
+    """
+    FSM storage in the bot database with an in-process cache.
+
+    Writes update the cache immediately and are flushed in batches after
+    `flush_delay`, so set_state + update_data in one handler is a single
+    upsert. Reads are served from the cache for `fresh_for` seconds after
+    the entry was loaded or written, then reloaded from the database, so
+    another process sees a write after at most `flush_delay + fresh_for`.
+    Entries with unflushed writes are always served from the cache. Flows
+    not touched for `ttl` are treated as abandoned.
+    """
+
+    def __init__(
+        self,
+        session_factory=async_session,
+        ttl: timedelta = timedelta(minutes=FSM_STATE_TTL_MINUTES),
+        flush_delay: float = FSM_FLUSH_DELAY_SECONDS,
+        cache_size: int = FSM_CACHE_SIZE,
+        fresh_for: float = FSM_CACHE_FRESH_SECONDS,
+        clock=time.monotonic
+    ):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.flush_delay = flush_delay
+        self.cache_size = cache_size
+        self.fresh_for = fresh_for
+        self.clock = clock
+        self._cache: OrderedDict[str, _Entry] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._flushing: set[str] = set()
+        self._flush_task: asyncio.Task | None = None
+        self._flush_lock = asyncio.Lock()
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        parts = [key.bot_id, key.chat_id, key.user_id, key.thread_id or "", key.destiny]
+        return ":".join(str(part) for part in parts)
+
+    async def _load(self, key: StorageKey) -> tuple[str, _Entry]:
+        name = self._key(key)
+        expired_before = datetime.utcnow() - self.ttl
+
+        entry = self._cache.get(name)
+        if entry is not None and (
+            name in self._dirty or name in self._flushing
+            or (entry.updated_at >= expired_before and self.clock() < entry.checked_at + self.fresh_for)
+        ):
+            self._cache.move_to_end(name)
+            return name, entry
+
+        started = self.clock()
+        async with self.session_factory() as session:
+            record = await get_fsm_record(session, name, expired_before)
+        current = self._cache.get(name)
+        if current is not None and (
+            name in self._dirty or name in self._flushing or current.checked_at > started
+        ):
+            # Written or reloaded while this record was loading, that copy is newer
+            return name, current
+
+        if record is None:
+            entry = _Entry(checked_at=self.clock())
+        else:
+            state, data, updated_at = record
+            entry = _Entry(state, json.loads(data), updated_at, checked_at=self.clock())
+        self._cache[name] = entry
+        self._cache.move_to_end(name)
+        self._evict()
+        return name, entry
+
+    def _evict(self) -> None:
+        """Drop least recently used clean entries over the size cap."""
+        for name in list(self._cache):
+            if len(self._cache) <= self.cache_size:
+                break
+            if name not in self._dirty and name not in self._flushing:
+                del self._cache[name]
+
+    def _mark_dirty(self, name: str, entry: _Entry) -> None:
+        entry.updated_at = datetime.utcnow()
+        entry.checked_at = self.clock()
+        self._dirty.add(name)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        # Keep going while writes arrive during a flush or a flush failed
+        while True:
+            await asyncio.sleep(self.flush_delay)
+            try:
+                await self.flush()
+            except Exception:
+                pass  # logged in flush, retried after the delay
+            if not self._dirty:
+                return
+
+    async def flush(self) -> None:
+        """Write pending changes in one transaction."""
+        async with self._flush_lock:
+            names, self._dirty = self._dirty, set()
+            upserts = []
+            deletes = []
+            for name in names:
+                entry = self._cache.get(name)
+                if entry is None or (entry.state is None and not entry.data):
+                    deletes.append(name)
+                else:
+                    upserts.append((name, entry.state, json.dumps(entry.data), entry.updated_at))
+
+            if not names:
+                return
+            # Until committed the cache holds the only copy of these writes
+            self._flushing = names
+            try:
+                async with self.session_factory() as session:
+                    await upsert_fsm_records(session, upserts)
+                    await delete_fsm_records(session, deletes)
+                    await session.commit()
+            except BaseException as e:
+                if not isinstance(e, asyncio.CancelledError):
+                    logger.error(f"Failed to flush {len(names)} FSM records: {e}")
+                self._dirty |= names
+                raise
+            finally:
+                self._flushing = set()
+
+            checked_at = self.clock()
+            for name in names:
+                entry = self._cache.get(name)
+                if entry is not None:
+                    entry.checked_at = checked_at
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        name, entry = await self._load(key)
+        entry.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(name, entry)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        _, entry = await self._load(key)
+        return entry.state
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        name, entry = await self._load(key)
+        entry.data = data.copy()
+        self._mark_dirty(name, entry)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, entry = await self._load(key)
+        return entry.data.copy()
+
+    async def purge_expired(self) -> None:
+        """
+        Delete abandoned flows.
+
+        This function is called by the scheduler every
+        FSM_PURGE_INTERVAL_MINUTES.
+        """
+        expired_before = datetime.utcnow() - self.ttl
+        for name, entry in list(self._cache.items()):
+            if entry.updated_at < expired_before and name not in self._dirty and name not in self._flushing:
+                del self._cache[name]
+
+        async with self.session_factory() as session:
+            purged = await purge_expired_fsm_records(session, expired_before)
+        if purged:
+            logger.info(f"Purged {purged} abandoned FSM records")
+
+    async def close(self) -> None:
+        """Flush pending changes."""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        self._flush_task = None
+        await self.flush()
@@ -1,8 +1,9 @@
 """Handlers package for GameTODO Bot."""
 from aiogram import Router
+from bot.callbacks import callback_router
+from bot.handlers import menu, task_list  # register button handlers
 from bot.handlers.start import start_router
-from bot.handlers.menu import menu_router
 from bot.handlers.task_create import task_create_router
-from bot.handlers.task_list import task_list_router
+from bot.handlers.settings import settings_router
 
-__all__ = ["start_router", "menu_router", "task_create_router", "task_list_router"]
+__all__ = ["start_router", "task_create_router", "settings_router", "callback_router"]
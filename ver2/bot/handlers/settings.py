@@ -0,0 +1,71 @@
+"""Settings command handlers for GameTODO Bot."""
+from aiogram import Router
+from aiogram.types import Message
+from aiogram.filters import Command, CommandObject
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.user_cache import UserSnapshot
+from database.user_repo import set_digest_threshold, set_reminder_horizons
+from database.task_repo import reschedule_reminders
+from bot.logic.reminders import user_horizons, parse_horizons, serialize_horizons
+from bot.texts import (
+    digest_settings_message, digest_settings_invalid, reminder_settings_message, reminder_settings_invalid
+)
+from config import DIGEST_THRESHOLD
+
+settings_router = Router()
+
+# Largest accepted digest threshold
+DIGEST_THRESHOLD_MAX = 100
+
+
+@settings_router.message(Command("digest"))
+async def cmd_digest(message: Message, command: CommandObject, session: AsyncSession, user: UserSnapshot):
+    """Show or change when sweep notifications are grouped into a digest."""
+    arg = (command.args or "").strip().lower()
+    
+    if not arg:
+        await message.answer(digest_settings_message(user.digest_threshold, DIGEST_THRESHOLD))
+        return
+    
+    if arg == "off":
+        threshold = 0
+    elif arg == "default":
+        threshold = None
+    elif arg.isdigit() and int(arg) <= DIGEST_THRESHOLD_MAX:
+        threshold = int(arg)
+    else:
+        await message.answer(digest_settings_invalid())
+        return
+    
+    await set_digest_threshold(session, user.id, threshold)
+    await session.commit()
+    await message.answer(digest_settings_message(threshold, DIGEST_THRESHOLD))
+
+
+@settings_router.message(Command("remind"))
+async def cmd_remind(message: Message, command: CommandObject, session: AsyncSession, user: UserSnapshot):
+    """Show or change how long before a deadline reminders are sent."""
+    arg = (command.args or "").strip().lower()
+    
+    if not arg:
+        await message.answer(reminder_settings_message(
+            user_horizons(user.reminder_horizons), user.reminder_horizons is None
+        ))
+        return
+    
+    if arg == "off":
+        value = ""
+    elif arg == "default":
+        value = None
+    else:
+        horizons = parse_horizons(arg)
+        if horizons is None:
+            await message.answer(reminder_settings_invalid())
+            return
+        value = serialize_horizons(horizons)
+    
+    # Active tasks follow the new setting from their next reminder on
+    await set_reminder_horizons(session, user.id, value)
+    await reschedule_reminders(session, user.id, user_horizons(value))
+    await session.commit()
+    await message.answer(reminder_settings_message(user_horizons(value), value is None))
@@ -1,13 +1,13 @@
 """Task creation handlers for GameTODO Bot."""
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
-from database.engine import async_session
-from database.user_repo import get_user_by_telegram_id
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.user_cache import UserSnapshot
 from database.task_repo import create_task, TITLE_MAX_LEN
 from database.models import TaskDifficulty
 from bot.texts import (
@@ -20,8 +20,11 @@ from bot.keyboards import (
     task_created_keyboard
 )
 from bot.safe_edit import safe_edit_text
+from bot.logic.deadline_timer import deadline_timer
+from bot.logic.reminders import user_horizons
 from bot.deadline_parser import parse_deadline, is_future, get_now_local
 from bot.time_utils import get_now_utc
+from bot.callbacks import Op, callback_handler
 
 # Timezone for calculations
 INPUT_TIMEZONE = ZoneInfo("Europe/Moscow")
@@ -36,7 +39,7 @@ class NewTaskStates(StatesGroup):
     deadline = State()
 
 
-@task_create_router.callback_query(F.data == "task:new")
+@callback_handler(Op.TASK_NEW)
 async def task_new(callback: CallbackQuery, state: FSMContext):
     """Start task creation process."""
     await state.set_state(NewTaskStates.title)
@@ -48,14 +51,14 @@ async def task_new(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@task_create_router.callback_query(F.data == "task:create_cancel")
-async def task_create_cancel(callback: CallbackQuery, state: FSMContext):
+@callback_handler(Op.TASK_CREATE_CANCEL)
+async def task_create_cancel(callback: CallbackQuery, state: FSMContext, session: AsyncSession, user: UserSnapshot):
     """Cancel task creation."""
     await state.clear()
     
     # Show main menu
     from bot.handlers.menu import callback_menu
-    await callback_menu(callback)
+    await callback_menu(callback, session, user)
 
 
 @task_create_router.message(NewTaskStates.title)
@@ -86,15 +89,9 @@ async def task_create_title(message: Message, state: FSMContext):
     await message.answer(text, reply_markup=difficulty_keyboard())
 
 
-@task_create_router.callback_query(F.data.startswith("task:diff:"), NewTaskStates.difficulty)
-async def task_create_difficulty(callback: CallbackQuery, state: FSMContext):
+@callback_handler(Op.TASK_DIFFICULTY, NewTaskStates.difficulty)
+async def task_create_difficulty(callback: CallbackQuery, diff: str, state: FSMContext):
     """Handle difficulty selection."""
-    diff = callback.data.split(":")[-1]
-    
-    if diff not in ["easy", "medium", "hard", "epic"]:
-        await callback.answer("Выбери сложность из кнопок ниже.", show_alert=True)
-        return
-    
     # Store difficulty in state
     await state.update_data(difficulty=diff)
     await state.set_state(NewTaskStates.deadline)
@@ -112,11 +109,9 @@ async def task_create_difficulty(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@task_create_router.callback_query(F.data.startswith("task:dl:"), NewTaskStates.deadline)
-async def task_create_deadline_quick(callback: CallbackQuery, state: FSMContext):
+@callback_handler(Op.TASK_DEADLINE, NewTaskStates.deadline)
+async def task_create_deadline_quick(callback: CallbackQuery, dl_code: str, state: FSMContext, session: AsyncSession, user: UserSnapshot):
     """Handle quick deadline selection."""
-    dl_code = callback.data.split(":")[-1]
-    
     now_local = get_now_local()
     
     if dl_code == "1h":
@@ -136,7 +131,8 @@ async def task_create_deadline_quick(callback: CallbackQuery, state: FSMContext)
         deadline = (now_local + timedelta(days=1)).replace(hour=18, minute=0, second=0, microsecond=0)
     elif dl_code == "custom":
         # Request custom input
-        await callback.message.edit_text(
+        await safe_edit_text(
+            callback.message,
             "Введи дату и время дедлайна:\n\n" + 
             "• завтра 18:00\n" +
             "• 25.01 15:30\n" +
@@ -153,11 +149,11 @@ async def task_create_deadline_quick(callback: CallbackQuery, state: FSMContext)
     deadline_utc = deadline.astimezone(ZoneInfo("UTC"))
     
     # Create the task
-    await _finish_create(callback, state, deadline_utc)
+    await _finish_create(callback, state, session, user, deadline_utc)
 
 
 @task_create_router.message(NewTaskStates.deadline)
-async def task_create_deadline_text(message: Message, state: FSMContext):
+async def task_create_deadline_text(message: Message, state: FSMContext, session: AsyncSession, user: UserSnapshot):
     """Handle custom deadline input."""
     text = message.text.strip()
     
@@ -174,26 +170,21 @@ async def task_create_deadline_text(message: Message, state: FSMContext):
         return
     
     # Create the task
-    await _finish_create_text(message, state, deadline)
+    await _finish_create_text(message, state, session, user, deadline)
 
 
-async def _finish_create(callback: CallbackQuery, state: FSMContext, deadline: datetime):
+async def _finish_create(callback: CallbackQuery, state: FSMContext, session: AsyncSession, user: UserSnapshot, deadline: datetime):
     """Finish task creation from callback."""
     data = await state.get_data()
     title = data.get("title", "")
     difficulty = data.get("difficulty", "easy")
     
-    telegram_id = callback.from_user.id
+    # Create task
+    diff_enum = TaskDifficulty(difficulty)
+    task = await create_task(session, user.id, title, diff_enum, deadline, user_horizons(user.reminder_horizons))
+    await session.commit()
     
-    async with async_session() as session:
-        user = await get_user_by_telegram_id(session, telegram_id)
-        if not user:
-            await callback.answer("Пользователь не найден. Отправь /start")
-            return
-        
-        # Create task
-        diff_enum = TaskDifficulty(difficulty)
-        task = await create_task(session, user.id, title, diff_enum, deadline)
+    deadline_timer.schedule(task.id, task.deadline)
     
     # Clear state
     await state.clear()
@@ -207,23 +198,18 @@ async def _finish_create(callback: CallbackQuery, state: FSMContext, deadline: d
     await callback.answer()
 
 
-async def _finish_create_text(message: Message, state: FSMContext, deadline: datetime):
+async def _finish_create_text(message: Message, state: FSMContext, session: AsyncSession, user: UserSnapshot, deadline: datetime):
     """Finish task creation from text message."""
     data = await state.get_data()
     title = data.get("title", "")
     difficulty = data.get("difficulty", "easy")
     
-    telegram_id = message.from_user.id
-    
-    async with async_session() as session:
-        user = await get_user_by_telegram_id(session, telegram_id)
-        if not user:
-            await message.answer("Пользователь не найден. Отправь /start")
-            return
-        
-        # Create task
-        diff_enum = TaskDifficulty(difficulty)
-        task = await create_task(session, user.id, title, diff_enum, deadline)
+    # Create task
+    diff_enum = TaskDifficulty(difficulty)
+    task = await create_task(session, user.id, title, diff_enum, deadline, user_horizons(user.reminder_horizons))
+    await session.commit()
+    
+    deadline_timer.schedule(task.id, task.deadline)
     
     # Clear state
     await state.clear()
@@ -1,14 +1,14 @@
 """Task list handlers for GameTODO Bot."""
 import logging
-from aiogram import Router, F
+from dataclasses import replace
 from aiogram.types import CallbackQuery
 from aiogram.exceptions import TelegramBadRequest
 
-from database.engine import async_session
-from database.user_repo import get_user_by_telegram_id, update_user_stats
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.user_cache import UserSnapshot
 from database.task_repo import (
-    get_active_tasks, get_failed_tasks, get_task_by_id,
-    complete_task, delete_task, count_active_tasks
+    get_active_tasks_page, get_failed_tasks_page, count_failed_tasks,
+    get_task_by_id, complete_task_with_reward, delete_task, PageCursor
 )
 from database.models import TaskStatus
 from bot.texts import (
@@ -23,27 +23,29 @@ from bot.keyboards import (
     level_up_keyboard
 )
 from bot.safe_edit import safe_edit_text
+from bot.logic.deadline_timer import deadline_timer
 from bot.time_utils import format_remaining, get_now_utc
-from config import DIFFICULTY_XP, xp_required_for_level
+from bot.callbacks import Op, callback_handler
 
 logger = logging.getLogger(__name__)
-task_list_router = Router()
 
 
-@task_list_router.callback_query(F.data == "task:list")
-async def task_list(callback: CallbackQuery):
+@callback_handler(Op.TASK_LIST)
+async def task_list(callback: CallbackQuery, session: AsyncSession, user: UserSnapshot):
     """Show list of active tasks."""
-    telegram_id = callback.from_user.id
-    
-    async with async_session() as session:
-        user = await get_user_by_telegram_id(session, telegram_id)
-        if not user:
-            await callback.answer("Пользователь не найден. Отправь /start")
-            return
-        
-        tasks = await get_active_tasks(session, user.id)
+    await _show_task_list(callback, session, user)
+
+
+@callback_handler(Op.TASK_LIST_PAGE)
+async def task_list_page(callback: CallbackQuery, cursor: PageCursor, session: AsyncSession, user: UserSnapshot):
+    """Show another page of active tasks."""
+    await _show_task_list(callback, session, user, cursor)
+
+
+async def _show_task_list(callback: CallbackQuery, session: AsyncSession, user: UserSnapshot, cursor: PageCursor = None):
+    page = await get_active_tasks_page(session, user.id, cursor)
     
-    if not tasks:
+    if not page.tasks:
         # E7: No active tasks
         await safe_edit_text(
             callback.message,
@@ -51,28 +53,22 @@ async def task_list(callback: CallbackQuery):
             reply_markup=back_to_menu_keyboard()
         )
     else:
+        # A single page holds them all, otherwise use the user's counter
+        paged = page.has_prev or page.has_next
+        count = user.active_task_count if paged else len(page.tasks)
         await safe_edit_text(
             callback.message,
-            task_list_header(len(tasks)),
-            reply_markup=task_list_keyboard(tasks)
+            task_list_header(count),
+            reply_markup=task_list_keyboard(page)
         )
     
     await callback.answer()
 
 
-@task_list_router.callback_query(F.data.startswith("task:detail:"))
-async def task_detail(callback: CallbackQuery):
+@callback_handler(Op.TASK_DETAIL)
+async def task_detail(callback: CallbackQuery, task_id: int, session: AsyncSession, user: UserSnapshot):
     """Show task details."""
-    task_id = int(callback.data.split(":")[-1])
-    telegram_id = callback.from_user.id
-    
-    async with async_session() as session:
-        user = await get_user_by_telegram_id(session, telegram_id)
-        if not user:
-            await callback.answer("Пользователь не найден. Отправь /start")
-            return
-        
-        task = await get_task_by_id(session, task_id, user.id)
+    task = await get_task_by_id(session, task_id, user.id)
     
     # E6: Task not found
     if not task:
@@ -88,79 +84,35 @@ async def task_detail(callback: CallbackQuery):
     await callback.answer()
 
 
-@task_list_router.callback_query(F.data.startswith("task:done:"))
-async def task_done(callback: CallbackQuery):
+@callback_handler(Op.TASK_DONE)
+async def task_done(callback: CallbackQuery, task_id: int, session: AsyncSession, user: UserSnapshot):
     """Mark task as completed."""
-    task_id = int(callback.data.split(":")[-1])
-    telegram_id = callback.from_user.id
+    # Complete the task and add XP in one transaction
+    completion = await complete_task_with_reward(session, task_id, user.id)
     
-    async with async_session() as session:
-        user = await get_user_by_telegram_id(session, telegram_id)
-        if not user:
-            await callback.answer("Пользователь не найден. Отправь /start")
-            return
-        
+    if not completion:
+        # Only reached on a miss, load the task to explain why
         task = await get_task_by_id(session, task_id, user.id)
         
-        # E6: Task not found
-        if not task:
-            await callback.answer(error_task_not_found(), show_alert=True)
-            return
-        
         # E5: Task already completed or failed
-        if task.status == TaskStatus.COMPLETED:
+        if task and task.status == TaskStatus.COMPLETED:
             await callback.answer(task_already_completed(), show_alert=True)
-            return
-        
-        if task.status == TaskStatus.FAILED:
+        elif task and task.status == TaskStatus.FAILED:
             await callback.answer("Эта задача уже просрочена. XP не начисляется.", show_alert=True)
-            return
-        
-        # Complete the task
-        completed_task = await complete_task(session, task_id, user.id)
-        if not completed_task:
+        else:
+            # E6: Task not found
             await callback.answer(error_task_not_found(), show_alert=True)
-            return
-        
-        # Calculate XP
-        diff = task.difficulty.value if hasattr(task.difficulty, 'value') else task.difficulty
-        xp_gained = DIFFICULTY_XP.get(diff, 10)
-        
-        # Add XP and handle level up
-        new_xp = user.xp + xp_gained
-        new_level = user.level
-        new_max_hp = user.max_hp
-        level_ups = []
-        
-        while True:
-            xp_needed = xp_required_for_level(new_level)
-            if new_xp >= xp_needed:
-                # Level up!
-                new_xp -= xp_needed
-                new_level += 1
-                new_max_hp += 10
-                level_ups.append(new_level)
-            else:
-                break
-        
-        # Update user stats
-        new_total_completed = user.total_completed + 1
-        new_max_level = max(user.max_level_reached, new_level)
-        
-        await update_user_stats(
-            session, user,
-            level=new_level,
-            xp=new_xp,
-            hp=user.hp,  # HP stays the same
-            max_hp=new_max_hp,
-            total_completed=new_total_completed,
-            max_level_reached=new_max_level
-        )
+        return
+    
+    await session.commit()
+    deadline_timer.cancel(task_id)
+    user = completion.user
+    level_ups = completion.level_ups
     
     # Show completion message
     await safe_edit_text(
         callback.message,
-        task_completed_message(user, xp_gained),
+        task_completed_message(user, completion.xp_gained),
         reply_markup=task_completed_keyboard()
     )
     await callback.answer()
@@ -176,53 +128,53 @@ async def task_done(callback: CallbackQuery):
             logger.warning(f"Failed to send level up notification: {e}")
 
 
-@task_list_router.callback_query(F.data.startswith("task:del:"))
-async def task_delete(callback: CallbackQuery):
+@callback_handler(Op.TASK_DELETE)
+async def task_delete(callback: CallbackQuery, task_id: int, session: AsyncSession, user: UserSnapshot):
     """Delete a task."""
-    task_id = int(callback.data.split(":")[-1])
-    telegram_id = callback.from_user.id
-    
-    async with async_session() as session:
-        user = await get_user_by_telegram_id(session, telegram_id)
-        if not user:
-            await callback.answer("Пользователь не найден. Отправь /start")
-            return
-        
-        # Delete the task
-        deleted = await delete_task(session, task_id, user.id)
+    previous = await delete_task(session, task_id, user.id)
     
-    if not deleted:
+    if previous is None:
         await callback.answer(error_task_not_found(), show_alert=True)
         return
     
-    # Show task list
-    await task_list(callback)
+    await session.commit()
+    deadline_timer.cancel(task_id)
+    
+    # Show task list in the same session; only an active task was counted
+    if previous == TaskStatus.ACTIVE:
+        user = replace(user, active_task_count=user.active_task_count - 1)
+    await task_list(callback, session, user)
 
 
-@task_list_router.callback_query(F.data == "task:failed")
-async def task_failed_list(callback: CallbackQuery):
+@callback_handler(Op.TASK_FAILED)
+async def task_failed_list(callback: CallbackQuery, session: AsyncSession, user: UserSnapshot):
     """Show list of failed (overdue) tasks."""
-    telegram_id = callback.from_user.id
-    
-    async with async_session() as session:
-        user = await get_user_by_telegram_id(session, telegram_id)
-        if not user:
-            await callback.answer("Пользователь не найден. Отправь /start")
-            return
-        
-        tasks = await get_failed_tasks(session, user.id)
+    await _show_failed_list(callback, session, user)
+
+
+@callback_handler(Op.TASK_FAILED_PAGE)
+async def task_failed_page(callback: CallbackQuery, cursor: PageCursor, session: AsyncSession, user: UserSnapshot):
+    """Show another page of failed tasks."""
+    await _show_failed_list(callback, session, user, cursor)
+
+
+async def _show_failed_list(callback: CallbackQuery, session: AsyncSession, user: UserSnapshot, cursor: PageCursor = None):
+    page = await get_failed_tasks_page(session, user.id, cursor)
     
-    if not tasks:
+    if not page.tasks:
         await safe_edit_text(
             callback.message,
             failed_tasks_empty(),
             reply_markup=back_to_tasks_keyboard()
         )
     else:
+        # Count only when the list doesn't fit on one page
+        paged = page.has_prev or page.has_next
+        count = await count_failed_tasks(session, user.id) if paged else len(page.tasks)
         await safe_edit_text(
             callback.message,
-            failed_tasks_header(len(tasks)),
-            reply_markup=failed_tasks_keyboard(tasks)
+            failed_tasks_header(count),
+            reply_markup=failed_tasks_keyboard(page)
         )
     
     await callback.answer()
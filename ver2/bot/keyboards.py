@@ -1,55 +1,81 @@
-"""Keyboards for GameTODO Bot."""
+"""Keyboards for GameTODO Bot.
+
+Constant keyboards are built once at import and parameterized ones are
+memoized, so the returned markups are shared and must not be modified.
+"""
+import time
+from functools import lru_cache, wraps
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from database.models import Task, TaskStatus
+from database.task_repo import TaskPage
+from bot.callbacks import Op, encode_callback
+
+# Bound of each memoized keyboard cache
+KEYBOARD_CACHE_SIZE = 1024
+
+
+def prebuilt(build):
+    """Build a constant keyboard once; the builder stays in __wrapped__."""
+    markup = build()
+
+    @wraps(build)
+    def keyboard() -> InlineKeyboardMarkup:
+        return markup
+    return keyboard
 
 
 # 8.1 Welcome keyboard
+@prebuilt
 def welcome_keyboard() -> InlineKeyboardMarkup:
     """Welcome screen keyboard."""
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="➕ Создать первую задачу", callback_data="task:new"))
+    builder.add(InlineKeyboardButton(text="➕ Создать первую задачу", callback_data=encode_callback(Op.TASK_NEW)))
     return builder.as_markup()
 
 
 # 8.2 Main menu keyboard
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def main_menu_keyboard(active_tasks_count: int = 0) -> InlineKeyboardMarkup:
     """Main menu keyboard."""
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="➕ Новая задача", callback_data="task:new"))
+    builder.add(InlineKeyboardButton(text="➕ Новая задача", callback_data=encode_callback(Op.TASK_NEW)))
     tasks_text = f"📋 Мои задачи ({active_tasks_count})" if active_tasks_count > 0 else "📋 Мои задачи"
-    builder.add(InlineKeyboardButton(text=tasks_text, callback_data="task:list"))
-    builder.add(InlineKeyboardButton(text="👤 Персонаж", callback_data="screen:character"))
-    builder.add(InlineKeyboardButton(text="📊 Статистика", callback_data="screen:stats"))
+    builder.add(InlineKeyboardButton(text=tasks_text, callback_data=encode_callback(Op.TASK_LIST)))
+    builder.add(InlineKeyboardButton(text="👤 Персонаж", callback_data=encode_callback(Op.CHARACTER)))
+    builder.add(InlineKeyboardButton(text="📊 Статистика", callback_data=encode_callback(Op.STATS)))
     builder.adjust(2, 2)
     return builder.as_markup()
 
 
 # Back to menu button
+@prebuilt
 def back_to_menu_keyboard() -> InlineKeyboardMarkup:
     """Keyboard with back to menu button."""
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="🏠 Меню", callback_data="menu"))
+    builder.add(InlineKeyboardButton(text="🏠 Меню", callback_data=encode_callback(Op.MENU)))
     return builder.as_markup()
 
 
 # Cancel button
+@prebuilt
 def cancel_keyboard() -> InlineKeyboardMarkup:
     """Keyboard with cancel button."""
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="❌ Отмена", callback_data="task:create_cancel"))
+    builder.add(InlineKeyboardButton(text="❌ Отмена", callback_data=encode_callback(Op.TASK_CREATE_CANCEL)))
     return builder.as_markup()
 
 
 # 8.8 Difficulty selection keyboard
+@prebuilt
 def difficulty_keyboard() -> InlineKeyboardMarkup:
     """Difficulty selection keyboard."""
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="🟢 Лёгкая (+10 XP)", callback_data="task:diff:easy"))
-    builder.add(InlineKeyboardButton(text="🟡 Средняя (+25 XP)", callback_data="task:diff:medium"))
-    builder.add(InlineKeyboardButton(text="🔴 Сложная (+50 XP)", callback_data="task:diff:hard"))
-    builder.add(InlineKeyboardButton(text="🟣 Эпическая (+100 XP)", callback_data="task:diff:epic"))
-    builder.add(InlineKeyboardButton(text="❌ Отмена", callback_data="task:create_cancel"))
+    builder.add(InlineKeyboardButton(text="🟢 Лёгкая (+10 XP)", callback_data=encode_callback(Op.TASK_DIFFICULTY, "easy")))
+    builder.add(InlineKeyboardButton(text="🟡 Средняя (+25 XP)", callback_data=encode_callback(Op.TASK_DIFFICULTY, "medium")))
+    builder.add(InlineKeyboardButton(text="🔴 Сложная (+50 XP)", callback_data=encode_callback(Op.TASK_DIFFICULTY, "hard")))
+    builder.add(InlineKeyboardButton(text="🟣 Эпическая (+100 XP)", callback_data=encode_callback(Op.TASK_DIFFICULTY, "epic")))
+    builder.add(InlineKeyboardButton(text="❌ Отмена", callback_data=encode_callback(Op.TASK_CREATE_CANCEL)))
     builder.adjust(2, 2, 1)
     return builder.as_markup()
 
@@ -57,69 +83,88 @@ def difficulty_keyboard() -> InlineKeyboardMarkup:
 # 8.9 Quick deadline selection keyboard
 def deadline_quick_keyboard() -> InlineKeyboardMarkup:
     """Quick deadline selection keyboard."""
-    from datetime import datetime, timedelta
+    # Button labels show clock times, rebuild at most once a minute
+    return _deadline_quick_keyboard(int(time.time() // 60))
+
+
+@lru_cache(maxsize=1)
+def _deadline_quick_keyboard(minute: int) -> InlineKeyboardMarkup:
     from bot.time_utils import get_quick_deadline_times
     
     times = get_quick_deadline_times()
     
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="Через 1ч", callback_data="task:dl:1h"))
-    builder.add(InlineKeyboardButton(text="Через 3ч", callback_data="task:dl:3h"))
-    builder.add(InlineKeyboardButton(text=times["today"], callback_data="task:dl:today"))
-    builder.add(InlineKeyboardButton(text=times["tomorrow_morning"], callback_data="task:dl:tom_morning"))
-    builder.add(InlineKeyboardButton(text=times["tomorrow_evening"], callback_data="task:dl:tom_evening"))
-    builder.add(InlineKeyboardButton(text="✏️ Ввести", callback_data="task:dl:custom"))
-    builder.add(InlineKeyboardButton(text="❌ Отмена", callback_data="task:create_cancel"))
+    builder.add(InlineKeyboardButton(text="Через 1ч", callback_data=encode_callback(Op.TASK_DEADLINE, "1h")))
+    builder.add(InlineKeyboardButton(text="Через 3ч", callback_data=encode_callback(Op.TASK_DEADLINE, "3h")))
+    builder.add(InlineKeyboardButton(text=times["today"], callback_data=encode_callback(Op.TASK_DEADLINE, "today")))
+    builder.add(InlineKeyboardButton(text=times["tomorrow_morning"], callback_data=encode_callback(Op.TASK_DEADLINE, "tom_morning")))
+    builder.add(InlineKeyboardButton(text=times["tomorrow_evening"], callback_data=encode_callback(Op.TASK_DEADLINE, "tom_evening")))
+    builder.add(InlineKeyboardButton(text="✏️ Ввести", callback_data=encode_callback(Op.TASK_DEADLINE, "custom")))
+    builder.add(InlineKeyboardButton(text="❌ Отмена", callback_data=encode_callback(Op.TASK_CREATE_CANCEL)))
     builder.adjust(2, 2, 2, 1)
     return builder.as_markup()
 
 
 # Task created keyboard
+@prebuilt
 def task_created_keyboard() -> InlineKeyboardMarkup:
     """Keyboard after task creation."""
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="➕ Ещё задачу", callback_data="task:new"))
-    builder.add(InlineKeyboardButton(text="🏠 Меню", callback_data="menu"))
+    builder.add(InlineKeyboardButton(text="➕ Ещё задачу", callback_data=encode_callback(Op.TASK_NEW)))
+    builder.add(InlineKeyboardButton(text="🏠 Меню", callback_data=encode_callback(Op.MENU)))
     builder.adjust(2)
     return builder.as_markup()
 
 
 # 8.5 Task list keyboard
-def task_list_keyboard(tasks: list[Task]) -> InlineKeyboardMarkup:
-    """Task list keyboard."""
+def task_list_keyboard(page: TaskPage) -> InlineKeyboardMarkup:
+    """Task list keyboard, one page of tasks."""
     from bot.time_utils import format_remaining_short
     
     builder = InlineKeyboardBuilder()
     
-    for task in tasks:
+    # One task per row, then page navigation and buttons
+    for task in page.tasks:
         remaining = format_remaining_short(task.deadline)
         text = f"📌 {task.title} — {remaining}"
-        builder.add(InlineKeyboardButton(text=text, callback_data=f"task:detail:{task.id}"))
+        builder.row(InlineKeyboardButton(text=text, callback_data=encode_callback(Op.TASK_DETAIL, task.id)))
     
-    builder.add(InlineKeyboardButton(text="⛔ Просроченные", callback_data="task:failed"))
-    builder.add(InlineKeyboardButton(text="🏠 Меню", callback_data="menu"))
-    
-    if tasks:
-        builder.adjust(1, 1, 1)  # One task per row, then buttons
-    else:
-        builder.adjust(1)
+    _add_page_buttons(builder, page, Op.TASK_LIST_PAGE)
+    builder.row(InlineKeyboardButton(text="⛔ Просроченные", callback_data=encode_callback(Op.TASK_FAILED)))
+    builder.row(InlineKeyboardButton(text="🏠 Меню", callback_data=encode_callback(Op.MENU)))
     
     return builder.as_markup()
 
 
+def _add_page_buttons(builder: InlineKeyboardBuilder, page: TaskPage, op: Op) -> None:
+    """Add a "previous/next page" row if there are other pages."""
+    buttons = []
+    if page.has_prev:
+        buttons.append(InlineKeyboardButton(text="⬅️ Назад", callback_data=encode_callback(op, page.prev_cursor)))
+    if page.has_next:
+        buttons.append(InlineKeyboardButton(text="Далее ➡️", callback_data=encode_callback(op, page.next_cursor)))
+    if buttons:
+        builder.row(*buttons)
+
+
 # 8.6 Task detail keyboard
 def task_detail_keyboard(task: Task) -> InlineKeyboardMarkup:
     """Task detail keyboard."""
+    return _task_detail_keyboard(task.id, task.status == TaskStatus.ACTIVE)
+
+
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
+def _task_detail_keyboard(task_id: int, active: bool) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     
     # Show "Done" button only for active tasks
-    if task.status == TaskStatus.ACTIVE:
-        builder.add(InlineKeyboardButton(text="✅ Выполнено", callback_data=f"task:done:{task.id}"))
+    if active:
+        builder.add(InlineKeyboardButton(text="✅ Выполнено", callback_data=encode_callback(Op.TASK_DONE, task_id)))
     
-    builder.add(InlineKeyboardButton(text="🗑 Удалить", callback_data=f"task:del:{task.id}"))
-    builder.add(InlineKeyboardButton(text="◀️ К задачам", callback_data="task:list"))
+    builder.add(InlineKeyboardButton(text="🗑 Удалить", callback_data=encode_callback(Op.TASK_DELETE, task_id)))
+    builder.add(InlineKeyboardButton(text="◀️ К задачам", callback_data=encode_callback(Op.TASK_LIST)))
     
-    if task.status == TaskStatus.ACTIVE:
+    if active:
         builder.adjust(2, 1)
     else:
         builder.adjust(1, 1)
@@ -128,25 +173,24 @@ def task_detail_keyboard(task: Task) -> InlineKeyboardMarkup:
 
 
 # Back to tasks keyboard
+@prebuilt
 def back_to_tasks_keyboard() -> InlineKeyboardMarkup:
     """Keyboard with back to tasks button."""
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="◀️ К задачам", callback_data="task:list"))
+    builder.add(InlineKeyboardButton(text="◀️ К задачам", callback_data=encode_callback(Op.TASK_LIST)))
     return builder.as_markup()
 
 
 # Failed tasks list keyboard
-def failed_tasks_keyboard(tasks: list[Task]) -> InlineKeyboardMarkup:
-    """Failed tasks list keyboard."""
+def failed_tasks_keyboard(page: TaskPage) -> InlineKeyboardMarkup:
+    """Failed tasks list keyboard, one page of tasks."""
     builder = InlineKeyboardBuilder()
     
-    for task in tasks:
-        builder.add(InlineKeyboardButton(text=f"❌ {task.title}", callback_data=f"task:detail:{task.id}"))
+    for task in page.tasks:
+        builder.row(InlineKeyboardButton(text=f"❌ {task.title}", callback_data=encode_callback(Op.TASK_DETAIL, task.id)))
     
-    builder.add(InlineKeyboardButton(text="◀️ К задачам", callback_data="task:list"))
-    
-    if tasks:
-        builder.adjust(1)
+    _add_page_buttons(builder, page, Op.TASK_FAILED_PAGE)
+    builder.row(InlineKeyboardButton(text="◀️ К задачам", callback_data=encode_callback(Op.TASK_LIST)))
     
     return builder.as_markup()
 
@@ -155,41 +199,58 @@ def failed_tasks_keyboard(tasks: list[Task]) -> InlineKeyboardMarkup:
 def reminder_keyboard(task_id: int) -> InlineKeyboardMarkup:
     """Reminder notification keyboard."""
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="✅ Выполнено", callback_data=f"task:done:{task_id}"))
-    builder.add(InlineKeyboardButton(text="📋 Открыть", callback_data=f"task:detail:{task_id}"))
+    builder.add(InlineKeyboardButton(text="✅ Выполнено", callback_data=encode_callback(Op.TASK_DONE, task_id)))
+    builder.add(InlineKeyboardButton(text="📋 Открыть", callback_data=encode_callback(Op.TASK_DETAIL, task_id)))
     builder.adjust(2)
     return builder.as_markup()
 
 
+# Reminder digest keyboard
+def reminder_digest_keyboard(tasks: list[Task]) -> InlineKeyboardMarkup:
+    """Reminder digest keyboard: "done" for each task, then the task list."""
+    from config import DIGEST_MAX_ITEMS
+    
+    builder = InlineKeyboardBuilder()
+    for task in tasks[:DIGEST_MAX_ITEMS]:
+        title = task.title if len(task.title) <= 40 else task.title[:39] + "…"
+        builder.row(InlineKeyboardButton(text=f"✅ {title}", callback_data=encode_callback(Op.TASK_DONE, task.id)))
+    builder.row(InlineKeyboardButton(text="📋 Мои задачи", callback_data=encode_callback(Op.TASK_LIST)))
+    return builder.as_markup()
+
+
 # Death notification keyboard
+@prebuilt
 def death_notification_keyboard() -> InlineKeyboardMarkup:
     """Death notification keyboard."""
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="🏠 Меню", callback_data="menu"))
+    builder.add(InlineKeyboardButton(text="🏠 Меню", callback_data=encode_callback(Op.MENU)))
     return builder.as_markup()
 
 
 # Overdue notification keyboard
+@prebuilt
 def overdue_notification_keyboard() -> InlineKeyboardMarkup:
     """Overdue notification keyboard."""
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="🏠 Меню", callback_data="menu"))
+    builder.add(InlineKeyboardButton(text="🏠 Меню", callback_data=encode_callback(Op.MENU)))
     return builder.as_markup()
 
 
 # Task completed keyboard
+@prebuilt
 def task_completed_keyboard() -> InlineKeyboardMarkup:
     """Task completed keyboard."""
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="📋 К задачам", callback_data="task:list"))
-    builder.add(InlineKeyboardButton(text="🏠 Меню", callback_data="menu"))
+    builder.add(InlineKeyboardButton(text="📋 К задачам", callback_data=encode_callback(Op.TASK_LIST)))
+    builder.add(InlineKeyboardButton(text="🏠 Меню", callback_data=encode_callback(Op.MENU)))
     builder.adjust(2)
     return builder.as_markup()
 
 
 # Level up keyboard
+@prebuilt
 def level_up_keyboard() -> InlineKeyboardMarkup:
     """Level up notification keyboard."""
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="🏠 Меню", callback_data="menu"))
+    builder.add(InlineKeyboardButton(text="🏠 Меню", callback_data=encode_callback(Op.MENU)))
     return builder.as_markup()
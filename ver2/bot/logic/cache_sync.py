@@ -0,0 +1,61 @@
+"""Cross-process invalidation of the user cache."""
+import logging
+from datetime import datetime, timedelta
+
+from database.engine import async_session
+from database.user_cache import UserCache, user_cache
+from database.user_repo import get_changed_telegram_ids
+from config import USER_CACHE_SYNC_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class UserCacheSync:
+    """
+    Drops cached users that another process changed.
+
+    Every write to a user row sets users.changed_at. The scheduler role
+    fails tasks and applies damage, other bot replicas handle the same
+    user's taps; their invalidations only reach their own cache. Polling
+    changed_at bounds how long this process shows an old HP or level to
+    USER_CACHE_SYNC_SECONDS plus the commit time of the writer. Each poll
+    looks back `lag` before the previous one, for writes that committed
+    after it and for clock skew between hosts.
+    """
+
+    def __init__(
+        self,
+        session_factory=async_session,
+        cache: UserCache = user_cache,
+        lag: timedelta = timedelta(seconds=USER_CACHE_SYNC_LAG_SECONDS)
+    ):
+        self.session_factory = session_factory
+        self.cache = cache
+        self.lag = lag
+        self._since = datetime.utcnow()
+
+    async def sync(self) -> int:
+        """
+        Invalidate cached users changed since the previous poll.
+
+        This function is called by the scheduler every USER_CACHE_SYNC_SECONDS.
+
+        Returns:
+            Number of changed users found
+        """
+        started = datetime.utcnow()
+        if not len(self.cache):
+            # Entries loaded from now on are at least as new as this poll
+            self._since = started
+            return 0
+
+        async with self.session_factory() as session:
+            telegram_ids = await get_changed_telegram_ids(session, self._since - self.lag)
+        self._since = started
+        for telegram_id in telegram_ids:
+            self.cache.invalidate(telegram_id)
+        return len(telegram_ids)
+
+
+# Shared instance, run by the bot role
+user_cache_sync = UserCacheSync()
@@ -0,0 +1,148 @@
+"""In-process deadline timer for GameTODO Bot."""
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+from zoneinfo import ZoneInfo
+
+from database.engine import sweep_session
+from database.task_repo import get_upcoming_deadlines
+from config import DEADLINE_TIMER_HORIZON_MINUTES
+
+logger = logging.getLogger(__name__)
+
+UTC_TIMEZONE = ZoneInfo("UTC")
+
+
+class DeadlineTimer:
+    """
+    Min-heap of upcoming active deadlines.
+
+    Tasks are failed at their exact deadline instead of waiting for the next
+    sweep. Only deadlines within the horizon are kept in memory; the
+    reconciliation sweep reloads the heap and catches anything missed.
+    Cancelled tasks are removed lazily: the heap entry stays until it is
+    popped and is skipped if it no longer matches `_deadlines`.
+    """
+
+    def __init__(self, horizon: timedelta):
+        self.horizon = horizon
+        self._heap: list[tuple[datetime, int]] = []
+        self._deadlines: dict[int, datetime] = {}  # task_id -> current deadline
+        self._wakeup = asyncio.Event()
+        self._runner: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, task_id: int, deadline: datetime, now: datetime = None) -> None:
+        """Add or move a task deadline (naive UTC, as stored in DB)."""
+        if deadline.tzinfo is not None:
+            deadline = deadline.astimezone(UTC_TIMEZONE).replace(tzinfo=None)
+        if now is None:
+            now = datetime.utcnow()
+
+        # Far deadlines are picked up by a later reload
+        if deadline > now + self.horizon:
+            self.cancel(task_id)
+            return
+
+        if self._deadlines.get(task_id) == deadline:
+            return
+
+        self._deadlines[task_id] = deadline
+        heapq.heappush(self._heap, (deadline, task_id))
+
+        # Wake the runner if the new deadline is the earliest one
+        if self._heap[0] == (deadline, task_id):
+            self._wakeup.set()
+
+    def cancel(self, task_id: int) -> None:
+        """Forget a task (completed, deleted or failed)."""
+        self._deadlines.pop(task_id, None)
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._compact()
+
+    def pop_due(self, now: datetime = None) -> list[int]:
+        """Pop IDs of all tasks whose deadline is <= now."""
+        if now is None:
+            now = datetime.utcnow()
+
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, task_id = heapq.heappop(self._heap)
+            if self._deadlines.get(task_id) == deadline:
+                del self._deadlines[task_id]
+                due.append(task_id)
+        return due
+
+    def next_deadline(self) -> datetime | None:
+        """Earliest scheduled deadline, dropping stale heap entries."""
+        while self._heap:
+            deadline, task_id = self._heap[0]
+            if self._deadlines.get(task_id) == deadline:
+                return deadline
+            heapq.heappop(self._heap)
+        return None
+
+    def _compact(self) -> None:
+        """Rebuild heap without stale entries."""
+        self._heap = [(deadline, task_id) for task_id, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+
+    async def load(self) -> int:
+        """
+        Load active deadlines within the horizon from the database.
+
+        Returns:
+            Number of tasks currently scheduled
+        """
+        now = datetime.utcnow()
+        async with sweep_session() as session:
+            rows = await get_upcoming_deadlines(session, now + self.horizon)
+
+        for task_id, deadline in rows:
+            self.schedule(task_id, deadline, now)
+
+        logger.info(f"Deadline timer loaded, {len(self)} tasks within {self.horizon}")
+        return len(self)
+
+    def start(self, on_due: Callable[[list[int]], Awaitable[None]]) -> None:
+        """Start the timer loop, `on_due` is called with due task IDs."""
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run(on_due))
+
+    async def stop(self) -> None:
+        """Stop the timer loop."""
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+
+    async def _run(self, on_due: Callable[[list[int]], Awaitable[None]]) -> None:
+        while True:
+            self._wakeup.clear()
+            now = datetime.utcnow()
+
+            due = self.pop_due(now)
+            if due:
+                try:
+                    await on_due(due)
+                except Exception as e:
+                    logger.error(f"Failed to process {len(due)} due tasks: {e}")
+                continue
+
+            next_deadline = self.next_deadline()
+            timeout = None if next_deadline is None else (next_deadline - now).total_seconds()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+# Shared timer instance
+deadline_timer = DeadlineTimer(timedelta(minutes=DEADLINE_TIMER_HORIZON_MINUTES))
@@ -0,0 +1,235 @@
+"""Rate-limited notification dispatcher for GameTODO Bot."""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.exceptions import (
+    TelegramAPIError, TelegramForbiddenError, TelegramNetworkError, TelegramRetryAfter
+)
+
+from config import (
+    NOTIFY_WORKERS, NOTIFY_GLOBAL_RATE, NOTIFY_CHAT_RATE,
+    NOTIFY_QUEUE_SIZE, NOTIFY_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+# Idle per-chat buckets are dropped once there are more than this
+CHAT_BUCKETS_MAX = 10000
+
+
+class Delivery(str, Enum):
+    """Result of a notification delivery."""
+    SENT = "sent"
+    RETRY = "retry"        # transient failure, may be retried later
+    REJECTED = "rejected"  # permanent API error
+    BLOCKED = "blocked"    # user blocked the bot or deleted the account
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+
+    Tokens are reserved in call order and may go negative, so concurrent
+    callers are served FIFO without a lock.
+    """
+
+    def __init__(self, rate: float, capacity: float = None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take a token, returns seconds to wait before it may be used."""
+        self._refill()
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def is_idle(self) -> bool:
+        """Bucket is full, dropping it loses nothing."""
+        self._refill()
+        return self.tokens >= self.capacity
+
+    async def acquire(self) -> None:
+        """Wait until a token is available."""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class Notification:
+    """Queued message with the future resolved on delivery."""
+    chat_id: int
+    text: str
+    reply_markup: InlineKeyboardMarkup | None = None
+    future: asyncio.Future = field(default=None, repr=False)
+    chat_slot: bool = False  # per-chat token already reserved
+
+
+class NotificationDispatcher:
+    """
+    Shared pool of workers sending notifications within Telegram limits.
+
+    A global bucket keeps the bot under ~30 msg/s and a bucket per chat
+    under 1 msg/s. A message to a chat whose bucket is empty reserves its
+    slot and goes back to the queue when the slot comes, so a burst to one
+    chat never holds the workers other chats are waiting for and the
+    chat's messages keep their order. TelegramRetryAfter pauses all
+    workers for the requested time and the message is retried.
+    """
+
+    def __init__(
+        self,
+        workers: int = NOTIFY_WORKERS,
+        global_rate: float = NOTIFY_GLOBAL_RATE,
+        chat_rate: float = NOTIFY_CHAT_RATE,
+        queue_size: int = NOTIFY_QUEUE_SIZE,
+        max_retries: int = NOTIFY_MAX_RETRIES
+    ):
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.max_retries = max_retries
+        self.global_bucket = TokenBucket(global_rate)
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        self._queue: asyncio.Queue[Notification] = asyncio.Queue(maxsize=queue_size)
+        self._workers: list[asyncio.Task] = []
+        self._deferred: set[asyncio.Task] = set()
+        self._resume_at = 0.0
+        self.bot: Bot | None = None
+        self.sent = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self, bot: Bot) -> None:
+        """Start worker pool."""
+        self.bot = bot
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Try to flush the queue, then stop workers."""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping dispatcher with {self.pending} unsent notifications")
+        tasks = self._workers + list(self._deferred)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+
+    async def send(self, chat_id: int, text: str, reply_markup: InlineKeyboardMarkup = None) -> asyncio.Future:
+        """
+        Queue a message, waits if the queue is full.
+
+        Returns:
+            Future resolved to a Delivery status
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(Notification(chat_id, text, reply_markup, future))
+        return future
+
+    async def join(self) -> None:
+        """Wait until all queued messages are processed."""
+        await self._queue.join()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= CHAT_BUCKETS_MAX:
+                self._chat_buckets = {
+                    key: value for key, value in self._chat_buckets.items() if not value.is_idle()
+                }
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, capacity=1)
+        return bucket
+
+    def _defer(self, notification: Notification, delay: float) -> None:
+        """Queue the message again after `delay`, without holding a worker."""
+        task = asyncio.create_task(self._requeue(notification, delay))
+        self._deferred.add(task)
+        task.add_done_callback(self._deferred.discard)
+
+    async def _requeue(self, notification: Notification, delay: float) -> None:
+        # The message stays unfinished for join() until it is back in the queue
+        try:
+            await asyncio.sleep(delay)
+            await self._queue.put(notification)
+        finally:
+            self._queue.task_done()
+
+    async def _wait_flood_control(self) -> None:
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _worker(self) -> None:
+        while True:
+            notification = await self._queue.get()
+            if not notification.chat_slot:
+                delay = self._chat_bucket(notification.chat_id).reserve()
+                if delay > 0:
+                    notification.chat_slot = True
+                    self._defer(notification, delay)
+                    continue
+
+            try:
+                delivery = await self._deliver(notification)
+            except Exception as e:
+                logger.error(f"Failed to send notification to {notification.chat_id}: {e}")
+                delivery = Delivery.RETRY
+            finally:
+                self._queue.task_done()
+
+            if delivery == Delivery.SENT:
+                self.sent += 1
+            else:
+                self.failed += 1
+            if notification.future is not None and not notification.future.done():
+                notification.future.set_result(delivery)
+
+    async def _deliver(self, notification: Notification) -> Delivery:
+        for attempt in range(self.max_retries + 1):
+            await self._wait_flood_control()
+            await self.global_bucket.acquire()
+            try:
+                await self.bot.send_message(
+                    notification.chat_id,
+                    notification.text,
+                    reply_markup=notification.reply_markup
+                )
+                return Delivery.SENT
+            except TelegramRetryAfter as e:
+                logger.warning(f"Flood control, pausing notifications for {e.retry_after}s")
+                self._resume_at = max(self._resume_at, time.monotonic() + e.retry_after)
+            except TelegramNetworkError as e:
+                logger.warning(f"Network error sending to {notification.chat_id}, attempt {attempt + 1}: {e}")
+                await asyncio.sleep(2 ** attempt)
+            except TelegramForbiddenError as e:
+                logger.info(f"Chat {notification.chat_id} is unreachable: {e}")
+                return Delivery.BLOCKED
+            except TelegramAPIError as e:
+                logger.error(f"Failed to send notification to {notification.chat_id}: {e}")
+                return Delivery.REJECTED
+
+        logger.error(f"Giving up on notification to {notification.chat_id} after {self.max_retries} retries")
+        return Delivery.RETRY
+
+
+# Shared dispatcher instance
+notification_dispatcher = NotificationDispatcher()
@@ -1,52 +1,89 @@
 """Notification logic for GameTODO Bot."""
 import logging
+import time
 from datetime import datetime
-from aiogram import Bot
 
-from database.engine import async_session
-from database.task_repo import get_tasks_for_reminder, mark_reminder_sent
-from bot.texts import notification_reminder
-from bot.keyboards import reminder_keyboard
+from database.engine import sweep_session
+from database.task_repo import get_tasks_for_reminder, set_next_reminders
+from bot.texts import notification_reminder, notification_reminder_digest
+from bot.keyboards import reminder_keyboard, reminder_digest_keyboard
+from bot.logic.outbox import SendSchedule, enqueue_notifications, outbox_drainer, wants_digest
+from bot.logic.reminders import user_horizons, advance_reminder
+from config import SWEEP_CHUNK_SIZE
 
 logger = logging.getLogger(__name__)
 
 
-async def check_upcoming_deadlines(bot: Bot) -> None:
+async def check_upcoming_deadlines() -> None:
     """
-    Check for tasks with deadlines within 1 hour and send reminders.
+    Queue reminders of tasks whose next_remind_at has come.
     
-    This function is called by the scheduler every 5 minutes.
+    This function is called by the scheduler every 5 minutes. Tasks are
+    processed in keyset chunks of SWEEP_CHUNK_SIZE, each in its own
+    transaction: reminders are written to the outbox and each task moves
+    on to its next horizon together, so memory stays flat however many
+    are due. A user with several due tasks in a chunk may get them as one
+    digest.
     """
     logger.info("Checking upcoming deadlines for reminders...")
     
     now = datetime.utcnow()
+    schedule = SendSchedule(now=now)
+    after = None
+    chunks = 0
+    total_tasks = 0
+    total_messages = 0
     
-    async with async_session() as session:
-        # Get tasks that need reminders
-        tasks = await get_tasks_for_reminder(session, now)
+    while True:
+        started = time.monotonic()
+        async with sweep_session() as session:
+            tasks = await get_tasks_for_reminder(session, now, after, SWEEP_CHUNK_SIZE)
+            if not tasks:
+                break
+            
+            notifications = _reminder_notifications(tasks, now)
+            await enqueue_notifications(session, notifications, schedule)
+            await set_next_reminders(session, [
+                (task.id, advance_reminder(task.deadline, user_horizons(task.reminder_horizons), now))
+                for task in tasks
+            ])
+            await session.commit()
         
-        if not tasks:
-            logger.info("No tasks need reminders")
-            return
+        outbox_drainer.wake()
+        chunks += 1
+        total_tasks += len(tasks)
+        total_messages += len(notifications)
+        after = (tasks[-1].next_remind_at, tasks[-1].id)
+        logger.info(f"Reminder chunk {chunks}: {len(tasks)} tasks in {1000 * (time.monotonic() - started):.0f} ms")
         
-        logger.info(f"Found {len(tasks)} tasks needing reminders")
-        
-        for task in tasks:
-            try:
-                # Send reminder
-                await bot.send_message(
-                    task.user.telegram_id,
-                    notification_reminder(task),
-                    reply_markup=reminder_keyboard(task.id)
-                )
-                
-                # Mark reminder as sent
-                await mark_reminder_sent(session, task.id)
-                logger.info(f"Sent reminder for task {task.id} to user {task.user.telegram_id}")
-                
-            except Exception as e:
-                logger.error(f"Failed to send reminder for task {task.id}: {e}")
-        
-        await session.commit()
+        if len(tasks) < SWEEP_CHUNK_SIZE:
+            break
+    
+    if not total_tasks:
+        logger.info("No tasks need reminders")
+        return
+    logger.info(f"Queued {total_messages} reminder messages for {total_tasks} tasks in {chunks} chunks")
+
+
+def _reminder_notifications(tasks: list, now: datetime) -> list[tuple]:
+    """One reminder per task, or one digest per user above the threshold."""
+    by_user = {}
+    for task in tasks:
+        by_user.setdefault(task.user_id, []).append(task)
     
-    logger.info(f"Sent {len(tasks)} reminders")
+    notifications = []
+    for user_tasks in by_user.values():
+        first = user_tasks[0]
+        if wants_digest(len(user_tasks), first.digest_threshold):
+            user_tasks.sort(key=lambda task: task.deadline)
+            notifications.append((
+                first.telegram_id,
+                notification_reminder_digest(user_tasks, now),
+                reminder_digest_keyboard(user_tasks)
+            ))
+            continue
+        notifications.extend(
+            (task.telegram_id, notification_reminder(task, now), reminder_keyboard(task.id))
+            for task in user_tasks
+        )
+    return notifications
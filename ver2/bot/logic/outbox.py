@@ -0,0 +1,215 @@
+"""Notification outbox for GameTODO Bot."""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from aiogram.types import InlineKeyboardMarkup
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.engine import sweep_session
+from database.outbox_repo import (
+    add_outbox_messages, claim_outbox_batch, delete_outbox_messages,
+    delete_outbox_messages_for_chats, reschedule_outbox_messages
+)
+from database.user_repo import mark_users_blocked
+from bot.logic.dispatcher import notification_dispatcher, Delivery
+from config import (
+    OUTBOX_BATCH_SIZE, OUTBOX_DRAINERS, OUTBOX_POLL_SECONDS,
+    OUTBOX_LEASE_SECONDS, OUTBOX_MAX_ATTEMPTS, DIGEST_THRESHOLD, NOTIFY_SPREAD_RATE,
+    NOTIFY_SPREAD_MAX_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SendSchedule:
+    """
+    Delivery times for the notifications of one sweep, `rate` per second.
+
+    A burst of N notifications is stretched over N / rate seconds, at most
+    `max_window`; whatever doesn't fit is due at the end of the window and
+    goes out at the dispatcher's full rate. The chunks of a sweep share one
+    schedule, so each continues where the previous one stopped.
+    """
+
+    def __init__(
+        self,
+        rate: float = NOTIFY_SPREAD_RATE,
+        max_window: timedelta = timedelta(seconds=NOTIFY_SPREAD_MAX_SECONDS),
+        now: datetime = None
+    ):
+        self.start = now if now is not None else datetime.utcnow()
+        self.interval = timedelta(seconds=1 / rate) if rate > 0 else timedelta(0)
+        self.max_window = max_window
+        self.scheduled = 0
+
+    def take(self, count: int) -> list[datetime]:
+        """Send times of the next `count` notifications."""
+        times = [
+            self.start + min(self.interval * (self.scheduled + i), self.max_window)
+            for i in range(count)
+        ]
+        self.scheduled += count
+        return times
+
+
+async def enqueue_notifications(
+    session: AsyncSession,
+    notifications: list[tuple[int, str, InlineKeyboardMarkup | None]],
+    schedule: SendSchedule = None
+) -> None:
+    """
+    Write notifications to the outbox in the caller's transaction.
+
+    Args:
+        session: Database session, committed by the caller with the state change
+        notifications: List of (telegram_id, text, keyboard) tuples
+        schedule: Spreads a burst over time, all due now if None
+    """
+    await add_outbox_messages(
+        session,
+        [
+            (
+                telegram_id,
+                text,
+                keyboard.model_dump_json(exclude_none=True) if keyboard is not None else None
+            )
+            for telegram_id, text, keyboard in notifications
+        ],
+        schedule.take(len(notifications)) if schedule is not None else None
+    )
+
+
+def wants_digest(count: int, threshold: int | None) -> bool:
+    """
+    Whether `count` notifications of one sweep go out as a single digest.
+    
+    Args:
+        count: Notifications for the user in this sweep
+        threshold: User's setting, None for DIGEST_THRESHOLD, 0 never
+    """
+    if threshold is None:
+        threshold = DIGEST_THRESHOLD
+    return count > 1 and 0 < threshold <= count
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff between delivery attempts."""
+    return timedelta(seconds=min(10 * 2 ** attempts, 3600))
+
+
+class OutboxDrainer:
+    """
+    Background workers delivering outbox messages in batches.
+
+    Each drainer leases a batch, hands it to the notification dispatcher,
+    then deletes delivered rows and reschedules failed ones. Chats that
+    answer 403 mark their user blocked and lose their pending messages.
+    Sweeps call `wake()` after commit so delivery starts without waiting
+    for the poll.
+    """
+
+    def __init__(
+        self,
+        drainers: int = OUTBOX_DRAINERS,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_seconds: float = OUTBOX_POLL_SECONDS,
+        lease: timedelta = timedelta(seconds=OUTBOX_LEASE_SECONDS),
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+        session_factory=sweep_session,
+        dispatcher=notification_dispatcher
+    ):
+        self.drainers = drainers
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.session_factory = session_factory
+        self.dispatcher = dispatcher
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start drainer loops."""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.drainers)]
+
+    async def stop(self) -> None:
+        """Stop drainer loops, leased messages are retried after the lease."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self) -> None:
+        """New messages were committed."""
+        self._wakeup.set()
+
+    async def drain_once(self) -> int:
+        """
+        Deliver one batch.
+
+        Returns:
+            Number of messages taken from the outbox
+        """
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            rows = await claim_outbox_batch(session, self.batch_size, self.lease, now)
+
+        if not rows:
+            return 0
+
+        deliveries = []
+        for row in rows:
+            keyboard = InlineKeyboardMarkup.model_validate_json(row.reply_markup) if row.reply_markup else None
+            deliveries.append(await self.dispatcher.send(row.chat_id, row.text, keyboard))
+        results = await asyncio.gather(*deliveries)
+
+        done = []
+        retries = []
+        blocked = set()
+        now = datetime.utcnow()
+        for row, delivery in zip(rows, results):
+            attempts = row.attempts + 1
+            if delivery == Delivery.BLOCKED:
+                blocked.add(row.chat_id)
+                done.append(row.id)
+                continue
+            if delivery == Delivery.RETRY and attempts < self.max_attempts:
+                retries.append((row.id, attempts, now + retry_delay(attempts)))
+                continue
+            if delivery != Delivery.SENT:
+                logger.error(f"Dropping outbox message {row.id} to {row.chat_id} after {attempts} attempts")
+            done.append(row.id)
+
+        async with self.session_factory() as session:
+            await delete_outbox_messages(session, done)
+            await reschedule_outbox_messages(session, retries)
+            if blocked:
+                await mark_users_blocked(session, sorted(blocked), now)
+                await delete_outbox_messages_for_chats(session, sorted(blocked))
+            await session.commit()
+
+        logger.info(f"Outbox batch: {len(rows)} messages, {len(retries)} to retry, {len(blocked)} chats blocked")
+        return len(rows)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                taken = await self.drain_once()
+            except Exception as e:
+                logger.error(f"Outbox drain failed: {e}")
+                taken = 0
+
+            # Full batch: there is probably more to send right away
+            if taken >= self.batch_size:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+
+# Shared drainer instance
+outbox_drainer = OutboxDrainer()
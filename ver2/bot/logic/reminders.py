@@ -0,0 +1,86 @@
+"""Reminder schedule: when a task is reminded about before its deadline."""
+import random
+import re
+from datetime import datetime, timedelta
+
+from config import REMINDER_HORIZONS_MINUTES, DEFAULT_REMINDER_HORIZONS_MINUTES, REMINDER_SPREAD_SECONDS
+
+# Reminders of a clustered deadline are spread over this much time before
+# their horizon instead of all falling on the same minute
+REMINDER_SPREAD = timedelta(seconds=REMINDER_SPREAD_SECONDS)
+
+# Horizon argument of /remind: 24h, 3ч, 10m, 1d
+HORIZON_PATTERN = re.compile(r"(\d+)\s*(m|min|м|мин|h|ч|d|д)")
+UNIT_MINUTES = {"m": 1, "min": 1, "м": 1, "мин": 1, "h": 60, "ч": 60, "d": 24 * 60, "д": 24 * 60}
+
+
+def user_horizons(value: str | None) -> tuple[int, ...]:
+    """
+    Reminder horizons of a user, largest first.
+
+    Args:
+        value: users.reminder_horizons, None for the default, "" for none
+    """
+    if value is None:
+        minutes = DEFAULT_REMINDER_HORIZONS_MINUTES
+    else:
+        minutes = [int(part) for part in value.split(",") if part]
+    return tuple(sorted(set(minutes), reverse=True))
+
+
+def serialize_horizons(horizons: tuple[int, ...]) -> str:
+    """Value for users.reminder_horizons."""
+    return ",".join(str(minutes) for minutes in sorted(horizons, reverse=True))
+
+
+def parse_horizons(text: str) -> tuple[int, ...] | None:
+    """
+    Parse /remind arguments like "24h 1h 10m".
+
+    Returns:
+        Horizons in minutes, largest first, or None unless every token is
+        one of REMINDER_HORIZONS_MINUTES
+    """
+    tokens = text.replace(",", " ").split()
+    horizons = set()
+    for token in tokens:
+        match = HORIZON_PATTERN.fullmatch(token)
+        if match is None:
+            return None
+        minutes = int(match.group(1)) * UNIT_MINUTES[match.group(2)]
+        if minutes not in REMINDER_HORIZONS_MINUTES:
+            return None
+        horizons.add(minutes)
+    return tuple(sorted(horizons, reverse=True)) or None
+
+
+def next_reminder_time(deadline: datetime, horizons: tuple[int, ...], now: datetime) -> datetime | None:
+    """
+    Earliest reminder of `deadline` still ahead of `now`.
+
+    Horizons already passed are skipped, so a task created 30 minutes
+    before its deadline gets no "1 hour left" reminder, and a sweep that
+    runs late sends one reminder instead of several. The reminder is moved
+    a random amount of up to REMINDER_SPREAD earlier (never before `now`).
+
+    Returns:
+        Reminder time (naive UTC), or None when no reminder is left
+    """
+    ahead = [deadline - timedelta(minutes=minutes) for minutes in horizons]
+    ahead = [remind_at for remind_at in ahead if remind_at > now]
+    if not ahead:
+        return None
+
+    remind_at = min(ahead)
+    lead = min(REMINDER_SPREAD, remind_at - now)
+    return remind_at - lead * random.random()
+
+
+def advance_reminder(deadline: datetime, horizons: tuple[int, ...], now: datetime) -> datetime | None:
+    """
+    Reminder after the one sent at `now`.
+
+    The sent reminder may have been moved up to REMINDER_SPREAD ahead of
+    its horizon, which therefore doesn't count as still ahead.
+    """
+    return next_reminder_time(deadline, horizons, now + REMINDER_SPREAD)
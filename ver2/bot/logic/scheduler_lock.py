@@ -0,0 +1,143 @@
+"""Single-runner guard for scheduler jobs across bot processes."""
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import uuid
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from functools import wraps
+from typing import Awaitable, Callable
+
+from sqlalchemy import select, func
+
+from database.engine import sweep_engine, sweep_session
+from database.lease_repo import acquire_lease, release_lease
+from config import SCHEDULER_LOCK, SCHEDULER_LEASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def advisory_key(name: str) -> int:
+    """Stable signed 64-bit key of a job name for pg_try_advisory_lock."""
+    digest = hashlib.blake2b(f"gametodo:{name}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class SchedulerLock:
+    """
+    Runs each named job in at most one place at a time.
+
+    Inside the process, a run of a job whose previous run is still in
+    progress is skipped. Across processes (several replicas on one
+    database) the job first takes a PostgreSQL advisory lock on a
+    dedicated connection, which the server drops if the process dies, or a
+    lease row renewed every third of its TTL. A process that doesn't get
+    the lock skips the run, the holder does the work.
+    """
+
+    def __init__(
+        self,
+        mode: str = SCHEDULER_LOCK,
+        lease: timedelta = timedelta(seconds=SCHEDULER_LEASE_SECONDS),
+        engine=sweep_engine,
+        session_factory=sweep_session
+    ):
+        if mode == "auto":
+            mode = "advisory" if engine.dialect.name == "postgresql" else "lease"
+        self.mode = mode
+        self.lease = lease
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._engine = engine
+        self._session_factory = session_factory
+        self._running: set[str] = set()
+        self.skipped = 0
+
+    async def run(self, name: str, job: Callable[..., Awaitable[None]], *args) -> bool:
+        """
+        Run `job(*args)` if no other run of `name` is in progress anywhere.
+
+        Returns:
+            True if the job ran, False if it was skipped
+        """
+        if name in self._running:
+            self.skipped += 1
+            logger.warning(f"Job {name} skipped, previous run still in progress")
+            return False
+
+        self._running.add(name)
+        try:
+            async with self._acquire(name) as acquired:
+                if not acquired:
+                    self.skipped += 1
+                    logger.info(f"Job {name} skipped, running in another process")
+                    return False
+                await job(*args)
+                return True
+        finally:
+            self._running.discard(name)
+
+    def guard(self, name: str, job: Callable[..., Awaitable[None]]) -> Callable[..., Awaitable[None]]:
+        """Wrap a scheduler job so it goes through `run`."""
+        @wraps(job)
+        async def guarded(*args) -> None:
+            await self.run(name, job, *args)
+        return guarded
+
+    def _acquire(self, name: str):
+        return self._advisory(name) if self.mode == "advisory" else self._leased(name)
+
+    @asynccontextmanager
+    async def _advisory(self, name: str):
+        key = advisory_key(name)
+        async with self._engine.connect() as conn:
+            acquired = await conn.scalar(select(func.pg_try_advisory_lock(key)))
+            # The session-level lock outlives the transaction, don't stay idle in it
+            await conn.commit()
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    try:
+                        await conn.scalar(select(func.pg_advisory_unlock(key)))
+                        await conn.commit()
+                    except Exception as e:
+                        # Closing the connection releases the lock
+                        logger.error(f"Failed to unlock job {name}: {e}")
+                        await conn.invalidate()
+
+    @asynccontextmanager
+    async def _leased(self, name: str):
+        async with self._session_factory() as session:
+            acquired = await acquire_lease(session, name, self.holder, self.lease)
+        if not acquired:
+            yield False
+            return
+
+        renewer = asyncio.create_task(self._renew(name))
+        try:
+            yield True
+        finally:
+            renewer.cancel()
+            try:
+                await renewer
+            except asyncio.CancelledError:
+                pass
+            async with self._session_factory() as session:
+                await release_lease(session, name, self.holder)
+
+    async def _renew(self, name: str) -> None:
+        """Extend the lease while the job runs."""
+        while True:
+            await asyncio.sleep(self.lease.total_seconds() / 3)
+            try:
+                async with self._session_factory() as session:
+                    if not await acquire_lease(session, name, self.holder, self.lease):
+                        logger.error(f"Lease on job {name} was taken over while running")
+            except Exception as e:
+                logger.error(f"Failed to renew lease on job {name}: {e}")
+
+
+# Shared instance guarding the scheduler sweeps
+scheduler_lock = SchedulerLock()
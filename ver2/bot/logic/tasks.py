@@ -1,109 +1,163 @@
 """Task processing logic for GameTODO Bot."""
 import logging
-from datetime import datetime
-from aiogram import Bot
+import time
+from datetime import datetime, timedelta
 
-from database.engine import async_session
+from database.engine import sweep_session
 from database.task_repo import (
-    get_overdue_tasks, mark_task_failed, delete_all_active_tasks
+    get_overdue_tasks, fail_overdue_tasks, repair_active_task_counts, prewarm_deadline_burst
 )
-from database.user_repo import update_user_stats
-from bot.logic.game import apply_damage, reset_character
-from bot.texts import notification_task_overdue, notification_death
+from database.user_cache import user_cache
+from bot.logic.deadline_timer import deadline_timer
+from bot.logic.scheduler_lock import scheduler_lock
+from bot.logic.outbox import SendSchedule, enqueue_notifications, outbox_drainer, wants_digest
+from bot.texts import notification_task_overdue, notification_overdue_digest, notification_death
 from bot.keyboards import death_notification_keyboard, overdue_notification_keyboard
-from config import DIFFICULTY_DAMAGE
+from config import (
+    SWEEP_CHUNK_SIZE, BURST_PREWARM_MIN_TASKS, BURST_PREWARM_LEAD_MINUTES, BURST_PREWARM_INTERVAL_MINUTES
+)
 
 logger = logging.getLogger(__name__)
 
 
-async def check_deadlines(bot: Bot) -> None:
+async def check_deadlines(task_ids: list[int] = None) -> None:
     """
     Check for overdue tasks and apply damage.
     
-    This function is called by the scheduler every 5 minutes.
+    Called by the deadline timer with the IDs of due tasks, and by the
+    reconciliation sweep without IDs to catch anything the timer missed.
+    The sweep walks the overdue backlog in keyset chunks of
+    SWEEP_CHUNK_SIZE, each in its own transaction, so memory stays flat
+    after an outage. Notifications are written to the outbox in the same
+    transaction; a user with several failed tasks may get them as one digest.
+    The timer path needs no scheduler lock: a task is only failed by the
+    process whose UPDATE flips it from ACTIVE.
     """
     logger.info("Checking deadlines...")
     
     now = datetime.utcnow()
-    notifications = []  # List of (telegram_id, text, keyboard) tuples
-    dead_users = set()  # Track users who died to skip their remaining tasks
+    # Quick deadlines fail many tasks at once, their notifications are spread out
+    schedule = SendSchedule(now=now)
+    if task_ids is not None:
+        failed_count, deaths = await _fail_chunk(now, task_ids, schedule)
+        logger.info(f"Processed {failed_count} overdue tasks, {deaths} deaths")
+        return
     
-    async with async_session() as session:
-        # Get all overdue tasks
-        overdue_tasks = await get_overdue_tasks(session, now)
+    after = None
+    chunks = 0
+    failed_count = 0
+    deaths = 0
+    while True:
+        started = time.monotonic()
+        async with sweep_session() as session:
+            keys = await get_overdue_tasks(session, now, after, SWEEP_CHUNK_SIZE)
+        if not keys:
+            break
         
-        if not overdue_tasks:
-            logger.info("No overdue tasks found")
-            return
+        chunk_failed, chunk_deaths = await _fail_chunk(now, [task_id for _, task_id in keys], schedule)
+        chunks += 1
+        failed_count += chunk_failed
+        deaths += chunk_deaths
+        after = keys[-1]
+        logger.info(f"Overdue chunk {chunks}: {chunk_failed} tasks in {1000 * (time.monotonic() - started):.0f} ms")
+        
+        if len(keys) < SWEEP_CHUNK_SIZE:
+            break
+    
+    if not failed_count:
+        logger.info("No overdue tasks found")
+        return
+    logger.info(f"Processed {failed_count} overdue tasks, {deaths} deaths in {chunks} chunks")
+
+
+async def _fail_chunk(now: datetime, task_ids: list[int], schedule: SendSchedule) -> tuple[int, int]:
+    """Fail the given overdue tasks in one transaction, returns (failed, deaths)."""
+    notifications = []  # List of (telegram_id, text, keyboard) tuples
+    
+    async with sweep_session() as session:
+        # Fail overdue tasks and apply summed damage per user
+        results = await fail_overdue_tasks(session, now, task_ids)
         
-        logger.info(f"Found {len(overdue_tasks)} overdue tasks")
+        if not results:
+            return 0, 0
         
-        for task in overdue_tasks:
-            user = task.user
+        failed_count = 0
+        deaths = 0
+        for result in results:
+            failed_count += len(result.failed_tasks)
             
-            # Skip if user already died in this cycle
-            if user.telegram_id in dead_users:
+            if result.died:
+                deaths += 1
+                logger.info(f"User {result.telegram_id} died. Active tasks deleted.")
+                notifications.append((result.telegram_id, notification_death(), death_notification_keyboard()))
                 continue
             
-            # Calculate damage
-            diff = task.difficulty.value if hasattr(task.difficulty, 'value') else task.difficulty
-            damage = DIFFICULTY_DAMAGE.get(diff, 5)
-            
-            # Apply damage
-            new_hp, is_dead = apply_damage(user, damage)
-            
-            # Update user stats
-            new_total_failed = user.total_failed + 1
-            
-            if is_dead:
-                # Handle death
-                reset_character(user)
-                user.total_failed = new_total_failed
-                
-                # Delete all active tasks
-                deleted_count = await delete_all_active_tasks(session, user.id)
-                logger.info(f"User {user.telegram_id} died. Deleted {deleted_count} active tasks.")
-                
-                # Mark this user as dead to skip remaining tasks
-                dead_users.add(user.telegram_id)
-                
-                # Update in database
-                await update_user_stats(
-                    session, user,
-                    level=1,
-                    xp=0,
-                    hp=100,
-                    max_hp=100,
-                    total_failed=new_total_failed
-                )
-                
-                # Queue death notification
-                notifications.append((user.telegram_id, notification_death(), death_notification_keyboard()))
-            else:
-                # Just apply damage
-                await update_user_stats(
-                    session, user,
-                    hp=new_hp,
-                    total_failed=new_total_failed
-                )
-                
-                # Queue overdue notification
+            if wants_digest(len(result.failed_tasks), result.digest_threshold):
                 notifications.append((
-                    user.telegram_id,
-                    notification_task_overdue(task.title, damage, user),
+                    result.telegram_id,
+                    notification_overdue_digest(result.failed_tasks, result),
                     overdue_notification_keyboard()
                 ))
+                continue
             
-            # Mark task as failed
-            await mark_task_failed(session, task.id)
+            for title, damage in result.failed_tasks:
+                notifications.append((
+                    result.telegram_id,
+                    notification_task_overdue(title, damage, result),
+                    overdue_notification_keyboard()
+                ))
         
+        await enqueue_notifications(session, notifications, schedule)
         await session.commit()
     
-    # Send notifications after transaction is committed
-    for telegram_id, text, keyboard in notifications:
-        try:
-            await bot.send_message(telegram_id, text, reply_markup=keyboard)
-        except Exception as e:
-            logger.error(f"Failed to send notification to {telegram_id}: {e}")
+    # Drop snapshots a concurrent read may have cached before the commit
+    user_cache.invalidate_user_ids(result.user_id for result in results)
+    outbox_drainer.wake()
+    return failed_count, deaths
+
+
+async def reconcile_deadlines() -> None:
+    """
+    Reconciliation sweep: fail anything the timer missed and reload it.
+    
+    This function is called by the scheduler every
+    DEADLINE_RECONCILE_INTERVAL_MINUTES and once at startup, to catch up
+    on deadlines that passed while the bot was down. Only one process
+    sweeps at a time; every process reloads its own timer.
+    """
+    await scheduler_lock.run("check_deadlines", check_deadlines)
+    await deadline_timer.load()
+
+
+async def repair_active_counts() -> None:
+    """
+    Consistency check for the denormalized active task counter.
+    
+    This function is called by the scheduler every
+    ACTIVE_COUNT_REPAIR_INTERVAL_MINUTES.
+    """
+    async with sweep_session() as session:
+        repaired = await repair_active_task_counts(session)
+    
+    if repaired:
+        logger.warning(f"Repaired active task count drift for {repaired} users")
+
+
+async def prewarm_deadline_bursts() -> None:
+    """
+    Read the rows behind an upcoming burst of deadlines into the database cache.
+    
+    This function is called by the scheduler every
+    BURST_PREWARM_INTERVAL_MINUTES and looks at the interval starting
+    BURST_PREWARM_LEAD_MINUTES ahead, so the overdue sweep of a quick
+    deadline (hundreds of tasks on one minute) doesn't start with cold reads.
+    """
+    start = datetime.utcnow().replace(second=0, microsecond=0) + timedelta(minutes=BURST_PREWARM_LEAD_MINUTES)
+    end = start + timedelta(minutes=BURST_PREWARM_INTERVAL_MINUTES)
+    
+    started = time.monotonic()
+    async with sweep_session() as session:
+        count = await prewarm_deadline_burst(session, start, end, BURST_PREWARM_MIN_TASKS)
     
-    logger.info(f"Processed {len(overdue_tasks)} overdue tasks, {len(dead_users)} deaths")
+    if count >= BURST_PREWARM_MIN_TASKS:
+        logger.info(f"Prewarmed {count} tasks due at {start:%H:%M} UTC in {1000 * (time.monotonic() - started):.0f} ms")
@@ -0,0 +1,205 @@
+"""Dispatcher middlewares for GameTODO Bot."""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.dispatcher.flags import get_flag
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.types import Update, TelegramObject
+
+from database.engine import async_session
+from database.user_cache import user_cache
+from database.user_repo import get_cached_user, get_user_with_stats, reactivate_user
+from bot.callbacks import callback_takes
+from bot.texts import server_busy, error_user_not_found
+from config import UPDATE_MAX_CONCURRENCY, UPDATE_QUEUE_MAX, UPDATE_MAX_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _UserLane:
+    lock: asyncio.Lock
+    users: int = 0  # updates holding or waiting for the lock
+
+
+class OrderedUpdatesMiddleware(BaseMiddleware):
+    """
+    Processes updates of one user strictly in order, different users in parallel.
+
+    Each user has a FIFO lock, so two quick taps never run at the same
+    time. At most `max_concurrency` handlers run at once; the rest wait in
+    the queue. An update is shed when the queue already holds `max_pending`
+    updates, or when it waited longer than `max_wait` (the user has seen
+    no reaction for that long and will tap again).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = UPDATE_MAX_CONCURRENCY,
+        max_pending: int = UPDATE_QUEUE_MAX,
+        max_wait: float = UPDATE_MAX_WAIT_SECONDS,
+        clock=time.monotonic
+    ):
+        self.max_pending = max_pending
+        self.max_wait = max_wait
+        self.clock = clock
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._lanes: dict[int, _UserLane] = {}
+        self.pending = 0
+        self.processed = 0
+        self.shed = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_seen_wait = 0.0
+        self.max_depth = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        if self.pending >= self.max_pending:
+            await self._shed(event, "queue full")
+            return None
+
+        self.pending += 1
+        self.max_depth = max(self.max_depth, self.pending)
+        enqueued = self.clock()
+        lane = self._lanes.get(user.id)
+        if lane is None:
+            lane = self._lanes[user.id] = _UserLane(asyncio.Lock())
+        lane.users += 1
+        queued = True
+        try:
+            async with lane.lock, self._slots:
+                self.pending -= 1
+                queued = False
+                wait = self.clock() - enqueued
+                self.waits += 1
+                self.total_wait += wait
+                self.max_seen_wait = max(self.max_seen_wait, wait)
+                if wait > self.max_wait:
+                    await self._shed(event, f"waited {wait:.1f}s")
+                    return None
+
+                self.processed += 1
+                return await handler(event, data)
+        finally:
+            if queued:
+                self.pending -= 1
+            lane.users -= 1
+            if lane.users == 0:
+                del self._lanes[user.id]
+
+    async def _shed(self, event: Update, reason: str) -> None:
+        self.shed += 1
+        logger.warning(f"Dropping update {event.update_id}: {reason}")
+        if event.callback_query is not None:
+            try:
+                await event.callback_query.answer(server_busy())
+            except Exception:
+                pass
+
+    def stats(self, reset: bool = False) -> dict:
+        """Queue depth and wait times, optionally starting a new window."""
+        stats = {
+            "pending": self.pending,
+            "max_depth": self.max_depth,
+            "processed": self.processed,
+            "shed": self.shed,
+            "avg_wait_ms": 1000 * self.total_wait / self.waits if self.waits else 0.0,
+            "max_wait_ms": 1000 * self.max_seen_wait,
+        }
+        if reset:
+            self.processed = 0
+            self.shed = 0
+            self.waits = 0
+            self.total_wait = 0.0
+            self.max_seen_wait = 0.0
+            self.max_depth = self.pending
+        return stats
+
+    async def log_stats(self) -> None:
+        """Log queue metrics for the last interval (scheduler job)."""
+        logger.info(f"Update queue: {self.stats(reset=True)}")
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    One database session per update, with the user resolved once.
+
+    Injects `session` and `user` (a cached UserSnapshot) into handler
+    kwargs and commits after the handler. Handlers that confirm a write
+    commit themselves before replying; the final commit is then a no-op.
+    An unknown user gets the /start hint instead of the handler, unless
+    the handler is flagged `resolve_user=False` (then `user` is None).
+    Buttons whose handler takes `nearest_deadline` get it loaded together
+    with the user. Any update from a user marked blocked means they are
+    back: the mark is cleared and their paused tasks resume (the deadline
+    timer picks them up on its next reload).
+    """
+
+    def __init__(self, session_factory=async_session):
+        self.session_factory = session_factory
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any]
+    ) -> Any:
+        telegram_user = data.get("event_from_user")
+        async with self.session_factory() as session:
+            data["session"] = session
+            data["user"] = None
+            if telegram_user is not None and get_flag(data, "resolve_user", default=True):
+                callback_data = getattr(event, "data", None)
+                if isinstance(callback_data, str) and callback_takes(callback_data, "nearest_deadline"):
+                    data["user"], data["nearest_deadline"] = await get_user_with_stats(session, telegram_user.id)
+                else:
+                    data["user"] = await get_cached_user(session, telegram_user.id)
+                if data["user"] is None:
+                    await event.answer(error_user_not_found())
+                    return None
+                if data["user"].blocked_at is not None:
+                    await reactivate_user(session, data["user"])
+                    data["user"] = replace(data["user"], blocked_at=None)
+
+            try:
+                result = await handler(event, data)
+                await session.commit()
+            except Exception:
+                # The cache may hold values that were never committed
+                if telegram_user is not None:
+                    user_cache.invalidate(telegram_user.id)
+                raise
+            return result
+
+
+# Shared instances registered on the dispatcher
+ordered_updates = OrderedUpdatesMiddleware()
+db_session = DbSessionMiddleware()
+
+
+def ordered_dispatcher(storage: BaseStorage, ordered: OrderedUpdatesMiddleware = ordered_updates) -> Dispatcher:
+    """
+    Dispatcher that loads the FSM state inside the per-user lock.
+
+    Dispatcher registers its FSM middleware on creation, ahead of any
+    middleware added later, so the state was read before the update
+    waited for the user's lock: a quick second message ran with the state
+    from before the first one finished. The FSM middleware is registered
+    after the ordering middleware instead.
+    """
+    dp = Dispatcher(storage=storage, disable_fsm=True)
+    dp.update.outer_middleware(ordered)
+    dp.update.outer_middleware(dp.fsm)
+    return dp
@@ -1,19 +1,107 @@
 """Safe edit utility to handle 'message is not modified' errors."""
+import logging
+from collections import OrderedDict
+from datetime import datetime
 from aiogram.types import Message
 from aiogram.exceptions import TelegramBadRequest
 
+from config import RENDER_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class RenderCache:
+    """
+    Last rendered screen per (chat, message), to skip edits that change nothing.
+
+    Stores a hash of text and markup with the message's edit_date after
+    the edit, LRU-evicted beyond `max_size`. A screen only counts as
+    current while the message still carries that edit_date, so an edit
+    made by another bot process (or outside safe_edit_text) is never
+    mistaken for ours.
+    """
+
+    def __init__(self, max_size: int = RENDER_CACHE_SIZE):
+        self.max_size = max_size
+        self._screens: OrderedDict[tuple[int, int], tuple[int, datetime | None]] = OrderedDict()
+        self.skipped = 0
+        self.edits = 0
+        self.evictions = 0
+
+    @staticmethod
+    def fingerprint(text: str, reply_markup=None) -> int:
+        markup = reply_markup.model_dump_json(exclude_none=True) if reply_markup is not None else None
+        return hash((text, markup))
+
+    def is_current(self, key: tuple[int, int], fingerprint: int, edit_date: datetime | None) -> bool:
+        if edit_date is None or self._screens.get(key) != (fingerprint, edit_date):
+            return False
+        self._screens.move_to_end(key)
+        return True
+
+    def put(self, key: tuple[int, int], fingerprint: int, edit_date: datetime | None) -> None:
+        self._screens[key] = (fingerprint, edit_date)
+        self._screens.move_to_end(key)
+        while len(self._screens) > self.max_size:
+            self._screens.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: tuple[int, int]) -> None:
+        self._screens.pop(key, None)
+
+    def clear(self) -> None:
+        self._screens.clear()
+
+    def stats(self, reset: bool = False) -> dict:
+        """Edits sent and avoided, optionally starting a new window."""
+        stats = {
+            "size": len(self._screens),
+            "edits": self.edits,
+            "skipped": self.skipped,
+            "evictions": self.evictions,
+        }
+        if reset:
+            self.edits = 0
+            self.skipped = 0
+            self.evictions = 0
+        return stats
+
+    async def log_stats(self) -> None:
+        """Log avoided edits for the last interval (scheduler job)."""
+        logger.info(f"Render cache: {self.stats(reset=True)}")
+
+
+# Shared instance used by safe_edit_text
+render_cache = RenderCache()
+
 
 async def safe_edit_text(message: Message, text: str, reply_markup=None) -> None:
     """
     Safely edit message text, ignoring 'message is not modified' errors.
-    
+
+    The edit is skipped without calling Telegram when this process put
+    this text and keyboard on the message and nobody edited it since.
+
     Args:
         message: Message to edit
         text: New text
         reply_markup: Optional inline keyboard
     """
+    key = (message.chat.id, message.message_id)
+    fingerprint = render_cache.fingerprint(text, reply_markup)
+    edit_date = message.edit_date
+    if render_cache.is_current(key, fingerprint, edit_date):
+        render_cache.skipped += 1
+        return
+
+    render_cache.edits += 1
     try:
-        await message.edit_text(text, reply_markup=reply_markup)
+        edited = await message.edit_text(text, reply_markup=reply_markup)
     except TelegramBadRequest as e:
         if "message is not modified" not in str(e).lower():
+            render_cache.invalidate(key)
             raise
+    else:
+        # Telegram returns the edited message, True for inline messages
+        edit_date = edited.edit_date if isinstance(edited, Message) else None
+    render_cache.put(key, fingerprint, edit_date)
@@ -1,8 +1,14 @@
 """Text templates for GameTODO Bot (SPEC 8)."""
+from datetime import datetime, timedelta
+from functools import lru_cache
 from database.models import User, Task
 from config import xp_required_for_level
 
+# Bound of each memoized screen text cache
+TEXT_CACHE_SIZE = 1024
 
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
 def make_progress_bar(current: int, maximum: int, width: int = 10) -> str:
     """Create a visual progress bar."""
     if maximum <= 0:
@@ -36,25 +42,35 @@ def welcome_message(user: User) -> str:
 # 8.2 Main menu
 def main_menu_message(user: User, active_tasks_count: int = 0) -> str:
     """Main menu message."""
+    return _main_menu_text(user.level, user.hp, user.max_hp)
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _main_menu_text(level: int, hp: int, max_hp: int) -> str:
     return f"""🎮 GameTODO
 
-🎖 Уровень {user.level} | ❤️ {user.hp}/{user.max_hp}"""
+🎖 Уровень {level} | ❤️ {hp}/{max_hp}"""
 
 
 # 8.3 Character screen
 def character_screen_message(user: User, active_tasks_count: int = 0, nearest_deadline: str = "—") -> str:
     """Character screen message."""
-    xp_needed = xp_required_for_level(user.level)
-    xp_bar = make_progress_bar(user.xp, xp_needed)
-    hp_bar = make_progress_bar(user.hp, user.max_hp)
+    return _character_text(user.level, user.xp, user.hp, user.max_hp, active_tasks_count, nearest_deadline)
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _character_text(level: int, xp: int, hp: int, max_hp: int, active_tasks_count: int, nearest_deadline: str) -> str:
+    xp_needed = xp_required_for_level(level)
+    xp_bar = make_progress_bar(xp, xp_needed)
+    hp_bar = make_progress_bar(hp, max_hp)
     
     return f"""👤 Твой персонаж
 
-🎖 Уровень: {user.level}
-✨ Опыт: {user.xp}/{xp_needed}
+🎖 Уровень: {level}
+✨ Опыт: {xp}/{xp_needed}
 {xp_bar}
 
-❤️ Здоровье: {user.hp}/{user.max_hp}
+❤️ Здоровье: {hp}/{max_hp}
 {hp_bar}
 
 📋 Активных задач: {active_tasks_count}
@@ -64,17 +80,22 @@ def character_screen_message(user: User, active_tasks_count: int = 0, nearest_de
 # 8.4 Statistics screen
 def statistics_screen_message(user: User) -> str:
     """Statistics screen message."""
-    total = user.total_completed + user.total_failed
-    success_rate = int((user.total_completed / total) * 100) if total > 0 else 0
-    created_date = user.created_at.strftime("%d.%m.%Y") if user.created_at else "—"
+    return _statistics_text(user.total_completed, user.total_failed, user.max_level_reached, user.created_at)
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _statistics_text(total_completed: int, total_failed: int, max_level_reached: int, created_at: datetime | None) -> str:
+    total = total_completed + total_failed
+    success_rate = int((total_completed / total) * 100) if total > 0 else 0
+    created_date = created_at.strftime("%d.%m.%Y") if created_at else "—"
     
     return f"""📊 Статистика
 
-✅ Выполнено: {user.total_completed}
-❌ Просрочено: {user.total_failed}
+✅ Выполнено: {total_completed}
+❌ Просрочено: {total_failed}
 📈 Успешность: {success_rate}%
 
-🏆 Макс. уровень: {user.max_level_reached}
+🏆 Макс. уровень: {max_level_reached}
 📅 С нами с: {created_date}"""
 
 
@@ -216,6 +237,27 @@ def notification_task_overdue(task_title: str, damage: int, user: User) -> str:
 {hp_bar}"""
 
 
+# Overdue digest: several tasks failed in one sweep
+def notification_overdue_digest(failed_tasks: list[tuple[str, int]], user: User) -> str:
+    """Overdue notification for several tasks at once."""
+    from config import DIGEST_MAX_ITEMS
+    
+    lines = [f"📝 {title} — -{damage} HP" for title, damage in failed_tasks[:DIGEST_MAX_ITEMS]]
+    if len(failed_tasks) > DIGEST_MAX_ITEMS:
+        lines.append(f"…и ещё {len(failed_tasks) - DIGEST_MAX_ITEMS}")
+    total = sum(damage for _, damage in failed_tasks)
+    hp_bar = make_progress_bar(user.hp, user.max_hp)
+    tasks_text = "\n".join(lines)
+    return f"""💀 Просрочено задач: {len(failed_tasks)}
+
+{tasks_text}
+
+💔 Получен урон: -{total} HP
+
+❤️ Здоровье: {user.hp}/{user.max_hp}
+{hp_bar}"""
+
+
 # Death notification (8.15)
 def notification_death() -> str:
     """Death notification."""
@@ -228,9 +270,21 @@ def notification_death() -> str:
 ❤️ Здоровье: 100/100"""
 
 
+def format_time_left(left: timedelta) -> str:
+    """Compact time span: "2 дн 3 ч", "1 ч 5 мин", "10 мин"."""
+    minutes = max(1, round(left.total_seconds() / 60))
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    if days:
+        return f"{days} дн {hours} ч" if hours else f"{days} дн"
+    if hours:
+        return f"{hours} ч {minutes} мин" if minutes else f"{hours} ч"
+    return f"{minutes} мин"
+
+
 # Reminder notification (8.12)
-def notification_reminder(task: Task) -> str:
-    """Reminder notification - 1 hour before deadline."""
+def notification_reminder(task: Task, now: datetime) -> str:
+    """Reminder notification at one of the user's horizons before the deadline."""
     from config import DIFFICULTY_DAMAGE
     
     diff = task.difficulty.value if hasattr(task.difficulty, 'value') else task.difficulty
@@ -239,11 +293,89 @@ def notification_reminder(task: Task) -> str:
     return f"""⏰ Напоминание!
 
 📝 {task.title}
-⏳ Осталось меньше часа!
+⏳ До дедлайна {format_time_left(task.deadline - now)}
 
 Не забудь выполнить, иначе -{damage} HP"""
 
 
+# Reminder digest: several reminders due in one sweep
+def notification_reminder_digest(tasks: list[Task], now: datetime) -> str:
+    """Reminder notification for several tasks at once."""
+    from config import DIFFICULTY_DAMAGE, DIGEST_MAX_ITEMS
+    
+    lines = []
+    for task in tasks[:DIGEST_MAX_ITEMS]:
+        diff = task.difficulty.value if hasattr(task.difficulty, 'value') else task.difficulty
+        lines.append(
+            f"📝 {task.title} — через {format_time_left(task.deadline - now)} "
+            f"(-{DIFFICULTY_DAMAGE.get(diff, 0)} HP)"
+        )
+    if len(tasks) > DIGEST_MAX_ITEMS:
+        lines.append(f"…и ещё {len(tasks) - DIGEST_MAX_ITEMS}")
+    tasks_text = "\n".join(lines)
+    
+    return f"""⏰ Напоминание!
+
+Скоро дедлайн у задач ({len(tasks)}):
+{tasks_text}
+
+Не забудь выполнить!"""
+
+
+# Reminder settings
+def reminder_settings_message(horizons: tuple[int, ...], is_default: bool) -> str:
+    """Current reminder horizons and how to change them."""
+    if not horizons:
+        current = "выключены"
+    else:
+        current = ", ".join(f"за {format_time_left(timedelta(minutes=minutes))}" for minutes in horizons)
+    if is_default:
+        current += " (по умолчанию)"
+    return f"""⏰ Напоминания: {current}
+
+Можно выбрать любые из: {_horizon_choices()}
+
+/remind 24h 1h 10m — выбрать
+/remind off — без напоминаний
+/remind default — значение по умолчанию"""
+
+
+def reminder_settings_invalid() -> str:
+    return f"❌ Выбери из {_horizon_choices()}, или off, default. Например: /remind 3h 10m"
+
+
+def _horizon_choices() -> str:
+    """Horizons accepted by /remind as command arguments: "24h, 3h, 1h, 10m"."""
+    from config import REMINDER_HORIZONS_MINUTES
+    
+    return ", ".join(
+        f"{minutes // 60}h" if minutes % 60 == 0 else f"{minutes}m"
+        for minutes in sorted(REMINDER_HORIZONS_MINUTES, reverse=True)
+    )
+
+
+# Digest settings
+def digest_settings_message(threshold: int | None, default: int) -> str:
+    """Current digest setting and how to change it."""
+    if threshold is None:
+        current = f"по умолчанию ({default})"
+    elif threshold == 0:
+        current = "выключена"
+    else:
+        current = str(threshold)
+    return f"""📬 Сводка уведомлений: {current}
+
+Если за одну проверку набирается столько уведомлений или больше, они приходят одним сообщением.
+
+/digest 3 — сводка от 3 уведомлений
+/digest off — всегда отдельными сообщениями
+/digest default — значение по умолчанию"""
+
+
+def digest_settings_invalid() -> str:
+    return "❌ Укажи число от 0 до 100, off или default. Например: /digest 3"
+
+
 # Error messages
 def error_empty_title() -> str:
     return "❌ Название не может быть пустым. Попробуй ещё раз:"
@@ -276,6 +408,18 @@ def coming_soon() -> str:
     return "🚧 Скоро будет доступно"
 
 
+def error_user_not_found() -> str:
+    return "Пользователь не найден. Отправь /start"
+
+
+def server_busy() -> str:
+    return "⏳ Бот перегружен, попробуй ещё раз через минуту."
+
+
+def error_button_outdated() -> str:
+    return "Кнопка устарела, открой /start"
+
+
 # Failed tasks
 def failed_tasks_header(count: int) -> str:
     return f"❌ Просроченные задачи ({count})"
@@ -0,0 +1,111 @@
+"""Webhook ingestion for GameTODO Bot."""
+import asyncio
+import hmac
+import logging
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+
+from config import (
+    WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBAPP_HOST, WEBAPP_PORT,
+    WEBHOOK_MAX_CONCURRENCY
+)
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+ALLOWED_UPDATES = ["message", "callback_query"]
+
+
+class WebhookHandler:
+    """
+    Accepts Telegram updates over HTTP and feeds them to the dispatcher.
+
+    Updates are acknowledged right away and processed in the background,
+    at most `max_concurrency` at a time. When all slots are busy the
+    request waits for one, which slows Telegram down instead of piling up
+    tasks in memory.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, secret_token: str = None, max_concurrency: int = WEBHOOK_MAX_CONCURRENCY):
+        self.dp = dp
+        self.bot = bot
+        self.secret_token = secret_token
+        self.max_concurrency = max_concurrency
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._tasks: set[asyncio.Task] = set()
+        self.received = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def _check_secret(self, request: web.Request) -> bool:
+        if not self.secret_token:
+            return True
+        return hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret_token)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if not self._check_secret(request):
+            return web.Response(status=401, text="Unauthorized")
+
+        try:
+            update = await request.json()
+        except ValueError:
+            return web.Response(status=400, text="Bad Request")
+
+        await self._slots.acquire()
+        self.received += 1
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response()
+
+    async def _process(self, update: dict) -> None:
+        try:
+            await self.dp.feed_webhook_update(self.bot, update)
+        except Exception as e:
+            logger.error(f"Failed to process update {update.get('update_id')}: {e}")
+        finally:
+            self._slots.release()
+
+    async def drain(self) -> None:
+        """Wait for updates being processed."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def create_webhook_app(handler: WebhookHandler, path: str = WEBHOOK_PATH) -> web.Application:
+    """Build aiohttp application serving the webhook endpoint."""
+    app = web.Application()
+    app.router.add_post(path, handler.handle)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """
+    Register the webhook with Telegram and serve updates until cancelled.
+
+    Runs dispatcher startup/shutdown hooks like start_polling does.
+    """
+    handler = WebhookHandler(dp, bot, WEBHOOK_SECRET)
+    runner = web.AppRunner(create_webhook_app(handler))
+    await runner.setup()
+    site = web.TCPSite(runner, WEBAPP_HOST, WEBAPP_PORT)
+    await site.start()
+
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    await bot.set_webhook(
+        WEBHOOK_URL + WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET or None,
+        allowed_updates=ALLOWED_UPDATES,
+        max_connections=min(WEBHOOK_MAX_CONCURRENCY, 100),
+        drop_pending_updates=False
+    )
+    logger.info(f"Webhook listening on {WEBAPP_HOST}:{WEBAPP_PORT}{WEBHOOK_PATH}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await handler.drain()
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
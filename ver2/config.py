@@ -40,3 +40,126 @@ DIFFICULTY_DAMAGE = {
 
 # Scheduler settings
 DEADLINE_CHECK_INTERVAL_MINUTES = 5
+
+# Deadline timer: tasks fail at their exact deadline, the reconciliation
+# sweep reloads the timer and catches anything it missed
+DEADLINE_RECONCILE_INTERVAL_MINUTES = 15
+DEADLINE_TIMER_HORIZON_MINUTES = 2 * DEADLINE_RECONCILE_INTERVAL_MINUTES
+
+# Tasks per page of the task lists (Telegram allows 100 buttons per message)
+TASK_PAGE_SIZE = int(os.getenv("TASK_PAGE_SIZE", "8"))
+
+# Overdue and reminder sweeps process tasks in chunks of this size, one
+# transaction each, so a large backlog doesn't pile up in memory
+SWEEP_CHUNK_SIZE = int(os.getenv("SWEEP_CHUNK_SIZE", "500"))
+
+# Consistency check for User.active_task_count
+ACTIVE_COUNT_REPAIR_INTERVAL_MINUTES = 60
+
+# Notification dispatcher (Telegram limits: ~30 msg/s total, 1 msg/s per chat)
+NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", "8"))
+NOTIFY_GLOBAL_RATE = float(os.getenv("NOTIFY_GLOBAL_RATE", "28"))
+NOTIFY_CHAT_RATE = float(os.getenv("NOTIFY_CHAT_RATE", "1"))
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "10000"))
+NOTIFY_MAX_RETRIES = 3
+
+# Notifications of one sweep: a user with at least DIGEST_THRESHOLD of them
+# gets a single digest instead (users.digest_threshold overrides it, 0 turns
+# digests off). A digest lists at most DIGEST_MAX_ITEMS tasks
+DIGEST_THRESHOLD = int(os.getenv("DIGEST_THRESHOLD", "3"))
+DIGEST_MAX_ITEMS = 20
+
+# Reminders before a deadline, in minutes. Users pick any of
+# REMINDER_HORIZONS_MINUTES with /remind (users.reminder_horizons), NULL
+# uses DEFAULT_REMINDER_HORIZONS_MINUTES
+REMINDER_HORIZONS_MINUTES = (24 * 60, 3 * 60, 60, 10)
+DEFAULT_REMINDER_HORIZONS_MINUTES = tuple(
+    int(minutes) for minutes in os.getenv("DEFAULT_REMINDER_HORIZONS_MINUTES", "60").split(",")
+)
+
+# Deadline bursts: the quick deadline buttons put many tasks on the same
+# minute (today 21:00, tomorrow 10:00 and 18:00). Reminders go out up to
+# REMINDER_SPREAD_SECONDS ahead of their horizon, sweep notifications are
+# queued at NOTIFY_SPREAD_RATE per second (leaving Telegram's limit room
+# for replies to users) over at most NOTIFY_SPREAD_MAX_SECONDS, and the
+# rows behind a minute with BURST_PREWARM_MIN_TASKS deadlines or more are
+# read BURST_PREWARM_LEAD_MINUTES ahead so the overdue sweep finds them cached
+REMINDER_SPREAD_SECONDS = int(os.getenv("REMINDER_SPREAD_SECONDS", "300"))
+NOTIFY_SPREAD_RATE = float(os.getenv("NOTIFY_SPREAD_RATE", "20"))
+NOTIFY_SPREAD_MAX_SECONDS = int(os.getenv("NOTIFY_SPREAD_MAX_SECONDS", "300"))
+BURST_PREWARM_MIN_TASKS = int(os.getenv("BURST_PREWARM_MIN_TASKS", "200"))
+BURST_PREWARM_LEAD_MINUTES = 2
+BURST_PREWARM_INTERVAL_MINUTES = 1
+
+# Notification outbox drainers
+OUTBOX_DRAINERS = int(os.getenv("OUTBOX_DRAINERS", "2"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_SECONDS = 5
+OUTBOX_LEASE_SECONDS = 120
+OUTBOX_MAX_ATTEMPTS = 5
+
+# In-process user cache (read-only screens), entries expire after the TTL.
+# Every USER_CACHE_SYNC_SECONDS a bot process drops cached users whose row
+# another process changed (sweeps, other replicas); USER_CACHE_SYNC_LAG_SECONDS
+# covers transactions that commit after the poll and clock skew between hosts
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_SYNC_SECONDS = float(os.getenv("USER_CACHE_SYNC_SECONDS", "2"))
+USER_CACHE_SYNC_LAG_SECONDS = float(os.getenv("USER_CACHE_SYNC_LAG_SECONDS", "10"))
+
+# Last rendered screen per message, edits that change nothing are skipped
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "10000"))
+
+# Database connection pools (PostgreSQL). Handlers and scheduler sweeps use
+# separate pools so a long sweep doesn't starve user taps
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_SWEEP_POOL_SIZE = int(os.getenv("DB_SWEEP_POOL_SIZE", "3"))
+DB_SWEEP_MAX_OVERFLOW = int(os.getenv("DB_SWEEP_MAX_OVERFLOW", "2"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+DB_POOL_STATS_INTERVAL_MINUTES = 5
+
+# Update processing: in order per user, at most UPDATE_MAX_CONCURRENCY
+# handlers at once (more would only wait for a DB connection). Updates
+# beyond UPDATE_QUEUE_MAX waiting, or waiting longer than
+# UPDATE_MAX_WAIT_SECONDS, are dropped
+UPDATE_MAX_CONCURRENCY = int(os.getenv("UPDATE_MAX_CONCURRENCY", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+UPDATE_QUEUE_MAX = int(os.getenv("UPDATE_QUEUE_MAX", "1000"))
+UPDATE_MAX_WAIT_SECONDS = float(os.getenv("UPDATE_MAX_WAIT_SECONDS", "30"))
+
+# asyncpg prepared statement cache per connection, set 0 behind pgbouncer
+# in transaction pooling mode
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+# Persistent FSM storage: task creation flows untouched for the TTL are
+# dropped, writes are batched for up to FSM_FLUSH_DELAY_SECONDS and cached
+# reads are rechecked against the database after FSM_CACHE_FRESH_SECONDS,
+# so another bot process sees a write after at most the sum of both
+FSM_STATE_TTL_MINUTES = int(os.getenv("FSM_STATE_TTL_MINUTES", str(24 * 60)))
+FSM_FLUSH_DELAY_SECONDS = float(os.getenv("FSM_FLUSH_DELAY_SECONDS", "0.5"))
+FSM_CACHE_FRESH_SECONDS = float(os.getenv("FSM_CACHE_FRESH_SECONDS", "1"))
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+FSM_PURGE_INTERVAL_MINUTES = 60
+
+# Scheduler sweeps run in one bot process at a time: "advisory" takes a
+# PostgreSQL advisory lock, "lease" a row in scheduler_leases renewed while
+# the job runs (SQLite, or PostgreSQL behind pgbouncer in transaction
+# mode), "auto" picks by database. The advisory lock holds one sweep pool
+# connection per running job
+SCHEDULER_LOCK = os.getenv("SCHEDULER_LOCK", "auto")
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "60"))
+
+# Update ingestion: "polling" or "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+
+# Webhook mode: public base URL Telegram posts to, and the local server
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
+WEBAPP_PORT = int(os.getenv("WEBAPP_PORT", "8080"))
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", "100"))
+if BOT_MODE == "webhook" and not WEBHOOK_URL:
+    raise ValueError("WEBHOOK_URL environment variable is required in webhook mode")
@@ -1,18 +1,145 @@
 """Database engine and session management."""
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import logging
+import time
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from sqlalchemy import create_engine
-from config import DATABASE_URL
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING, DB_SWEEP_POOL_SIZE, DB_SWEEP_MAX_OVERFLOW, DB_STATEMENT_CACHE_SIZE
+)
 from database.models import Base
 
+logger = logging.getLogger(__name__)
 
-# Async engine for application
-async_engine = create_async_engine(DATABASE_URL, echo=False)
 
-# Session factory
+class PoolMetrics:
+    """Time spent waiting for a connection from the pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float) -> None:
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self, reset: bool = False) -> dict:
+        """Current counters, optionally starting a new window."""
+        stats = {
+            "checkouts": self.checkouts,
+            "avg_wait_ms": 1000 * self.total_wait / self.checkouts if self.checkouts else 0.0,
+            "max_wait_ms": 1000 * self.max_wait,
+        }
+        if reset:
+            self.checkouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+        return stats
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording how long each checkout waited."""
+
+    metrics: PoolMetrics | None = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.metrics is not None:
+                self.metrics.record(time.perf_counter() - start)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def make_engine(name: str, pool_size: int, max_overflow: int) -> AsyncEngine:
+    """
+    Create an engine with its own connection pool.
+
+    SQLite keeps the dialect's default pool; PostgreSQL gets a timed
+    queue pool and the asyncpg prepared statement cache size.
+    """
+    url = make_url(DATABASE_URL)
+    if url.get_backend_name() == "sqlite":
+        return create_async_engine(url, echo=False)
+
+    connect_args = {}
+    if url.get_driver_name() == "asyncpg":
+        # 0 disables both caches, required behind pgbouncer in transaction mode
+        url = url.update_query_dict({"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)})
+        connect_args["statement_cache_size"] = DB_STATEMENT_CACHE_SIZE
+
+    engine = create_async_engine(
+        url,
+        echo=False,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=connect_args
+    )
+    engine.pool.metrics = PoolMetrics(name)
+    return engine
+
+
+# Async engine for handlers (user taps)
+async_engine = make_engine("interactive", DB_POOL_SIZE, DB_MAX_OVERFLOW)
+
+# Separate engine for scheduler sweeps and background delivery, so a big
+# sweep can't take the connections user taps are waiting for
+sweep_engine = make_engine("sweep", DB_SWEEP_POOL_SIZE, DB_SWEEP_MAX_OVERFLOW)
+
+# Session factories
 async_session = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+sweep_session = async_sessionmaker(sweep_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def pool_stats(reset: bool = False) -> dict[str, dict]:
+    """
+    Pool usage and checkout wait times per engine.
+
+    Args:
+        reset: Start a new measurement window after reading
+    """
+    stats = {}
+    for engine in (async_engine, sweep_engine):
+        pool = engine.pool
+        metrics = getattr(pool, "metrics", None)
+        if metrics is None:
+            continue
+        stats[metrics.name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            **metrics.snapshot(reset)
+        }
+    return stats
+
+
+async def log_pool_stats() -> None:
+    """Log pool wait times for the last interval (scheduler job)."""
+    for name, stats in pool_stats(reset=True).items():
+        logger.info(f"DB pool {name}: {stats}")
 
 
 async def init_db():
     """Initialize database tables."""
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+
+async def dispose_engines() -> None:
+    """Close all pooled connections."""
+    await async_engine.dispose()
+    await sweep_engine.dispose()
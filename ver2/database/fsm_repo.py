@@ -0,0 +1,66 @@
+"""FSM storage repository for database operations."""
+from datetime import datetime
+from sqlalchemy import select, delete, and_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import FsmRecord
+
+
+async def get_fsm_record(
+    session: AsyncSession, key: str, since: datetime
+) -> tuple[str | None, str, datetime] | None:
+    """
+    Get FSM state and data written after `since`.
+
+    Returns:
+        tuple: (state, data_json, updated_at), or None if missing or expired
+    """
+    result = await session.execute(
+        select(FsmRecord.state, FsmRecord.data, FsmRecord.updated_at)
+        .where(and_(FsmRecord.key == key, FsmRecord.updated_at >= since))
+    )
+    row = result.one_or_none()
+    return (row.state, row.data, row.updated_at) if row else None
+
+
+async def upsert_fsm_records(session: AsyncSession, records: list[tuple[str, str | None, str, datetime]]) -> None:
+    """
+    Insert or replace FSM records in one statement (caller commits).
+
+    Args:
+        records: List of (key, state, data_json, updated_at) tuples
+    """
+    if not records:
+        return
+
+    dialect = postgresql if session.bind.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(FsmRecord).values([
+        {"key": key, "state": state, "data": data, "updated_at": updated_at}
+        for key, state, data, updated_at in records
+    ])
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=[FsmRecord.key],
+        set_={
+            "state": stmt.excluded.state,
+            "data": stmt.excluded.data,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    ))
+
+
+async def delete_fsm_records(session: AsyncSession, keys: list[str]) -> None:
+    """Delete finished FSM records (caller commits)."""
+    if keys:
+        await session.execute(delete(FsmRecord).where(FsmRecord.key.in_(keys)))
+
+
+async def purge_expired_fsm_records(session: AsyncSession, before: datetime) -> int:
+    """
+    Delete FSM records not updated since `before`.
+
+    Returns:
+        Number of deleted records
+    """
+    result = await session.execute(delete(FsmRecord).where(FsmRecord.updated_at < before))
+    await session.commit()
+    return result.rowcount
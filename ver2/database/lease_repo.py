@@ -0,0 +1,45 @@
+"""Scheduler lease repository for database operations."""
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import SchedulerLease
+
+
+async def acquire_lease(
+    session: AsyncSession,
+    name: str,
+    holder: str,
+    ttl: timedelta,
+    now: datetime = None
+) -> bool:
+    """
+    Take or extend the lease on `name` and commit.
+
+    The lease is taken over only when it has expired or already belongs to
+    `holder`, so calling this again renews it.
+
+    Returns:
+        True if `holder` holds the lease until now + ttl
+    """
+    if now is None:
+        now = datetime.utcnow()
+
+    dialect = postgresql if session.bind.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(SchedulerLease).values(name=name, holder=holder, expires_at=now + ttl)
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=[SchedulerLease.name],
+        set_={"holder": stmt.excluded.holder, "expires_at": stmt.excluded.expires_at},
+        where=or_(SchedulerLease.expires_at <= now, SchedulerLease.holder == holder)
+    ))
+    current = await session.scalar(select(SchedulerLease.holder).where(SchedulerLease.name == name))
+    await session.commit()
+    return current == holder
+
+
+async def release_lease(session: AsyncSession, name: str, holder: str) -> None:
+    """Give up the lease on `name` if `holder` still has it, and commit."""
+    await session.execute(
+        delete(SchedulerLease).where(SchedulerLease.name == name, SchedulerLease.holder == holder)
+    )
+    await session.commit()
@@ -1,7 +1,7 @@
 """Database models for GameTODO Bot."""
 from datetime import datetime
 from enum import Enum as PyEnum
-from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Enum, ForeignKey, Index, text
 from sqlalchemy.orm import DeclarativeBase, relationship
 
 
@@ -41,6 +41,33 @@ class User(Base):
     total_failed = Column(Integer, nullable=False, default=0)
     max_level_reached = Column(Integer, nullable=False, default=1)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Denormalized count of ACTIVE tasks, kept in sync by task_repo
+    active_task_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Notifications per sweep that switch to a digest, NULL uses DIGEST_THRESHOLD
+    digest_threshold = Column(Integer, nullable=True)
+    # Set when Telegram refuses delivery (bot blocked, account deleted), the
+    # sweeps pause the user's tasks until any update from them
+    blocked_at = Column(DateTime, nullable=True)
+    # Minutes before a deadline to remind at, comma separated ("1440,60"),
+    # empty for no reminders, NULL uses DEFAULT_REMINDER_HORIZONS_MINUTES
+    reminder_horizons = Column(String(64), nullable=True)
+    # Time of the last write to the row, bot processes poll it to drop
+    # cached users changed elsewhere (NULL: not changed since the migration)
+    changed_at = Column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Sweeps exclude blocked users, a handful of rows
+        Index(
+            "ix_users_blocked", "id",
+            postgresql_where=text("blocked_at IS NOT NULL"),
+            sqlite_where=text("blocked_at IS NOT NULL")
+        ),
+        Index("ix_users_changed_at", "changed_at"),
+    )
+
+    @property
+    def reachable(self) -> bool:
+        return self.blocked_at is None
 
     def __repr__(self):
         return f"<User(telegram_id={self.telegram_id}, level={self.level}, xp={self.xp}, hp={self.hp}/{self.max_hp})>"
@@ -58,10 +85,64 @@ class Task(Base):
     status = Column(Enum(TaskStatus), nullable=False, default=TaskStatus.ACTIVE)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
-    reminder_sent = Column(Integer, nullable=False, default=0)  # 0 = False, 1 = True
+    # Time of the next reminder, computed from the owner's horizons at
+    # creation and advanced by the reminder sweep, NULL when none is left
+    next_remind_at = Column(DateTime, nullable=True)
 
     # Relationship for eager loading
     user = relationship("User", backref="tasks")
 
+    __table_args__ = (
+        # Task lists of a user: active and failed, ordered by deadline
+        Index("ix_tasks_user_status_deadline", "user_id", "status", "deadline"),
+        # Overdue sweep and deadline timer: only active tasks (Enum stores names)
+        Index(
+            "ix_tasks_active_deadline", "deadline",
+            postgresql_where=text("status = 'ACTIVE'"),
+            sqlite_where=text("status = 'ACTIVE'")
+        ),
+        # Reminder sweep: active tasks with a reminder still ahead
+        Index(
+            "ix_tasks_active_next_remind_at", "next_remind_at",
+            postgresql_where=text("status = 'ACTIVE' AND next_remind_at IS NOT NULL"),
+            sqlite_where=text("status = 'ACTIVE' AND next_remind_at IS NOT NULL")
+        ),
+    )
+
     def __repr__(self):
         return f"<Task(id={self.id}, title={self.title}, difficulty={self.difficulty}, status={self.status})>"
+
+
+class OutboxMessage(Base):
+    """Notification written in the same transaction as the state change."""
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    chat_id = Column(BigInteger, nullable=False)
+    text = Column(Text, nullable=False)
+    reply_markup = Column(Text, nullable=True)  # InlineKeyboardMarkup JSON
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<OutboxMessage(id={self.id}, chat_id={self.chat_id}, attempts={self.attempts})>"
+
+
+class FsmRecord(Base):
+    """FSM state and data of one conversation (aiogram StorageKey)."""
+    __tablename__ = "fsm_states"
+
+    key = Column(String(128), primary_key=True)
+    state = Column(String(128), nullable=True)
+    data = Column(Text, nullable=False, default="{}")  # JSON
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class SchedulerLease(Base):
+    """Lease on a scheduler job, so only one bot process runs it (SQLite)."""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(64), primary_key=True)
+    holder = Column(String(128), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
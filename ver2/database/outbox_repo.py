@@ -0,0 +1,111 @@
+"""Notification outbox repository for database operations."""
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import OutboxMessage
+
+
+async def add_outbox_messages(
+    session: AsyncSession,
+    messages: list[tuple[int, str, str | None]],
+    send_at: list[datetime] = None
+) -> None:
+    """
+    Queue notifications in the current transaction.
+    
+    Args:
+        session: Database session, the caller commits together with the state change
+        messages: List of (chat_id, text, reply_markup_json) tuples
+        send_at: Earliest delivery time of each message, now if None
+    """
+    if send_at is None:
+        send_at = [datetime.utcnow()] * len(messages)
+    session.add_all([
+        OutboxMessage(chat_id=chat_id, text=text, reply_markup=reply_markup, next_attempt_at=at)
+        for (chat_id, text, reply_markup), at in zip(messages, send_at)
+    ])
+
+
+async def claim_outbox_batch(
+    session: AsyncSession,
+    limit: int,
+    lease: timedelta,
+    now: datetime = None
+) -> list[OutboxMessage]:
+    """
+    Lease a batch of due messages and commit.
+    
+    Leased messages are hidden from other drainers until the lease expires,
+    so a crash before delivery only delays the message. Rows locked by
+    another drainer are skipped on PostgreSQL.
+    
+    Returns:
+        Leased rows (id, chat_id, text, reply_markup, attempts)
+    """
+    if now is None:
+        now = datetime.utcnow()
+    
+    due = (
+        select(OutboxMessage.id)
+        .where(OutboxMessage.next_attempt_at <= now)
+        .order_by(OutboxMessage.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(due))
+        .values(next_attempt_at=now + lease)
+        .returning(
+            OutboxMessage.id, OutboxMessage.chat_id, OutboxMessage.text,
+            OutboxMessage.reply_markup, OutboxMessage.attempts
+        )
+        .execution_options(synchronize_session=False)
+    )
+    rows = list(result.all())
+    await session.commit()
+    return rows
+
+
+async def delete_outbox_messages(session: AsyncSession, message_ids: list[int]) -> None:
+    """Delete delivered or dropped messages."""
+    if not message_ids:
+        return
+    
+    await session.execute(
+        delete(OutboxMessage)
+        .where(OutboxMessage.id.in_(message_ids))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def delete_outbox_messages_for_chats(session: AsyncSession, chat_ids: list[int]) -> int:
+    """Drop pending messages to chats that can't receive them."""
+    if not chat_ids:
+        return 0
+    
+    result = await session.execute(
+        delete(OutboxMessage)
+        .where(OutboxMessage.chat_id.in_(chat_ids))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def reschedule_outbox_messages(session: AsyncSession, retries: list[tuple[int, int, datetime]]) -> None:
+    """
+    Schedule failed messages for another attempt.
+    
+    Args:
+        retries: List of (message_id, attempts, next_attempt_at) tuples
+    """
+    if not retries:
+        return
+    
+    await session.execute(
+        update(OutboxMessage),
+        [
+            {"id": message_id, "attempts": attempts, "next_attempt_at": next_attempt_at}
+            for message_id, attempts, next_attempt_at in retries
+        ]
+    )
@@ -1,23 +1,120 @@
 """Task repository for database operations."""
-from datetime import datetime
-from sqlalchemy import select, and_, or_
+from dataclasses import dataclass, field, fields, replace
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import BigInteger, Row, select, update, func, case, cast, extract, literal, and_, or_, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 from database.models import Task, TaskDifficulty, TaskStatus, User
+from database.user_cache import user_cache, UserSnapshot
+from bot.logic.game import add_xp
+from bot.logic.reminders import next_reminder_time
+from config import (
+    DIFFICULTY_XP, DIFFICULTY_DAMAGE, DEFAULT_LEVEL, DEFAULT_XP, DEFAULT_HP, DEFAULT_MAX_HP,
+    TASK_PAGE_SIZE, DEFAULT_REMINDER_HORIZONS_MINUTES
+)
 
 
 # Title max length constant
 TITLE_MAX_LEN = 200
 
+# Sweep filters are rendered as SQL literals so the planner can match the
+# partial indexes on active tasks (a bound parameter never matches them)
+ACTIVE_STATUS = literal(TaskStatus.ACTIVE, Task.status.type, literal_execute=True)
+
+# Users Telegram refused delivery to, served by the ix_users_blocked partial index
+BLOCKED_USER_IDS = select(User.id).where(User.blocked_at.is_not(None))
+
+# User columns returned by UPDATE ... RETURNING
+USER_SNAPSHOT_COLUMNS = [getattr(User, f.name) for f in fields(UserSnapshot)]
+
+# Damage of a task computed in SQL (SPEC 7.3)
+TASK_DAMAGE = case(
+    *[(Task.difficulty == TaskDifficulty(diff), damage) for diff, damage in DIFFICULTY_DAMAGE.items()],
+    else_=5
+)
+
+
+@dataclass
+class OverdueResult:
+    """Outcome of an overdue sweep for one user."""
+    user_id: int
+    telegram_id: int
+    hp: int
+    max_hp: int
+    damage: int
+    died: bool
+    digest_threshold: int | None = None
+    failed_tasks: list[tuple[str, int]] = field(default_factory=list)  # (title, damage)
+
+
+@dataclass(frozen=True)
+class TaskRow:
+    """Columns of a task shown in a list."""
+    id: int
+    title: str
+    deadline: datetime
+
+
+@dataclass(frozen=True)
+class PageCursor:
+    """Keyset position: the (deadline, id) of the first or last shown task."""
+    deadline: datetime
+    task_id: int
+    forward: bool  # next page after it, or previous page before it
+
+
+@dataclass
+class TaskPage:
+    """One page of a task list."""
+    tasks: list[TaskRow]
+    has_prev: bool
+    has_next: bool
+
+    @property
+    def prev_cursor(self) -> PageCursor | None:
+        if not self.has_prev:
+            return None
+        return PageCursor(self.tasks[0].deadline, self.tasks[0].id, forward=False)
+
+    @property
+    def next_cursor(self) -> PageCursor | None:
+        if not self.has_next:
+            return None
+        return PageCursor(self.tasks[-1].deadline, self.tasks[-1].id, forward=True)
+
+
+@dataclass
+class CompletionResult:
+    """Outcome of completing a task."""
+    user: UserSnapshot
+    xp_gained: int
+    level_ups: list[int]
+
+
+async def _adjust_active_count(session: AsyncSession, user_id: int, delta: int) -> None:
+    """Change denormalized active task counter in the current transaction."""
+    await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(active_task_count=User.active_task_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+    user_cache.invalidate_user_ids([user_id])
+
 
 async def create_task(
     session: AsyncSession,
     user_id: int,
     title: str,
     difficulty: TaskDifficulty,
-    deadline: datetime
+    deadline: datetime,
+    reminder_horizons: tuple[int, ...] = DEFAULT_REMINDER_HORIZONS_MINUTES
 ) -> Task:
-    """Create a new task."""
+    """
+    Create a new task (caller commits).
+    
+    The first reminder is scheduled from the owner's `reminder_horizons`
+    (minutes before the deadline).
+    """
     # Truncate title if too long (E3)
     if len(title) > TITLE_MAX_LEN:
         title = title[:TITLE_MAX_LEN]
@@ -31,41 +128,115 @@ async def create_task(
         title=title,
         difficulty=difficulty,
         deadline=deadline,
-        status=TaskStatus.ACTIVE
+        status=TaskStatus.ACTIVE,
+        next_remind_at=next_reminder_time(deadline, reminder_horizons, datetime.utcnow())
     )
     session.add(task)
-    await session.commit()
-    await session.refresh(task)
+    await _adjust_active_count(session, user_id, 1)
+    await session.flush()
     return task
 
 
-async def get_active_tasks(session: AsyncSession, user_id: int) -> list[Task]:
-    """Get all active tasks for a user."""
-    result = await session.execute(
-        select(Task)
-        .where(and_(Task.user_id == user_id, Task.status == TaskStatus.ACTIVE))
-        .order_by(Task.deadline)
+async def _get_task_page(
+    session: AsyncSession,
+    user_id: int,
+    status: TaskStatus,
+    descending: bool,
+    cursor: PageCursor | None,
+    limit: int
+) -> TaskPage:
+    """
+    Load a page ordered by (deadline, id) with keyset pagination.
+
+    One row past the limit tells whether there is another page in the
+    direction of travel; coming from a cursor there always is one behind.
+    """
+    key = tuple_(Task.deadline, Task.id)
+    # Walking backwards reads in reverse order and flips the page
+    reverse = cursor is not None and not cursor.forward
+    query = (
+        select(Task.id, Task.title, Task.deadline)
+        .where(and_(Task.user_id == user_id, Task.status == status))
+        .limit(limit + 1)
     )
-    return list(result.scalars().all())
+    if cursor is not None:
+        position = tuple_(cursor.deadline, cursor.task_id)
+        query = query.where(key < position if descending != reverse else key > position)
+    if descending != reverse:
+        query = query.order_by(Task.deadline.desc(), Task.id.desc())
+    else:
+        query = query.order_by(Task.deadline, Task.id)
+
+    rows = (await session.execute(query)).all()
+    more = len(rows) > limit
+    tasks = [TaskRow(*row) for row in rows[:limit]]
+    if reverse:
+        tasks.reverse()
+
+    if cursor is not None and not tasks:
+        # Everything past the cursor was completed or deleted meanwhile
+        return await _get_task_page(session, user_id, status, descending, None, limit)
+    if cursor is None:
+        return TaskPage(tasks, has_prev=False, has_next=more)
+    if cursor.forward:
+        return TaskPage(tasks, has_prev=True, has_next=more)
+    return TaskPage(tasks, has_prev=more, has_next=True)
 
 
-async def get_failed_tasks(session: AsyncSession, user_id: int) -> list[Task]:
-    """Get all failed (overdue) tasks for a user."""
+async def get_active_tasks_page(
+    session: AsyncSession,
+    user_id: int,
+    cursor: PageCursor = None,
+    limit: int = TASK_PAGE_SIZE
+) -> TaskPage:
+    """
+    Get a page of active tasks, nearest deadline first.
+
+    Args:
+        session: Database session
+        user_id: User ID
+        cursor: Position from the previous page, None for the first page
+        limit: Tasks per page
+
+    Returns:
+        Page with the tasks and whether there are pages before/after it
+    """
+    return await _get_task_page(session, user_id, TaskStatus.ACTIVE, False, cursor, limit)
+
+
+async def get_failed_tasks_page(
+    session: AsyncSession,
+    user_id: int,
+    cursor: PageCursor = None,
+    limit: int = TASK_PAGE_SIZE
+) -> TaskPage:
+    """Get a page of failed (overdue) tasks, most recent deadline first."""
+    return await _get_task_page(session, user_id, TaskStatus.FAILED, True, cursor, limit)
+
+
+async def count_failed_tasks(session: AsyncSession, user_id: int) -> int:
+    """Count failed tasks for a user (index-only)."""
     result = await session.execute(
-        select(Task)
+        select(func.count())
+        .select_from(Task)
         .where(and_(Task.user_id == user_id, Task.status == TaskStatus.FAILED))
-        .order_by(Task.deadline.desc())
     )
-    return list(result.scalars().all())
+    return result.scalar_one()
 
 
 async def count_active_tasks(session: AsyncSession, user_id: int) -> int:
-    """Count active tasks for a user."""
+    """
+    Count active tasks for a user.
+    
+    Screens read the denormalized User.active_task_count instead, this
+    aggregate is the source of truth for the consistency check.
+    """
     result = await session.execute(
-        select(Task)
+        select(func.count())
+        .select_from(Task)
         .where(and_(Task.user_id == user_id, Task.status == TaskStatus.ACTIVE))
     )
-    return len(list(result.scalars().all()))
+    return result.scalar_one()
 
 
 async def get_task_by_id(session: AsyncSession, task_id: int, user_id: int = None) -> Task | None:
@@ -95,7 +266,7 @@ async def get_nearest_deadline(session: AsyncSession, user_id: int) -> datetime
 
 async def complete_task(session: AsyncSession, task_id: int, user_id: int) -> Task | None:
     """
-    Mark task as completed.
+    Mark task as completed (caller commits).
     
     Returns:
         Task if completed, None if task not found or not active
@@ -107,121 +278,466 @@ async def complete_task(session: AsyncSession, task_id: int, user_id: int) -> Ta
     
     task.status = TaskStatus.COMPLETED
     task.completed_at = datetime.utcnow()
-    await session.commit()
-    await session.refresh(task)
+    await _adjust_active_count(session, user_id, -1)
+    await session.flush()
     return task
 
 
-async def delete_task(session: AsyncSession, task_id: int, user_id: int) -> bool:
+async def complete_task_with_reward(
+    session: AsyncSession,
+    task_id: int,
+    user_id: int,
+    now: datetime = None
+) -> CompletionResult | None:
     """
-    Delete a task (soft delete by changing status).
+    Complete a task and reward the user (caller commits).
+    
+    The status guard lets only one of concurrent completions through, the
+    user row stays locked from the reward UPDATE until the caller commits.
+    A level-up costs one more UPDATE.
     
     Returns:
-        True if deleted, False if not found
+        CompletionResult, or None if the task is not found or not active
+    """
+    if now is None:
+        now = datetime.utcnow()
+    
+    result = await session.execute(
+        update(Task)
+        .where(and_(Task.id == task_id, Task.user_id == user_id, Task.status == TaskStatus.ACTIVE))
+        .values(status=TaskStatus.COMPLETED, completed_at=now)
+        .returning(Task.difficulty)
+        .execution_options(synchronize_session=False)
+    )
+    difficulty = result.scalar_one_or_none()
+    if difficulty is None:
+        return None
+    
+    xp_gained = DIFFICULTY_XP.get(difficulty.value, 10)
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            xp=User.xp + xp_gained,
+            total_completed=User.total_completed + 1,
+            active_task_count=User.active_task_count - 1
+        )
+        .returning(*USER_SNAPSHOT_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    user = UserSnapshot(**result.one()._mapping)
+    
+    # XP is already added, add_xp only carries it over into levels
+    new_xp, new_max_hp, level_ups = add_xp(user, 0)
+    if level_ups:
+        user = replace(
+            user,
+            xp=new_xp,
+            level=level_ups[-1],
+            max_hp=new_max_hp,
+            max_level_reached=max(user.max_level_reached, level_ups[-1])
+        )
+        await session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(xp=user.xp, level=user.level, max_hp=user.max_hp, max_level_reached=user.max_level_reached)
+            .execution_options(synchronize_session=False)
+        )
+    
+    user_cache.put(user)
+    return CompletionResult(user=user, xp_gained=xp_gained, level_ups=level_ups)
+
+
+async def delete_task(session: AsyncSession, task_id: int, user_id: int) -> TaskStatus | None:
+    """
+    Delete a task (soft delete by changing status, caller commits).
+    
+    Returns:
+        Status the task had before deletion, None if not found
     """
     task = await get_task_by_id(session, task_id, user_id)
     
     if not task:
-        return False
+        return None
     
+    previous = task.status
+    if previous == TaskStatus.ACTIVE:
+        await _adjust_active_count(session, user_id, -1)
     task.status = TaskStatus.DELETED
-    await session.commit()
-    return True
+    await session.flush()
+    return previous
 
 
-async def get_overdue_tasks(session: AsyncSession, now: datetime = None) -> list[Task]:
+async def get_overdue_tasks(
+    session: AsyncSession,
+    now: datetime = None,
+    after: tuple[datetime, int] = None,
+    limit: int = None
+) -> list[tuple[datetime, int]]:
     """
-    Get all overdue active tasks (for scheduler).
+    Get (deadline, task_id) of overdue active tasks, oldest first (for scheduler).
     
     Args:
         session: Database session
         now: Current time (defaults to UTC now)
+        after: Keyset position (deadline, task_id) of the previous chunk
+        limit: Chunk size, all if None
     
     Returns:
-        List of overdue tasks with user relationship loaded
+        List of (deadline, task_id) ordered by deadline and ID
     """
     if now is None:
         now = datetime.utcnow()
     
+    query = (
+        select(Task.deadline, Task.id)
+        .where(and_(
+            Task.status == ACTIVE_STATUS,
+            Task.deadline <= now,
+            Task.user_id.not_in(BLOCKED_USER_IDS)
+        ))
+        .order_by(Task.deadline, Task.id)
+        .limit(limit)
+    )
+    if after is not None:
+        query = query.where(tuple_(Task.deadline, Task.id) > tuple_(*after))
+    
+    result = await session.execute(query)
+    return [(deadline, task_id) for deadline, task_id in result.all()]
+
+
+async def get_upcoming_deadlines(session: AsyncSession, until: datetime) -> list[tuple[int, datetime]]:
+    """
+    Get (task_id, deadline) of active tasks with deadline up to `until`.
+    
+    Used to load the in-process deadline timer.
+    """
+    result = await session.execute(
+        select(Task.id, Task.deadline)
+        .where(and_(
+            Task.status == ACTIVE_STATUS,
+            Task.deadline <= until,
+            Task.user_id.not_in(BLOCKED_USER_IDS)
+        ))
+        .order_by(Task.deadline)
+    )
+    return [(task_id, deadline) for task_id, deadline in result.all()]
+
+
+async def prewarm_deadline_burst(session: AsyncSession, start: datetime, end: datetime, min_tasks: int) -> int:
+    """
+    Read the rows behind a burst of deadlines in [start, end) ahead of time.
+    
+    Fetches the task and user rows the overdue sweep will update, so the
+    database has them cached when the burst fails at once. Nothing is read
+    beyond the count when fewer than `min_tasks` deadlines fall in the range.
+    
+    Returns:
+        Number of active tasks with a deadline in the range
+    """
+    in_range = and_(
+        Task.status == ACTIVE_STATUS,
+        Task.deadline >= start,
+        Task.deadline < end
+    )
+    count = await session.scalar(select(func.count()).select_from(Task).where(in_range))
+    if count < min_tasks:
+        return count
+    
+    await session.execute(select(Task.id, Task.user_id, Task.title, Task.difficulty).where(in_range))
+    await session.execute(
+        select(User.id, User.telegram_id, User.hp, User.max_hp, User.digest_threshold)
+        .where(User.id.in_(select(Task.user_id).where(in_range)))
+    )
+    return count
+
+
+async def get_deadline_histogram(
+    session: AsyncSession,
+    start: datetime,
+    end: datetime,
+    bucket: timedelta
+) -> list[tuple[datetime, int]]:
+    """
+    Count active deadlines in [start, end) per time bucket.
+    
+    Returns:
+        List of (bucket start, task count), empty buckets omitted
+    """
+    size = int(bucket.total_seconds())
+    if session.bind.dialect.name == "postgresql":
+        epoch = func.floor(extract("epoch", Task.deadline))
+    else:
+        epoch = func.strftime("%s", Task.deadline)
+    # Integer division of whole seconds since the epoch
+    slot = (cast(epoch, BigInteger) // size).label("slot")
+    
     result = await session.execute(
-        select(Task)
-        .options(selectinload(Task.user))
+        select(slot, func.count())
         .where(and_(
-            Task.status == TaskStatus.ACTIVE,
-            Task.deadline <= now
+            Task.status == ACTIVE_STATUS,
+            Task.deadline >= start,
+            Task.deadline < end
         ))
+        .group_by(slot)
+        .order_by(slot)
     )
-    return list(result.scalars().all())
+    return [
+        (datetime.fromtimestamp(int(slot) * size, timezone.utc).replace(tzinfo=None), count)
+        for slot, count in result.all()
+    ]
 
 
-async def get_tasks_for_reminder(session: AsyncSession, now: datetime = None) -> list[Task]:
+async def get_tasks_for_reminder(
+    session: AsyncSession,
+    now: datetime = None,
+    after: tuple[datetime, int] = None,
+    limit: int = None
+) -> list[Row]:
     """
-    Get tasks that need reminder (deadline within 1 hour, no reminder sent yet).
+    Get active tasks whose next reminder is due.
     
     Args:
         session: Database session
         now: Current time (defaults to UTC now)
+        after: Keyset position (next_remind_at, id) of the previous chunk
+        limit: Chunk size, all if None
     
     Returns:
-        List of tasks needing reminder with user relationship loaded
+        Rows (id, title, difficulty, deadline, next_remind_at, user_id,
+        telegram_id, digest_threshold, reminder_horizons) ordered by
+        next_remind_at and ID
     """
     if now is None:
         now = datetime.utcnow()
     
-    one_hour_later = now + __import__('datetime').timedelta(hours=1)
-    
-    result = await session.execute(
-        select(Task)
-        .options(selectinload(Task.user))
+    query = (
+        select(
+            Task.id, Task.title, Task.difficulty, Task.deadline, Task.next_remind_at, Task.user_id,
+            User.telegram_id, User.digest_threshold, User.reminder_horizons
+        )
+        .join(User, User.id == Task.user_id)
         .where(and_(
-            Task.status == TaskStatus.ACTIVE,
-            Task.deadline <= one_hour_later,
+            Task.status == ACTIVE_STATUS,
+            Task.next_remind_at <= now,
             Task.deadline > now,
-            Task.reminder_sent == 0
+            Task.user_id.not_in(BLOCKED_USER_IDS)
         ))
+        .order_by(Task.next_remind_at, Task.id)
+        .limit(limit)
     )
-    return list(result.scalars().all())
+    if after is not None:
+        query = query.where(tuple_(Task.next_remind_at, Task.id) > tuple_(*after))
+    
+    result = await session.execute(query)
+    return list(result.all())
 
 
-async def mark_reminder_sent(session: AsyncSession, task_id: int) -> None:
-    """Mark that reminder was sent for a task."""
-    result = await session.execute(
-        select(Task).where(Task.id == task_id)
+async def set_next_reminders(session: AsyncSession, schedule: list[tuple[int, datetime | None]]) -> None:
+    """
+    Move tasks to their next reminder, None when none is left (caller commits).
+    
+    Args:
+        session: Database session
+        schedule: List of (task_id, next_remind_at) tuples
+    """
+    if not schedule:
+        return
+    
+    await session.execute(
+        update(Task),
+        [{"id": task_id, "next_remind_at": remind_at} for task_id, remind_at in schedule]
     )
-    task = result.scalar_one_or_none()
-    if task:
-        task.reminder_sent = 1
-        await session.commit()
 
 
-async def mark_task_failed(session: AsyncSession, task_id: int) -> None:
-    """Mark task as failed (overdue)."""
+async def reschedule_reminders(
+    session: AsyncSession,
+    user_id: int,
+    reminder_horizons: tuple[int, ...],
+    now: datetime = None
+) -> int:
+    """
+    Recompute the next reminder of a user's active tasks after a settings change (caller commits).
+    
+    Returns:
+        Number of rescheduled tasks
+    """
+    if now is None:
+        now = datetime.utcnow()
+    
     result = await session.execute(
-        select(Task).where(Task.id == task_id)
+        select(Task.id, Task.deadline)
+        .where(and_(Task.user_id == user_id, Task.status == TaskStatus.ACTIVE))
     )
-    task = result.scalar_one_or_none()
-    if task:
-        task.status = TaskStatus.FAILED
-        await session.commit()
+    schedule = [
+        (task_id, next_reminder_time(deadline, reminder_horizons, now))
+        for task_id, deadline in result.all()
+    ]
+    await set_next_reminders(session, schedule)
+    return len(schedule)
 
 
-async def delete_all_active_tasks(session: AsyncSession, user_id: int) -> int:
+async def resume_tasks(
+    session: AsyncSession,
+    user_id: int,
+    paused: timedelta,
+    reminder_horizons: tuple[int, ...],
+    now: datetime = None
+) -> list[tuple[int, datetime]]:
     """
-    Delete all active tasks for a user (used on death).
+    Move a user's active deadlines by the time their tasks were paused (caller commits).
+    
+    Reminders are rescheduled for the new deadlines.
     
     Returns:
-        Number of tasks deleted
+        List of (task_id, new_deadline) tuples
     """
+    if now is None:
+        now = datetime.utcnow()
+    
     result = await session.execute(
-        select(Task)
+        select(Task.id, Task.deadline)
         .where(and_(Task.user_id == user_id, Task.status == TaskStatus.ACTIVE))
     )
-    tasks = list(result.scalars().all())
+    moved = [(task_id, deadline + paused) for task_id, deadline in result.all()]
+    if moved:
+        await session.execute(
+            update(Task),
+            [
+                {"id": task_id, "deadline": deadline,
+                 "next_remind_at": next_reminder_time(deadline, reminder_horizons, now)}
+                for task_id, deadline in moved
+            ]
+        )
+    return moved
+
+
+async def fail_overdue_tasks(
+    session: AsyncSession,
+    now: datetime = None,
+    task_ids: list[int] = None
+) -> list[OverdueResult]:
+    """
+    Fail all overdue tasks and apply damage in a constant number of queries.
+    
+    Damage of all overdue tasks of a user is summed and applied once,
+    then death is checked (decisions.md, E9). Dead users are reset and
+    their remaining active tasks are deleted. Tasks of blocked users wait
+    until the user is back. The caller commits.
     
-    count = 0
-    for task in tasks:
-        task.status = TaskStatus.DELETED
-        count += 1
+    Args:
+        session: Database session
+        now: Current time (defaults to UTC now)
+        task_ids: Only check these tasks (deadline timer), all if None
+    
+    Returns:
+        One result per affected user
+    """
+    if now is None:
+        now = datetime.utcnow()
     
+    # 1. Flip all due tasks to FAILED
+    query = (
+        update(Task)
+        .where(and_(
+            Task.status == ACTIVE_STATUS,
+            Task.deadline <= now,
+            Task.user_id.not_in(BLOCKED_USER_IDS)
+        ))
+        .values(status=TaskStatus.FAILED)
+        .returning(Task.id, Task.user_id, Task.title, TASK_DAMAGE.label("damage"))
+        .execution_options(synchronize_session=False)
+    )
+    if task_ids is not None:
+        query = query.where(Task.id.in_(task_ids))
+    
+    failed = (await session.execute(query)).all()
+    if not failed:
+        return []
+    
+    # 2. Sum damage per user
+    damage = (
+        select(
+            Task.user_id,
+            func.sum(TASK_DAMAGE).label("damage"),
+            func.count().label("failed")
+        )
+        .where(Task.id.in_([row.id for row in failed]))
+        .group_by(Task.user_id)
+        .subquery()
+    )
+    rows = (await session.execute(
+        select(User.id, User.telegram_id, User.hp, User.max_hp, User.digest_threshold, damage.c.damage)
+        .join(damage, damage.c.user_id == User.id)
+    )).all()
+    
+    # 3. Apply damage, failed counter and death reset
+    new_hp = User.hp - damage.c.damage
+    dies = new_hp <= 0
+    await session.execute(
+        update(User)
+        .where(User.id == damage.c.user_id)
+        .values(
+            level=case((dies, DEFAULT_LEVEL), else_=User.level),
+            xp=case((dies, DEFAULT_XP), else_=User.xp),
+            hp=case((dies, DEFAULT_HP), else_=new_hp),
+            max_hp=case((dies, DEFAULT_MAX_HP), else_=User.max_hp),
+            total_failed=User.total_failed + damage.c.failed,
+            # Dead users lose all remaining active tasks below
+            active_task_count=case((dies, 0), else_=User.active_task_count - damage.c.failed)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    
+    results = {}
+    for row in rows:
+        died = row.hp - row.damage <= 0
+        results[row.id] = OverdueResult(
+            user_id=row.id,
+            telegram_id=row.telegram_id,
+            hp=DEFAULT_HP if died else row.hp - row.damage,
+            max_hp=DEFAULT_MAX_HP if died else row.max_hp,
+            damage=row.damage,
+            died=died,
+            digest_threshold=row.digest_threshold
+        )
+    for row in failed:
+        results[row.user_id].failed_tasks.append((row.title, row.damage))
+    
+    # 4. Delete remaining active tasks of dead users
+    dead_ids = [result.user_id for result in results.values() if result.died]
+    if dead_ids:
+        await session.execute(
+            update(Task)
+            .where(and_(Task.user_id.in_(dead_ids), Task.status == TaskStatus.ACTIVE))
+            .values(status=TaskStatus.DELETED)
+            .execution_options(synchronize_session=False)
+        )
+    
+    user_cache.invalidate_user_ids(results)
+    return list(results.values())
+
+
+async def repair_active_task_counts(session: AsyncSession) -> int:
+    """
+    Recompute User.active_task_count where it drifted from the tasks table.
+    
+    Returns:
+        Number of repaired users
+    """
+    actual = (
+        select(func.count())
+        .select_from(Task)
+        .where(and_(Task.user_id == User.id, Task.status == TaskStatus.ACTIVE))
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        update(User)
+        .where(User.active_task_count != actual)
+        .values(active_task_count=actual)
+        .execution_options(synchronize_session=False)
+    )
     await session.commit()
-    return count
+    if result.rowcount:
+        user_cache.clear()
+    return result.rowcount
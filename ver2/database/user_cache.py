@@ -0,0 +1,131 @@
+"""In-process read-through cache of users for GameTODO Bot."""
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from datetime import datetime
+from database.models import User
+from config import USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Read-only copy of a User row, safe to share between sessions."""
+    id: int
+    telegram_id: int
+    username: str | None
+    level: int
+    xp: int
+    hp: int
+    max_hp: int
+    total_completed: int
+    total_failed: int
+    max_level_reached: int
+    created_at: datetime
+    active_task_count: int
+    digest_threshold: int | None = None
+    reminder_horizons: str | None = None
+    blocked_at: datetime | None = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(**{f.name: getattr(user, f.name) for f in fields(cls)})
+
+
+class UserCache:
+    """
+    LRU + TTL cache of user snapshots keyed by telegram_id.
+
+    Also keeps the user_id -> telegram_id mapping so repositories that only
+    know the user ID can invalidate. Writers invalidate, the next read goes
+    to the database. Writes of other processes are picked up by
+    UserCacheSync; the TTL is the backstop.
+    """
+
+    def __init__(self, max_size: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL_SECONDS, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._users: OrderedDict[int, tuple[float, UserSnapshot]] = OrderedDict()
+        self._telegram_ids: dict[int, int] = {}  # user_id -> telegram_id
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def get(self, telegram_id: int) -> UserSnapshot | None:
+        """Cached snapshot or None on miss/expiry."""
+        entry = self._users.get(telegram_id)
+        if entry is None or entry[0] <= self.clock():
+            if entry is not None:
+                self._drop(telegram_id)
+            self.misses += 1
+            return None
+
+        self._users.move_to_end(telegram_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, user: User | UserSnapshot) -> UserSnapshot:
+        """Store a fresh snapshot of the user."""
+        snapshot = user if isinstance(user, UserSnapshot) else UserSnapshot.from_user(user)
+        self._users[snapshot.telegram_id] = (self.clock() + self.ttl, snapshot)
+        self._users.move_to_end(snapshot.telegram_id)
+        self._telegram_ids[snapshot.id] = snapshot.telegram_id
+
+        while len(self._users) > self.max_size:
+            telegram_id, (_, oldest) = self._users.popitem(last=False)
+            self._telegram_ids.pop(oldest.id, None)
+            self.evictions += 1
+        return snapshot
+
+    def user_id(self, telegram_id: int) -> int | None:
+        """Cached user ID for a telegram_id, without counting a hit."""
+        entry = self._users.get(telegram_id)
+        return entry[1].id if entry is not None else None
+
+    def invalidate(self, telegram_id: int) -> None:
+        if telegram_id in self._users:
+            self._drop(telegram_id)
+
+    def invalidate_user_ids(self, user_ids) -> None:
+        for user_id in user_ids:
+            telegram_id = self._telegram_ids.get(user_id)
+            if telegram_id is not None:
+                self._drop(telegram_id)
+
+    def clear(self) -> None:
+        self._users.clear()
+        self._telegram_ids.clear()
+
+    def stats(self, reset: bool = False) -> dict:
+        """Hit rate and evictions, optionally starting a new window."""
+        total = self.hits + self.misses
+        stats = {
+            "size": len(self._users),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+        if reset:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+        return stats
+
+    async def log_stats(self) -> None:
+        """Log the hit rate for the last interval (scheduler job)."""
+        logger.info(f"User cache: {self.stats(reset=True)}")
+
+    def _drop(self, telegram_id: int) -> None:
+        _, snapshot = self._users.pop(telegram_id)
+        self._telegram_ids.pop(snapshot.id, None)
+
+
+# Shared cache instance
+user_cache = UserCache()
@@ -1,13 +1,17 @@
 """User repository for database operations."""
-from sqlalchemy import select
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, func, and_
 from sqlalchemy.ext.asyncio import AsyncSession
-from database.models import User
+from database.models import User, Task, TaskStatus
+from database.task_repo import get_nearest_deadline, resume_tasks
+from database.user_cache import user_cache, UserSnapshot
+from bot.logic.reminders import user_horizons
 from config import DEFAULT_LEVEL, DEFAULT_XP, DEFAULT_HP, DEFAULT_MAX_HP
 
 
 async def get_or_create_user(session: AsyncSession, telegram_id: int, username: str = None) -> tuple[User, bool]:
     """
-    Get existing user or create new one.
+    Get existing user or create new one (caller commits).
     
     Returns:
         tuple: (User, is_new) where is_new is True if user was just created
@@ -21,7 +25,11 @@ async def get_or_create_user(session: AsyncSession, telegram_id: int, username:
         # Update username if changed
         if username and user.username != username:
             user.username = username
-            await session.commit()
+            await session.flush()
+            user_cache.invalidate(telegram_id)
+        # /start after blocking the bot: the user is reachable again
+        if user.blocked_at is not None:
+            await reactivate_user(session, user)
         return user, False
     
     # Create new user with default stats (SPEC 2.1)
@@ -37,11 +45,114 @@ async def get_or_create_user(session: AsyncSession, telegram_id: int, username:
         max_level_reached=DEFAULT_LEVEL
     )
     session.add(user)
-    await session.commit()
-    await session.refresh(user)
+    await session.flush()
     return user, True
 
 
+async def set_digest_threshold(session: AsyncSession, user_id: int, threshold: int | None) -> None:
+    """
+    Set when sweep notifications are grouped into a digest (caller commits).
+    
+    Args:
+        session: Database session
+        user_id: User ID
+        threshold: Notifications per sweep for a digest, 0 never, None default
+    """
+    await session.execute(
+        update(User).where(User.id == user_id).values(digest_threshold=threshold)
+    )
+    user_cache.invalidate_user_ids([user_id])
+
+
+async def set_reminder_horizons(session: AsyncSession, user_id: int, horizons: str | None) -> None:
+    """
+    Set when reminders are sent before a deadline (caller commits).
+    
+    Args:
+        session: Database session
+        user_id: User ID
+        horizons: Minutes before the deadline, comma separated, "" none, None default
+    """
+    await session.execute(
+        update(User).where(User.id == user_id).values(reminder_horizons=horizons)
+    )
+    user_cache.invalidate_user_ids([user_id])
+
+
+async def mark_users_blocked(session: AsyncSession, telegram_ids: list[int], now: datetime = None) -> int:
+    """
+    Mark users Telegram refused delivery to (caller commits).
+    
+    Args:
+        session: Database session
+        telegram_ids: Chats that answered 403 Forbidden
+        now: Time of the failure (defaults to UTC now)
+    
+    Returns:
+        Number of users newly marked
+    """
+    if not telegram_ids:
+        return 0
+    if now is None:
+        now = datetime.utcnow()
+    
+    result = await session.execute(
+        update(User)
+        .where(User.telegram_id.in_(telegram_ids), User.blocked_at.is_(None))
+        .values(blocked_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    for telegram_id in telegram_ids:
+        user_cache.invalidate(telegram_id)
+    return result.rowcount
+
+
+async def reactivate_user(
+    session: AsyncSession, user: User | UserSnapshot, now: datetime = None
+) -> list[tuple[int, datetime]]:
+    """
+    Clear blocked_at of a user who is back and resume their tasks (caller commits).
+    
+    The sweeps skip a blocked user, so their tasks were paused. Every active
+    deadline moves by the time spent blocked: a task keeps the time it had
+    left when the user blocked the bot, instead of the whole backlog failing
+    with its summed damage on the next sweep. Tasks already overdue when the
+    user blocked stay overdue and fail as usual.
+    
+    Args:
+        session: Database session
+        user: User with the blocked_at and reminder_horizons last read
+        now: Time of the user's update (defaults to UTC now)
+    
+    Returns:
+        (task_id, new_deadline) of the moved tasks, empty if another
+        update already reactivated the user
+    """
+    if now is None:
+        now = datetime.utcnow()
+    blocked_at = user.blocked_at
+    
+    result = await session.execute(
+        update(User)
+        .where(User.id == user.id, User.blocked_at == blocked_at)
+        .values(blocked_at=None)
+    )
+    user_cache.invalidate(user.telegram_id)
+    if result.rowcount == 0:
+        return []
+    
+    paused = max(now - blocked_at, timedelta(0))
+    return await resume_tasks(session, user.id, paused, user_horizons(user.reminder_horizons), now)
+
+
+async def get_changed_telegram_ids(session: AsyncSession, since: datetime) -> list[int]:
+    """Telegram IDs of users whose row was written at or after `since`."""
+    result = await session.execute(
+        select(User.telegram_id).where(User.changed_at >= since)
+    )
+    return list(result.scalars().all())
+
+
 async def get_user_by_telegram_id(session: AsyncSession, telegram_id: int) -> User | None:
     """Get user by telegram ID."""
     result = await session.execute(
@@ -50,33 +161,50 @@ async def get_user_by_telegram_id(session: AsyncSession, telegram_id: int) -> Us
     return result.scalar_one_or_none()
 
 
-async def update_user_stats(
-    session: AsyncSession, 
-    user: User,
-    level: int = None,
-    xp: int = None,
-    hp: int = None,
-    max_hp: int = None,
-    total_completed: int = None,
-    total_failed: int = None,
-    max_level_reached: int = None
-) -> User:
-    """Update user stats."""
-    if level is not None:
-        user.level = level
-    if xp is not None:
-        user.xp = xp
-    if hp is not None:
-        user.hp = hp
-    if max_hp is not None:
-        user.max_hp = max_hp
-    if total_completed is not None:
-        user.total_completed = total_completed
-    if total_failed is not None:
-        user.total_failed = total_failed
-    if max_level_reached is not None:
-        user.max_level_reached = max_level_reached
-    
-    await session.commit()
-    await session.refresh(user)
-    return user
+async def get_cached_user(session: AsyncSession, telegram_id: int) -> UserSnapshot | None:
+    """
+    Get read-only user snapshot, loading it on cache miss.
+    
+    Use for screens that only display the user; code that changes the
+    user must load the ORM object with get_user_by_telegram_id.
+    """
+    snapshot = user_cache.get(telegram_id)
+    if snapshot is not None:
+        return snapshot
+    
+    user = await get_user_by_telegram_id(session, telegram_id)
+    if user is None:
+        return None
+    return user_cache.put(user)
+
+
+async def get_user_with_stats(session: AsyncSession, telegram_id: int) -> tuple[UserSnapshot | None, datetime | None]:
+    """
+    Get user snapshot and nearest active deadline in one statement.
+    
+    A cached user costs only the deadline lookup. On a cache miss the user
+    row and the nearest deadline, a correlated subquery on the
+    (user_id, status, deadline) index, come back together.
+    
+    Returns:
+        tuple: (UserSnapshot or None, nearest_deadline or None)
+    """
+    snapshot = user_cache.get(telegram_id)
+    if snapshot is not None:
+        return snapshot, await get_nearest_deadline(session, snapshot.id)
+    
+    nearest = (
+        select(func.min(Task.deadline))
+        .where(and_(Task.user_id == User.id, Task.status == TaskStatus.ACTIVE))
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        select(User, nearest.label("nearest_deadline"))
+        .where(User.telegram_id == telegram_id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return None, None
+    
+    user, nearest_deadline = row
+    return user_cache.put(user), nearest_deadline
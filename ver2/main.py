@@ -1,18 +1,31 @@
 """Main entry point for GameTODO Bot."""
+import argparse
 import asyncio
 import logging
+import signal
+from datetime import datetime
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from config import BOT_TOKEN, DEADLINE_CHECK_INTERVAL_MINUTES
-from database.engine import init_db
-from bot.handlers.start import start_router
-from bot.handlers.menu import menu_router
-from bot.handlers.task_create import task_create_router
-from bot.handlers.task_list import task_list_router
-from bot.logic.tasks import check_deadlines
+from config import (
+    BOT_TOKEN, DEADLINE_CHECK_INTERVAL_MINUTES, DEADLINE_RECONCILE_INTERVAL_MINUTES,
+    ACTIVE_COUNT_REPAIR_INTERVAL_MINUTES, DB_POOL_STATS_INTERVAL_MINUTES,
+    FSM_PURGE_INTERVAL_MINUTES, BURST_PREWARM_INTERVAL_MINUTES, USER_CACHE_SYNC_SECONDS, BOT_MODE
+)
+from database.engine import init_db, log_pool_stats, dispose_engines
+from database.user_cache import user_cache
+from bot.fsm_storage import SQLStorage
+from bot.middlewares import ordered_updates, ordered_dispatcher, db_session
+from bot.safe_edit import render_cache
+from bot.handlers import start_router, task_create_router, settings_router, callback_router
+from bot.logic.tasks import check_deadlines, reconcile_deadlines, repair_active_counts, prewarm_deadline_bursts
+from bot.logic.deadline_timer import deadline_timer
+from bot.logic.scheduler_lock import scheduler_lock
+from bot.logic.dispatcher import notification_dispatcher
+from bot.logic.outbox import outbox_drainer
+from bot.logic.cache_sync import user_cache_sync
 from bot.logic.notifications import check_upcoming_deadlines
+from bot.webhook import run_webhook, ALLOWED_UPDATES
 
 # Configure logging
 logging.basicConfig(
@@ -21,9 +34,114 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+ROLES = ("bot", "scheduler", "all")
+
+
+def build_dispatcher(storage) -> Dispatcher:
+    """Create dispatcher with all routers and middlewares registered."""
+    dp = ordered_dispatcher(storage)
+    dp.message.middleware(db_session)
+    dp.callback_query.middleware(db_session)
+    dp.include_router(start_router)
+    dp.include_router(settings_router)
+    dp.include_router(task_create_router)
+    dp.include_router(callback_router)
+    return dp
+
+
+def schedule_sweeps(scheduler: AsyncIOScheduler) -> None:
+    """Register the deadline, reminder and maintenance sweeps (scheduler role)."""
+    # Reconciliation sweep for deadlines the timer missed, first run right
+    # away to catch up after downtime
+    scheduler.add_job(
+        reconcile_deadlines,
+        'interval',
+        minutes=DEADLINE_RECONCILE_INTERVAL_MINUTES,
+        next_run_time=datetime.now()
+    )
+    
+    # Check for reminders every 5 minutes. Sweeps run in one process at a
+    # time when several replicas share the database
+    scheduler.add_job(
+        scheduler_lock.guard("check_upcoming_deadlines", check_upcoming_deadlines),
+        'interval',
+        minutes=DEADLINE_CHECK_INTERVAL_MINUTES,
+        next_run_time=datetime.now()
+    )
+    
+    # Repair drift of the denormalized active task counter
+    scheduler.add_job(
+        scheduler_lock.guard("repair_active_counts", repair_active_counts),
+        'interval',
+        minutes=ACTIVE_COUNT_REPAIR_INTERVAL_MINUTES
+    )
+    
+    # Warm the rows behind quick deadline bursts before they fail at once
+    scheduler.add_job(
+        scheduler_lock.guard("prewarm_deadline_bursts", prewarm_deadline_bursts),
+        'cron',
+        minute=f"*/{BURST_PREWARM_INTERVAL_MINUTES}"
+    )
+
+
+def schedule_bot_jobs(scheduler: AsyncIOScheduler, fsm_storage: SQLStorage) -> None:
+    """Register jobs of the update handling process (bot role)."""
+    # Drop abandoned task creation flows
+    scheduler.add_job(
+        scheduler_lock.guard("purge_fsm_states", fsm_storage.purge_expired),
+        'interval',
+        minutes=FSM_PURGE_INTERVAL_MINUTES
+    )
+    
+    # Drop cached users changed by the sweeps or by other replicas, every
+    # process keeps its own cache
+    scheduler.add_job(
+        user_cache_sync.sync,
+        'interval',
+        seconds=USER_CACHE_SYNC_SECONDS
+    )
+    
+    # Update queue and render cache metrics
+    scheduler.add_job(
+        ordered_updates.log_stats,
+        'interval',
+        minutes=DB_POOL_STATS_INTERVAL_MINUTES
+    )
+    scheduler.add_job(
+        render_cache.log_stats,
+        'interval',
+        minutes=DB_POOL_STATS_INTERVAL_MINUTES
+    )
+
+
+async def run_bot(bot: Bot, dp: Dispatcher) -> None:
+    """Receive updates until stopped."""
+    logger.info(f"Starting bot in {BOT_MODE} mode...")
+    if BOT_MODE == "webhook":
+        await run_webhook(dp, bot)
+    else:
+        # getUpdates fails while a webhook is registered
+        await bot.delete_webhook()
+        await dp.start_polling(bot, allowed_updates=ALLOWED_UPDATES)
+
 
-async def main():
-    """Main function to start the bot."""
+async def wait_for_shutdown() -> None:
+    """Block until SIGINT or SIGTERM (scheduler role has no polling loop)."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+
+async def main(role: str = "all"):
+    """
+    Main function to start the bot.
+    
+    Args:
+        role: "bot" handles updates, "scheduler" runs the sweeps and
+            delivers notifications, "all" does both in one process
+    """
     # Verify token is set
     if not BOT_TOKEN:
         logger.error("BOT_TOKEN is not set!")
@@ -34,46 +152,86 @@ async def main():
     await init_db()
     logger.info("Database initialized")
     
+    handles_updates = role in ("bot", "all")
+    runs_sweeps = role in ("scheduler", "all")
+    
     # Create bot and dispatcher
     bot = Bot(token=BOT_TOKEN)
-    dp = Dispatcher(storage=MemoryStorage())
+    fsm_storage = None
+    if handles_updates:
+        # FSM state lives in the database, task drafts survive restarts
+        fsm_storage = SQLStorage()
+        dp = build_dispatcher(fsm_storage)
     
-    # Register routers
-    dp.include_router(start_router)
-    dp.include_router(menu_router)
-    dp.include_router(task_create_router)
-    dp.include_router(task_list_router)
+    if runs_sweeps:
+        # Shared pool for scheduler notifications, fed from the outbox
+        notification_dispatcher.start(bot)
+        outbox_drainer.start()
     
-    # Setup scheduler
-    scheduler = AsyncIOScheduler()
+    # Setup scheduler. A run still in progress makes the next one skip, and
+    # runs missed while the event loop was busy collapse into one
+    scheduler = AsyncIOScheduler(job_defaults={
+        "max_instances": 1,
+        "coalesce": True,
+        "misfire_grace_time": None
+    })
+    if runs_sweeps:
+        schedule_sweeps(scheduler)
+    if handles_updates:
+        schedule_bot_jobs(scheduler, fsm_storage)
     
-    # Check deadlines every 5 minutes
+    # Connection pool and user cache metrics
     scheduler.add_job(
-        check_deadlines,
+        log_pool_stats,
         'interval',
-        minutes=DEADLINE_CHECK_INTERVAL_MINUTES,
-        args=[bot]
+        minutes=DB_POOL_STATS_INTERVAL_MINUTES
     )
-    
-    # Check for reminders every 5 minutes
     scheduler.add_job(
-        check_upcoming_deadlines,
+        user_cache.log_stats,
         'interval',
-        minutes=DEADLINE_CHECK_INTERVAL_MINUTES,
-        args=[bot]
+        minutes=DB_POOL_STATS_INTERVAL_MINUTES
     )
     
     scheduler.start()
-    logger.info(f"Scheduler started, checking deadlines and reminders every {DEADLINE_CHECK_INTERVAL_MINUTES} minutes")
+    if runs_sweeps:
+        logger.info(f"Scheduler started, reconciling deadlines every {DEADLINE_RECONCILE_INTERVAL_MINUTES} minutes, "
+                    f"checking reminders every {DEADLINE_CHECK_INTERVAL_MINUTES} minutes")
+    
+    # Fail tasks at their exact deadline. The sweeper loads all upcoming
+    # deadlines; a bot process only times the tasks created through it
+    # until the sweeper's next reload picks them up
+    if runs_sweeps:
+        await deadline_timer.load()
+    deadline_timer.start(check_deadlines)
     
-    # Start polling
-    logger.info("Starting bot...")
+    logger.info(f"Running as {role}")
     try:
-        await dp.start_polling(bot, allowed_updates=["message", "callback_query"])
+        if handles_updates:
+            await run_bot(bot, dp)
+        else:
+            await wait_for_shutdown()
     finally:
+        await deadline_timer.stop()
         scheduler.shutdown()
+        if runs_sweeps:
+            await outbox_drainer.stop()
+            await notification_dispatcher.stop()
+        if fsm_storage is not None:
+            await fsm_storage.close()
         await bot.session.close()
+        await dispose_engines()
+
+
+def parse_args(argv: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="GameTODO Bot")
+    parser.add_argument(
+        "--role",
+        choices=ROLES,
+        default="all",
+        help="bot: handle updates, scheduler: sweeps and notification delivery, all: both"
+    )
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(parse_args().role))
@@ -0,0 +1,43 @@
+"""Helpers shared by the migration scripts.
+
+Scripts change data with plain SQL, never with statements built from the
+models: the live models carry columns and onupdate values (such as
+users.changed_at) that a database at an earlier step doesn't have yet.
+Only the definition of the index a script itself adds is taken from the
+models.
+"""
+from contextlib import asynccontextmanager
+from sqlalchemy import Index, Table, inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.schema import CreateIndex
+from database.engine import async_engine
+
+
+def has_column(sync_conn, table: str, column: str) -> bool:
+    """Use with conn.run_sync."""
+    return column in {col["name"] for col in inspect(sync_conn).get_columns(table)}
+
+
+def model_index(table: Table, name: str) -> Index:
+    """Index of a model table by name."""
+    return next(index for index in table.indexes if index.name == name)
+
+
+@asynccontextmanager
+async def autocommit_connection():
+    """Connection outside a transaction block, CONCURRENTLY cannot run inside one."""
+    async with async_engine.connect() as conn:
+        yield await conn.execution_options(isolation_level="AUTOCOMMIT")
+
+
+async def create_index(conn: AsyncConnection, index: Index) -> None:
+    """
+    Create an index unless it exists.
+
+    On PostgreSQL it is built CONCURRENTLY, so the bot keeps reading and
+    writing the table; `conn` must come from autocommit_connection.
+    """
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=conn.dialect))
+    if conn.dialect.name == "postgresql":
+        ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+    await conn.execute(text(ddl))
@@ -0,0 +1,30 @@
+"""Add denormalized active_task_count to users table.
+
+Run from the project root: python -m migrations.add_active_task_count
+"""
+import asyncio
+from sqlalchemy import text
+from database.engine import async_engine
+from migrations._util import has_column
+
+# Plain SQL: the User model may have columns this database doesn't have yet
+ACTUAL_COUNT = "(SELECT count(*) FROM tasks WHERE tasks.user_id = users.id AND tasks.status = 'ACTIVE')"
+
+
+async def migrate():
+    async with async_engine.begin() as conn:
+        if not await conn.run_sync(has_column, "users", "active_task_count"):
+            await conn.execute(text(
+                "ALTER TABLE users ADD COLUMN active_task_count INTEGER DEFAULT 0 NOT NULL"
+            ))
+        
+        # Backfill from the tasks table
+        result = await conn.execute(text(
+            f"UPDATE users SET active_task_count = {ACTUAL_COUNT} WHERE active_task_count != {ACTUAL_COUNT}"
+        ))
+    
+    print(f"Migration completed: Added active_task_count to users, backfilled {result.rowcount} users")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
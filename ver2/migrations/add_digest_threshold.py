@@ -0,0 +1,21 @@
+"""Add per-user digest_threshold to users table.
+
+Run from the project root: python -m migrations.add_digest_threshold
+"""
+import asyncio
+from sqlalchemy import text
+from database.engine import async_engine
+from migrations._util import has_column
+
+
+async def migrate():
+    async with async_engine.begin() as conn:
+        if not await conn.run_sync(has_column, "users", "digest_threshold"):
+            # Nullable without default: instant on PostgreSQL, NULL means DIGEST_THRESHOLD
+            await conn.execute(text("ALTER TABLE users ADD COLUMN digest_threshold INTEGER"))
+    
+    print("Migration completed: Added digest_threshold to users")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
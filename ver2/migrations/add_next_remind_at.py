@@ -0,0 +1,68 @@
+"""Replace tasks.reminder_sent with a precomputed next_remind_at schedule.
+
+Run from the project root: python -m migrations.add_next_remind_at
+
+Adds users.reminder_horizons and tasks.next_remind_at, fills the schedule
+of active tasks from DEFAULT_REMINDER_HORIZONS_MINUTES, builds the partial
+index the reminder sweep scans (CONCURRENTLY on PostgreSQL) and drops the
+old flag with its index. Stop the bot (or its scheduler role) first, the
+old reminder sweep reads reminder_sent.
+"""
+import asyncio
+from datetime import datetime
+from sqlalchemy import text, bindparam, DateTime
+from database.engine import async_engine
+from database.models import Task
+from migrations._util import has_column, model_index, autocommit_connection, create_index
+from bot.logic.reminders import next_reminder_time
+from config import DEFAULT_REMINDER_HORIZONS_MINUTES
+
+BATCH_SIZE = 1000
+
+
+async def migrate():
+    now = datetime.utcnow()
+    horizons = tuple(sorted(DEFAULT_REMINDER_HORIZONS_MINUTES, reverse=True))
+
+    async with async_engine.begin() as conn:
+        if not await conn.run_sync(has_column, "users", "reminder_horizons"):
+            await conn.execute(text("ALTER TABLE users ADD COLUMN reminder_horizons VARCHAR(64)"))
+        if not await conn.run_sync(has_column, "tasks", "next_remind_at"):
+            await conn.execute(text("ALTER TABLE tasks ADD COLUMN next_remind_at TIMESTAMP"))
+
+        if await conn.run_sync(has_column, "tasks", "reminder_sent"):
+            # Active tasks still waiting for their reminder: the next horizon
+            # ahead, or right away if the deadline is already within the last one
+            query = text(
+                "SELECT id, deadline, reminder_sent FROM tasks "
+                "WHERE status = 'ACTIVE' AND deadline > :now"
+            ).bindparams(bindparam("now", type_=DateTime())).columns(deadline=DateTime())
+            result = await conn.execute(query, {"now": now})
+            schedule = []
+            for task_id, deadline, reminder_sent in result.all():
+                remind_at = next_reminder_time(deadline, horizons, now)
+                if remind_at is None and not reminder_sent and horizons:
+                    remind_at = now
+                if remind_at is not None:
+                    schedule.append({"task_id": task_id, "remind_at": remind_at})
+
+            stmt = text("UPDATE tasks SET next_remind_at = :remind_at WHERE id = :task_id").bindparams(
+                bindparam("remind_at", type_=DateTime())
+            )
+            for start in range(0, len(schedule), BATCH_SIZE):
+                await conn.execute(stmt, schedule[start:start + BATCH_SIZE])
+            print(f"Scheduled reminders of {len(schedule)} active tasks")
+
+    async with autocommit_connection() as conn:
+        await create_index(conn, model_index(Task.__table__, "ix_tasks_active_next_remind_at"))
+
+        drop = "DROP INDEX CONCURRENTLY IF EXISTS" if conn.dialect.name == "postgresql" else "DROP INDEX IF EXISTS"
+        await conn.execute(text(f"{drop} ix_tasks_active_reminder_deadline"))
+        if await conn.run_sync(has_column, "tasks", "reminder_sent"):
+            await conn.execute(text("ALTER TABLE tasks DROP COLUMN reminder_sent"))
+
+    print("Migration completed: Replaced reminder_sent with next_remind_at")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,45 @@
+"""Add indexes for hot task queries without locking the table.
+
+Run from the project root: python -m migrations.add_task_indexes
+
+On PostgreSQL indexes are built with CREATE INDEX CONCURRENTLY, so the bot
+keeps reading and writing tasks during the build. An index left invalid by
+an interrupted concurrent build is dropped and built again.
+"""
+import asyncio
+from sqlalchemy import text
+from database.models import Task
+from migrations._util import autocommit_connection, create_index, model_index
+
+# Indexes of this migration only: later ones cover columns a database at
+# this step doesn't have yet and are built by their own scripts
+INDEX_NAMES = ["ix_tasks_active_deadline", "ix_tasks_user_status_deadline"]
+
+
+async def migrate():
+    indexes = [model_index(Task.__table__, name) for name in INDEX_NAMES]
+    
+    async with autocommit_connection() as conn:
+        is_postgres = conn.dialect.name == "postgresql"
+        
+        if is_postgres:
+            result = await conn.execute(text(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE NOT i.indisvalid AND c.relname = ANY(:names)"
+            ), {"names": [index.name for index in indexes]})
+            for (name,) in result.all():
+                print(f"Dropping invalid index {name}")
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        
+        for index in indexes:
+            await create_index(conn, index)
+            print(f"Created index {index.name}")
+        
+        if is_postgres:
+            await conn.execute(text("ANALYZE tasks"))
+    
+    print("Migration completed: Added task indexes")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,24 @@
+"""Add changed_at to users table with its index.
+
+Run from the project root: python -m migrations.add_users_changed_at
+"""
+import asyncio
+from sqlalchemy import text
+from database.engine import async_engine
+from database.models import User
+from migrations._util import has_column, model_index, autocommit_connection, create_index
+
+
+async def migrate():
+    async with async_engine.begin() as conn:
+        if not await conn.run_sync(has_column, "users", "changed_at"):
+            await conn.execute(text("ALTER TABLE users ADD COLUMN changed_at TIMESTAMP"))
+    
+    async with autocommit_connection() as conn:
+        await create_index(conn, model_index(User.__table__, "ix_users_changed_at"))
+    
+    print("Migration completed: Added changed_at to users")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,74 @@
+"""Shared fixtures for GameTODO Bot tests."""
+import pytest
+from datetime import timedelta
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from database.models import Base
+from database.user_cache import user_cache
+from bot.safe_edit import render_cache
+
+
+class QueryCounter:
+    """Counts SQL statements sent to the database."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def reset(self) -> None:
+        self.statements.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    """Every test starts with empty user and render caches."""
+    user_cache.clear()
+    render_cache.clear()
+    yield
+    user_cache.clear()
+    render_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def exact_reminders(monkeypatch):
+    """Reminders fall exactly on their horizon unless a test spreads them."""
+    monkeypatch.setattr("bot.logic.reminders.REMINDER_SPREAD", timedelta(0))
+
+
+@pytest.fixture
+async def engine():
+    """In-memory SQLite engine with all tables created."""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    """Session factory bound to the test engine."""
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+async def session(session_factory):
+    """Database session on the test engine."""
+    async with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+def query_counter(engine):
+    """Count statements executed on the test engine."""
+    counter = QueryCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(engine.sync_engine, "before_cursor_execute", counter)
@@ -0,0 +1,75 @@
+"""Tests for denormalized active task counter."""
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from database.models import User, TaskDifficulty
+from database.task_repo import (
+    create_task, complete_task, delete_task, fail_overdue_tasks,
+    count_active_tasks, repair_active_task_counts
+)
+
+
+@pytest.fixture
+async def user(session):
+    user = User(telegram_id=1, level=1, xp=0, hp=100, max_hp=100,
+                total_completed=0, total_failed=0, max_level_reached=1)
+    session.add(user)
+    await session.commit()
+    return user
+
+
+async def counter(session, user) -> int:
+    await session.refresh(user)
+    return user.active_task_count
+
+
+class TestActiveTaskCount:
+    """Counter follows every task state change."""
+
+    async def test_create_complete_delete(self, session, user):
+        deadline = datetime.utcnow() + timedelta(days=1)
+        first = await create_task(session, user.id, "first", TaskDifficulty.EASY, deadline)
+        second = await create_task(session, user.id, "second", TaskDifficulty.EASY, deadline)
+        third = await create_task(session, user.id, "third", TaskDifficulty.EASY, deadline)
+        assert await counter(session, user) == 3
+
+        await complete_task(session, first.id, user.id)
+        assert await counter(session, user) == 2
+
+        await delete_task(session, second.id, user.id)
+        assert await counter(session, user) == 1
+        assert await count_active_tasks(session, user.id) == 1
+
+    async def test_delete_completed_keeps_counter(self, session, user):
+        """Deleting a non-active task does not change the counter."""
+        task = await create_task(session, user.id, "task", TaskDifficulty.EASY,
+                                 datetime.utcnow() + timedelta(days=1))
+        await complete_task(session, task.id, user.id)
+        await delete_task(session, task.id, user.id)
+        assert await counter(session, user) == 0
+
+    async def test_fail_and_death(self, session, user):
+        now = datetime.utcnow()
+        await create_task(session, user.id, "overdue", TaskDifficulty.EASY, now + timedelta(minutes=1))
+        await create_task(session, user.id, "later", TaskDifficulty.EASY, now + timedelta(days=1))
+
+        await fail_overdue_tasks(session, now + timedelta(minutes=2))
+        await session.commit()
+        assert await counter(session, user) == 1
+
+        await create_task(session, user.id, "deadly", TaskDifficulty.EPIC, now + timedelta(minutes=1))
+        await session.execute(update(User).where(User.id == user.id).values(hp=10))
+        await fail_overdue_tasks(session, now + timedelta(minutes=2))
+        await session.commit()
+        assert await counter(session, user) == 0
+        assert await count_active_tasks(session, user.id) == 0
+
+    async def test_repair_drift(self, session, user):
+        await create_task(session, user.id, "task", TaskDifficulty.EASY,
+                          datetime.utcnow() + timedelta(days=1))
+        await session.execute(update(User).where(User.id == user.id).values(active_task_count=7))
+        await session.commit()
+
+        assert await repair_active_task_counts(session) == 1
+        assert await counter(session, user) == 1
+        assert await repair_active_task_counts(session) == 0
@@ -0,0 +1,156 @@
+"""Tests for skipping users who blocked the bot."""
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from aiogram.methods import SendMessage
+from aiogram.exceptions import TelegramForbiddenError
+from sqlalchemy import select, update
+from database.models import User, Task, TaskDifficulty, TaskStatus, OutboxMessage
+from database.task_repo import fail_overdue_tasks, get_tasks_for_reminder, get_upcoming_deadlines
+from database.user_repo import get_or_create_user, mark_users_blocked, reactivate_user
+from database.user_cache import UserSnapshot
+from bot.logic.dispatcher import NotificationDispatcher
+from bot.logic.outbox import OutboxDrainer, enqueue_notifications
+from bot.middlewares import DbSessionMiddleware
+from tests.test_dispatcher import FakeBot
+
+NOW = datetime(2025, 1, 1, 12, 0)
+
+
+@pytest.fixture
+async def users(session):
+    """Two users with an overdue and a soon-due task each, the second blocked."""
+    reachable = User(telegram_id=1)
+    blocked = User(telegram_id=2, blocked_at=NOW - timedelta(days=1))
+    for user in (reachable, blocked):
+        session.add_all([
+            Task(user=user, title="late", difficulty=TaskDifficulty.EASY,
+                 deadline=NOW - timedelta(minutes=5), status=TaskStatus.ACTIVE),
+            Task(user=user, title="soon", difficulty=TaskDifficulty.EASY,
+                 deadline=NOW + timedelta(minutes=30), status=TaskStatus.ACTIVE,
+                 next_remind_at=NOW - timedelta(minutes=30)),
+        ])
+    await session.commit()
+    return reachable, blocked
+
+
+class TestSweepsSkipBlocked:
+    """Blocked users get no damage, reminders or timer entries."""
+
+    async def test_overdue(self, session, users):
+        reachable, blocked = users
+        results = await fail_overdue_tasks(session, NOW)
+        await session.commit()
+
+        assert [result.user_id for result in results] == [reachable.id]
+        statuses = (await session.execute(
+            select(Task.status).where(Task.user_id == blocked.id)
+        )).scalars().all()
+        assert statuses == [TaskStatus.ACTIVE, TaskStatus.ACTIVE]
+
+    async def test_reminders_and_timer(self, session, users):
+        reachable, _ = users
+        reminders = await get_tasks_for_reminder(session, NOW)
+        upcoming = await get_upcoming_deadlines(session, NOW + timedelta(hours=1))
+
+        assert {task.user_id for task in reminders} == {reachable.id}
+        assert len(upcoming) == 2
+
+    async def test_start_reenables(self, session, users):
+        reachable, blocked = users
+        user, is_new = await get_or_create_user(session, 2)
+        await session.commit()
+
+        assert not is_new
+        assert user.reachable
+        # The paused backlog doesn't fail on return
+        results = await fail_overdue_tasks(session, datetime.utcnow())
+        assert [result.user_id for result in results] == [reachable.id]
+
+    async def test_mark_only_once(self, session, users):
+        assert await mark_users_blocked(session, [1, 2], NOW) == 1
+
+
+class TestReturningUser:
+    """A user back after blocking resumes their tasks where they paused."""
+
+    async def test_deadlines_keep_time_left(self, session, users):
+        _, blocked = users
+        back = NOW + timedelta(days=2)  # blocked for 3 days
+
+        moved = await reactivate_user(session, blocked, back)
+        await session.commit()
+
+        assert len(moved) == 2
+        tasks = {task.title: task for task in (await session.execute(
+            select(Task).where(Task.user_id == blocked.id)
+        )).scalars()}
+        # Left when blocking: a day minus 5 minutes and a day plus 30 minutes
+        assert tasks["late"].deadline - back == timedelta(days=1, minutes=-5)
+        assert tasks["soon"].deadline - back == timedelta(days=1, minutes=30)
+        assert tasks["soon"].next_remind_at == tasks["soon"].deadline - timedelta(hours=1)
+        results = await fail_overdue_tasks(session, back + timedelta(hours=1))
+        assert blocked.id not in [result.user_id for result in results]
+
+    async def test_resumed_once(self, session, users):
+        """A second update with the stale snapshot doesn't move the tasks again."""
+        _, blocked = users
+        snapshot = UserSnapshot.from_user(blocked)
+
+        assert len(await reactivate_user(session, snapshot, NOW)) == 2
+        assert await reactivate_user(session, snapshot, NOW) == []
+
+    async def test_any_update_reenables(self, session_factory, users):
+        """Tapping a button is enough, /start isn't required."""
+        callback = MagicMock()
+        callback.data = "1m"
+        handler = AsyncMock()
+
+        await DbSessionMiddleware(session_factory)(
+            handler, callback, {"event_from_user": SimpleNamespace(id=2)}
+        )
+
+        assert handler.call_args.args[1]["user"].blocked_at is None
+        async with session_factory() as session:
+            blocked_at = await session.scalar(select(User.blocked_at).where(User.telegram_id == 2))
+            results = await fail_overdue_tasks(session, datetime.utcnow())
+        assert blocked_at is None
+        assert [result.telegram_id for result in results] == [1]
+
+
+class TestDrainMarksBlocked:
+    """403 from Telegram marks the user and drops their pending messages."""
+
+    async def test_forbidden(self, session_factory):
+        async with session_factory() as session:
+            session.add_all([User(telegram_id=1), User(telegram_id=2)])
+            await enqueue_notifications(session, [(1, "first", None), (2, "other", None)])
+            await session.flush()
+            await enqueue_notifications(session, [(1, "later", None)])
+            await session.flush()
+            # Second message to the chat is not due yet
+            await session.execute(
+                update(OutboxMessage).where(OutboxMessage.text == "later")
+                .values(next_attempt_at=datetime.utcnow() + timedelta(hours=1))
+            )
+            await session.commit()
+
+        method = SendMessage(chat_id=1, text="first")
+        bot = FakeBot([TelegramForbiddenError(method, "bot was blocked by the user")])
+        dispatcher = NotificationDispatcher(workers=1, global_rate=1000, chat_rate=1000)
+        dispatcher.start(bot)
+        try:
+            drainer = OutboxDrainer(session_factory=session_factory, dispatcher=dispatcher)
+            assert await drainer.drain_once() == 2
+        finally:
+            await dispatcher.stop()
+
+        async with session_factory() as session:
+            blocked = (await session.execute(
+                select(User.telegram_id).where(User.blocked_at.is_not(None))
+            )).scalars().all()
+            left = (await session.execute(select(OutboxMessage))).scalars().all()
+        assert blocked == [1]
+        assert left == []
+        assert bot.sent == [(2, "other")]
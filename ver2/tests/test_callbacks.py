@@ -0,0 +1,124 @@
+"""Tests for callback data codec and routing."""
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+from bot.callbacks import (
+    Op, ARGS, CallbackAction, CallbackDataError, CALLBACK_DATA_MAX_LEN,
+    encode_callback, decode_callback, route_callback
+)
+from bot.handlers.task_create import NewTaskStates
+from database.task_repo import PageCursor
+
+
+SAMPLE_ARGS = {
+    Op.TASK_DIFFICULTY: "epic",
+    Op.TASK_DEADLINE: "tom_evening",
+    Op.TASK_LIST_PAGE: PageCursor(datetime(2026, 3, 1, 18, 0, 0, 123456), 123456789, forward=True),
+    Op.TASK_FAILED_PAGE: PageCursor(datetime(2025, 1, 1), 1, forward=False),
+    Op.TASK_DETAIL: 123456789,
+    Op.TASK_DONE: 0,
+    Op.TASK_DELETE: 2**63 - 1,
+}
+
+
+class TestCodec:
+    """Compact encoding, legacy data and rejections."""
+
+    @pytest.mark.parametrize("op", list(Op))
+    def test_round_trip(self, op):
+        arg = SAMPLE_ARGS.get(op)
+        data = encode_callback(op, arg)
+
+        assert decode_callback(data) == CallbackAction(op, arg)
+        assert len(data.encode()) <= CALLBACK_DATA_MAX_LEN
+
+    def test_compact(self):
+        assert encode_callback(Op.MENU) == "1m"
+        assert encode_callback(Op.TASK_DETAIL, 100) == "1d2s"
+
+    def test_every_argument_op_sampled(self):
+        assert set(ARGS) == set(SAMPLE_ARGS)
+
+    @pytest.mark.parametrize("data, action", [
+        ("menu", CallbackAction(Op.MENU)),
+        ("screen:stats", CallbackAction(Op.STATS)),
+        ("task:detail:100", CallbackAction(Op.TASK_DETAIL, 100)),
+        ("task:done:7", CallbackAction(Op.TASK_DONE, 7)),
+        ("task:diff:hard", CallbackAction(Op.TASK_DIFFICULTY, "hard")),
+        ("task:dl:tom_morning", CallbackAction(Op.TASK_DEADLINE, "tom_morning")),
+    ])
+    def test_legacy(self, data, action):
+        """Buttons of already sent messages keep working."""
+        assert decode_callback(data) == action
+
+    @pytest.mark.parametrize("data", [
+        None, "", "2m", "1?", "1m1", "1d", "1dX", "1d-1", "1yq", "1pn12", "1px1.2",
+        "task:detail:abc", "task:detail:", "task:diff:legendary", "screen:unknown",
+    ])
+    def test_rejected(self, data):
+        with pytest.raises(CallbackDataError):
+            decode_callback(data)
+
+    def test_encode_checks_argument(self):
+        with pytest.raises(ValueError):
+            encode_callback(Op.TASK_DONE)
+        with pytest.raises(ValueError):
+            encode_callback(Op.MENU, 1)
+
+
+def make_callback(data: str) -> MagicMock:
+    callback = MagicMock()
+    callback.data = data
+    callback.from_user.id = 42
+    callback.answer = AsyncMock()
+    return callback
+
+
+def make_state(current: str = None) -> MagicMock:
+    state = MagicMock()
+    state.get_state = AsyncMock(return_value=current)
+    return state
+
+
+class TestRouteCallback:
+    """Dispatch table lookup, argument injection and FSM guard."""
+
+    async def test_routes_with_argument(self, monkeypatch):
+        handler = AsyncMock()
+        monkeypatch.setattr("bot.handlers.task_list.get_task_by_id", handler)
+        handler.return_value = None
+        callback = make_callback(encode_callback(Op.TASK_DETAIL, 100))
+        session = object()
+
+        await route_callback(callback, session=session, user=MagicMock(id=5), bot=object())
+
+        handler.assert_awaited_once_with(session, 100, 5)
+
+    async def test_malformed_data_answered(self):
+        callback = make_callback("9zz")
+
+        assert await route_callback(callback, state=make_state()) is None
+        assert "/start" in callback.answer.call_args.args[0]
+
+    async def test_wrong_state_answered(self):
+        """A difficulty button outside the creation flow does nothing."""
+        callback = make_callback(encode_callback(Op.TASK_DIFFICULTY, "easy"))
+        state = make_state(None)
+
+        await route_callback(callback, state=state)
+
+        state.update_data.assert_not_called()
+        assert "/start" in callback.answer.call_args.args[0]
+
+    async def test_right_state_runs_handler(self, monkeypatch):
+        monkeypatch.setattr("bot.handlers.task_create.safe_edit_text", AsyncMock())
+        callback = make_callback(encode_callback(Op.TASK_DIFFICULTY, "hard"))
+        state = make_state(NewTaskStates.difficulty.state)
+        state.update_data = AsyncMock()
+        state.set_state = AsyncMock()
+        state.get_data = AsyncMock(return_value={"title": "t"})
+
+        await route_callback(callback, state=state)
+
+        state.update_data.assert_awaited_once_with(difficulty="hard")
+        state.set_state.assert_awaited_once_with(NewTaskStates.deadline)
@@ -0,0 +1,80 @@
+"""Tests for atomic task completion with reward."""
+import pytest
+from datetime import datetime, timedelta
+from database.models import User, Task, TaskDifficulty, TaskStatus
+from database.task_repo import create_task, complete_task_with_reward
+
+
+@pytest.fixture
+async def user(session):
+    user = User(telegram_id=1, level=1, xp=50, hp=70, max_hp=100,
+                total_completed=0, total_failed=0, max_level_reached=1)
+    session.add(user)
+    await session.commit()
+    return user
+
+
+async def make_task(session, user, difficulty=TaskDifficulty.EASY) -> Task:
+    return await create_task(session, user.id, "task", difficulty, datetime.utcnow() + timedelta(days=1))
+
+
+class TestCompleteTaskWithReward:
+    """Task status and user stats change together."""
+
+    async def test_reward(self, session, user):
+        task = await make_task(session, user, TaskDifficulty.EASY)
+
+        result = await complete_task_with_reward(session, task.id, user.id)
+
+        assert result.xp_gained == 10
+        assert result.level_ups == []
+        assert result.user.xp == 60
+        assert result.user.total_completed == 1
+        assert result.user.active_task_count == 0
+        await session.refresh(task)
+        assert task.status == TaskStatus.COMPLETED
+        assert task.completed_at is not None
+
+    async def test_level_up(self, session, user):
+        task = await make_task(session, user, TaskDifficulty.EPIC)
+
+        result = await complete_task_with_reward(session, task.id, user.id)
+
+        # 50 + 100 XP: level 2 costs 100, 50 left over
+        assert result.level_ups == [2]
+        assert result.user.level == 2
+        assert result.user.xp == 50
+        assert result.user.max_hp == 110
+        assert result.user.max_level_reached == 2
+        assert result.user.hp == 70
+        await session.refresh(user)
+        assert (user.level, user.xp, user.max_hp) == (2, 50, 110)
+
+    async def test_double_tap_rewards_once(self, session, user):
+        task = await make_task(session, user)
+
+        first = await complete_task_with_reward(session, task.id, user.id)
+        second = await complete_task_with_reward(session, task.id, user.id)
+
+        assert first is not None
+        assert second is None
+        await session.refresh(user)
+        assert user.xp == 60
+        assert user.total_completed == 1
+
+    async def test_foreign_task_not_completed(self, session, user):
+        other = User(telegram_id=2, level=1, xp=0, hp=100, max_hp=100,
+                     total_completed=0, total_failed=0, max_level_reached=1)
+        session.add(other)
+        await session.commit()
+        task = await make_task(session, other)
+
+        assert await complete_task_with_reward(session, task.id, user.id) is None
+
+    async def test_statement_count(self, session, user, query_counter):
+        task = await make_task(session, user)
+        query_counter.reset()
+
+        await complete_task_with_reward(session, task.id, user.id)
+
+        assert query_counter.count == 2
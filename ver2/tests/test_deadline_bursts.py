@@ -0,0 +1,108 @@
+"""Tests for smoothing the load of quick-deadline bursts."""
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from database.models import User, Task, TaskDifficulty, TaskStatus, OutboxMessage
+from database.task_repo import prewarm_deadline_burst, get_deadline_histogram
+from bot.logic import reminders, tasks
+from bot.logic.outbox import SendSchedule
+from bot.logic.reminders import next_reminder_time, advance_reminder
+
+NOW = datetime(2025, 1, 1, 12, 0)
+
+
+async def seed_deadlines(session, deadlines: list[datetime]) -> None:
+    """One user per task so every notification is a separate message."""
+    for i, deadline in enumerate(deadlines):
+        user = User(telegram_id=i + 1, active_task_count=1, digest_threshold=0)
+        session.add(Task(user=user, title=f"task {i}", difficulty=TaskDifficulty.EASY,
+                         deadline=deadline, status=TaskStatus.ACTIVE))
+    await session.commit()
+
+
+class TestSendSchedule:
+    """Send times of a sweep's notifications."""
+
+    def test_spread_across_chunks(self):
+        schedule = SendSchedule(rate=10, max_window=timedelta(minutes=5), now=NOW)
+
+        first = schedule.take(2)
+        second = schedule.take(2)
+
+        assert first + second == [NOW + timedelta(seconds=s) for s in (0, 0.1, 0.2, 0.3)]
+
+    def test_capped_at_window(self):
+        schedule = SendSchedule(rate=1, max_window=timedelta(seconds=2), now=NOW)
+        assert schedule.take(4)[-2:] == [NOW + timedelta(seconds=2)] * 2
+
+    def test_zero_rate_sends_now(self):
+        assert SendSchedule(rate=0, now=NOW).take(3) == [NOW] * 3
+
+    async def test_overdue_sweep_staggers_outbox(self, monkeypatch, session_factory):
+        monkeypatch.setattr(tasks, "sweep_session", session_factory)
+        monkeypatch.setattr(tasks.outbox_drainer, "wake", lambda: None)
+        async with session_factory() as session:
+            await seed_deadlines(session, [datetime.utcnow() - timedelta(minutes=1)] * 5)
+
+        await tasks.check_deadlines()
+
+        async with session_factory() as session:
+            times = (await session.execute(
+                select(OutboxMessage.next_attempt_at).order_by(OutboxMessage.next_attempt_at)
+            )).scalars().all()
+        assert len(set(times)) == 5
+        assert times[-1] - times[0] == timedelta(seconds=4 / 20)
+
+
+class TestReminderSpread:
+    """Reminders move up to REMINDER_SPREAD ahead of their horizon."""
+
+    def test_moved_earlier(self, monkeypatch):
+        monkeypatch.setattr(reminders, "REMINDER_SPREAD", timedelta(minutes=5))
+        deadline = NOW + timedelta(hours=5)
+        horizon = deadline - timedelta(hours=1)
+
+        times = {next_reminder_time(deadline, (60,), NOW) for _ in range(20)}
+
+        assert len(times) > 1
+        assert all(horizon - timedelta(minutes=5) <= remind_at <= horizon for remind_at in times)
+
+    def test_never_before_now(self, monkeypatch):
+        monkeypatch.setattr(reminders, "REMINDER_SPREAD", timedelta(minutes=5))
+        deadline = NOW + timedelta(minutes=61)
+
+        assert NOW < next_reminder_time(deadline, (60,), NOW) <= NOW + timedelta(minutes=1)
+
+    def test_early_reminder_not_repeated(self, monkeypatch):
+        """A reminder sent ahead of its horizon moves on to the next one."""
+        monkeypatch.setattr(reminders, "REMINDER_SPREAD", timedelta(minutes=5))
+        deadline = NOW + timedelta(hours=1, minutes=3)
+
+        remind_at = advance_reminder(deadline, (180, 60, 10), NOW)
+
+        assert deadline - timedelta(minutes=15) <= remind_at <= deadline - timedelta(minutes=10)
+
+
+class TestBurstQueries:
+    """Prewarm and histogram of clustered deadlines."""
+
+    async def test_prewarm_threshold(self, session, query_counter):
+        burst = NOW + timedelta(minutes=2)
+        await seed_deadlines(session, [burst] * 3 + [burst + timedelta(minutes=5)])
+
+        query_counter.reset()
+        assert await prewarm_deadline_burst(session, burst, burst + timedelta(minutes=1), 5) == 3
+        assert query_counter.count == 1
+
+        assert await prewarm_deadline_burst(session, burst, burst + timedelta(minutes=1), 3) == 3
+        assert query_counter.count == 4
+
+    async def test_histogram(self, session):
+        await seed_deadlines(session, [
+            NOW + timedelta(hours=6), NOW + timedelta(hours=6), NOW + timedelta(hours=6, minutes=4),
+            NOW + timedelta(hours=6, minutes=5), NOW + timedelta(days=3),
+        ])
+
+        buckets = await get_deadline_histogram(session, NOW, NOW + timedelta(days=1), timedelta(minutes=5))
+
+        assert buckets == [(NOW + timedelta(hours=6), 3), (NOW + timedelta(hours=6, minutes=5), 1)]
@@ -0,0 +1,64 @@
+"""Tests for in-process deadline timer."""
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from bot.logic.deadline_timer import DeadlineTimer
+
+
+class TestDeadlineTimer:
+    """Tests for heap bookkeeping of the deadline timer."""
+
+    def test_pop_due_in_deadline_order(self):
+        """Due tasks are popped, future ones stay."""
+        now = datetime(2025, 1, 1, 12, 0)
+        timer = DeadlineTimer(timedelta(hours=1))
+        timer.schedule(1, now + timedelta(minutes=5), now)
+        timer.schedule(2, now - timedelta(minutes=1), now)
+        timer.schedule(3, now, now)
+
+        assert timer.pop_due(now) == [2, 3]
+        assert len(timer) == 1
+        assert timer.next_deadline() == now + timedelta(minutes=5)
+
+    def test_cancel(self):
+        """Cancelled task is never reported as due."""
+        now = datetime(2025, 1, 1, 12, 0)
+        timer = DeadlineTimer(timedelta(hours=1))
+        timer.schedule(1, now, now)
+        timer.cancel(1)
+
+        assert timer.pop_due(now) == []
+        assert timer.next_deadline() is None
+
+    def test_reschedule_reports_once(self):
+        """Moved deadline fires only at the new time."""
+        now = datetime(2025, 1, 1, 12, 0)
+        timer = DeadlineTimer(timedelta(hours=1))
+        timer.schedule(1, now, now)
+        timer.schedule(1, now + timedelta(minutes=10), now)
+
+        assert timer.pop_due(now) == []
+        assert timer.pop_due(now + timedelta(minutes=10)) == [1]
+
+    def test_beyond_horizon_ignored(self):
+        """Deadlines beyond the horizon are left for the next reload."""
+        now = datetime(2025, 1, 1, 12, 0)
+        timer = DeadlineTimer(timedelta(hours=1))
+        timer.schedule(1, now + timedelta(hours=2), now)
+
+        assert len(timer) == 0
+
+    async def test_runner_fires_at_deadline(self):
+        """Runner calls back with due task IDs."""
+        timer = DeadlineTimer(timedelta(hours=1))
+        fired = asyncio.Queue()
+
+        async def on_due(task_ids):
+            await fired.put(task_ids)
+
+        timer.start(on_due)
+        timer.schedule(7, datetime.utcnow() + timedelta(milliseconds=50))
+        try:
+            assert await asyncio.wait_for(fired.get(), 2) == [7]
+        finally:
+            await timer.stop()
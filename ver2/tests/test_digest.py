@@ -0,0 +1,101 @@
+"""Tests for grouping sweep notifications into digests."""
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy import select
+from database.models import User, Task, TaskDifficulty, TaskStatus, OutboxMessage
+from database.user_repo import get_cached_user
+from bot.handlers.settings import cmd_digest
+from bot.logic import notifications, tasks
+from bot.logic.outbox import wants_digest
+
+
+@pytest.fixture
+def sweeps(monkeypatch, session_factory):
+    """Run the sweeps on the test database without waking the drainer."""
+    for module in (notifications, tasks):
+        monkeypatch.setattr(module, "sweep_session", session_factory)
+        monkeypatch.setattr(module.outbox_drainer, "wake", lambda: None)
+
+
+async def seed(session_factory, deadlines: dict[int, list[timedelta]], thresholds: dict[int, int] = None):
+    """Users by telegram_id with active tasks due at now + offset."""
+    now = datetime.utcnow()
+    thresholds = thresholds or {}
+    async with session_factory() as session:
+        for telegram_id, offsets in deadlines.items():
+            user = User(telegram_id=telegram_id, digest_threshold=thresholds.get(telegram_id),
+                        active_task_count=len(offsets))
+            session.add(user)
+            session.add_all([
+                Task(user=user, title=f"task {i}", difficulty=TaskDifficulty.EASY,
+                     deadline=now + offset, status=TaskStatus.ACTIVE,
+                     next_remind_at=now + offset - timedelta(hours=1))
+                for i, offset in enumerate(offsets)
+            ])
+        await session.commit()
+
+
+async def outbox(session_factory) -> list[OutboxMessage]:
+    async with session_factory() as session:
+        return list((await session.execute(select(OutboxMessage).order_by(OutboxMessage.id))).scalars())
+
+
+class TestWantsDigest:
+    """Threshold semantics."""
+
+    @pytest.mark.parametrize("count, threshold, expected", [
+        (1, 1, False), (2, 1, True), (2, 3, False), (3, 3, True), (10, 0, False), (3, None, True),
+    ])
+    def test_threshold(self, count, threshold, expected):
+        assert wants_digest(count, threshold) is expected
+
+
+class TestSweepDigests:
+    """One message per user above the threshold, individual ones below."""
+
+    async def test_reminders(self, sweeps, session_factory):
+        soon = [timedelta(minutes=m) for m in (10, 20, 30)]
+        await seed(session_factory, {1: soon, 2: soon, 3: soon[:1]}, thresholds={2: 0})
+
+        await notifications.check_upcoming_deadlines()
+
+        messages = await outbox(session_factory)
+        by_chat = {chat: [m for m in messages if m.chat_id == chat] for chat in (1, 2, 3)}
+        assert len(by_chat[1]) == 1
+        assert "задач (3)" in by_chat[1][0].text
+        assert by_chat[1][0].text.index("task 0") < by_chat[1][0].text.index("task 2")
+        assert by_chat[1][0].reply_markup.count('"callback_data"') == 4
+        assert len(by_chat[2]) == 3
+        assert len(by_chat[3]) == 1
+
+    async def test_overdue(self, sweeps, session_factory):
+        late = [timedelta(minutes=-m) for m in (1, 2, 3)]
+        await seed(session_factory, {1: late, 2: late}, thresholds={2: 5})
+
+        await tasks.check_deadlines()
+
+        messages = await outbox(session_factory)
+        first = [m for m in messages if m.chat_id == 1]
+        assert len(first) == 1
+        assert "Просрочено задач: 3" in first[0].text
+        assert "-15 HP" in first[0].text
+        assert len([m for m in messages if m.chat_id == 2]) == 3
+
+
+class TestDigestCommand:
+    """/digest shows and changes the user's threshold."""
+
+    async def test_set_and_reset(self, session_factory):
+        await seed(session_factory, {1: []})
+        message = MagicMock()
+        message.answer = AsyncMock()
+        for arg, expected in (("5", 5), ("off", 0), ("default", None), ("abc", None)):
+            async with session_factory() as session:
+                user = await get_cached_user(session, 1)
+                await cmd_digest(message, SimpleNamespace(args=arg), session, user)
+            async with session_factory() as session:
+                assert (await get_cached_user(session, 1)).digest_threshold == expected
+
+        assert "❌" in message.answer.call_args.args[0]
@@ -0,0 +1,105 @@
+"""Tests for rate-limited notification dispatcher."""
+import asyncio
+import pytest
+from aiogram.methods import SendMessage
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError
+from bot.logic.dispatcher import TokenBucket, NotificationDispatcher, Delivery
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeBot:
+    """Records sent messages, raises queued errors first."""
+
+    def __init__(self, errors=None):
+        self.sent = []
+        self.errors = list(errors or [])
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((chat_id, text))
+
+
+class TestTokenBucket:
+    """Tests for token bucket math."""
+
+    def test_burst_up_to_capacity(self):
+        """Full bucket serves capacity tokens without waiting."""
+        bucket = TokenBucket(rate=30, clock=FakeClock())
+        delays = [bucket.reserve() for _ in range(30)]
+        assert all(delay == 0 for delay in delays)
+
+    def test_reservations_are_spaced(self):
+        """Over capacity, reservations wait 1/rate apart."""
+        bucket = TokenBucket(rate=10, capacity=1, clock=FakeClock())
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(0.1)
+        assert bucket.reserve() == pytest.approx(0.2)
+
+    def test_refill(self):
+        """Tokens refill over time."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=1, clock=clock)
+        bucket.reserve()
+        assert not bucket.is_idle()
+        clock.now = 1.0
+        assert bucket.is_idle()
+        assert bucket.reserve() == 0
+
+
+class TestNotificationDispatcher:
+    """Tests for delivery and error handling."""
+
+    async def test_delivers_all(self):
+        """All queued messages are delivered."""
+        bot = FakeBot()
+        dispatcher = NotificationDispatcher(workers=4, global_rate=1000, chat_rate=1000)
+        dispatcher.start(bot)
+        futures = [await dispatcher.send(chat_id, "hi") for chat_id in range(20)]
+        assert await asyncio.gather(*futures) == [Delivery.SENT] * 20
+        await dispatcher.stop()
+        assert len(bot.sent) == 20
+
+    async def test_retry_after(self):
+        """Flood control pauses and retries the message."""
+        method = SendMessage(chat_id=1, text="hi")
+        bot = FakeBot([TelegramRetryAfter(method, "Too Many Requests", retry_after=0)])
+        dispatcher = NotificationDispatcher(workers=1, global_rate=1000, chat_rate=1000)
+        dispatcher.start(bot)
+        future = await dispatcher.send(1, "hi")
+        assert await future == Delivery.SENT
+        await dispatcher.stop()
+        assert bot.sent == [(1, "hi")]
+
+    async def test_busy_chat_does_not_delay_others(self):
+        """A burst to one chat waits for its bucket without holding the workers."""
+        bot = FakeBot()
+        dispatcher = NotificationDispatcher(workers=2, global_rate=1000, chat_rate=5)
+        dispatcher.start(bot)
+        busy = [await dispatcher.send(1, f"busy {i}") for i in range(4)]
+        other = await dispatcher.send(2, "other")
+
+        assert await asyncio.wait_for(other, 0.1) == Delivery.SENT
+        assert (1, "busy 1") not in bot.sent
+        assert await asyncio.gather(*busy) == [Delivery.SENT] * 4
+        await dispatcher.stop()
+        assert [text for chat_id, text in bot.sent if chat_id == 1] == [f"busy {i}" for i in range(4)]
+
+    async def test_forbidden_gives_up(self):
+        """Blocked chat is not retried and reported as blocked."""
+        method = SendMessage(chat_id=1, text="hi")
+        bot = FakeBot([TelegramForbiddenError(method, "bot was blocked by the user")])
+        dispatcher = NotificationDispatcher(workers=1, global_rate=1000, chat_rate=1000)
+        dispatcher.start(bot)
+        future = await dispatcher.send(1, "hi")
+        assert await future == Delivery.BLOCKED
+        await dispatcher.stop()
+        assert bot.sent == []
+        assert dispatcher.failed == 1
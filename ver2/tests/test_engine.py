@@ -0,0 +1,42 @@
+"""Tests for connection pool metrics."""
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from database.engine import PoolMetrics, TimedQueuePool
+
+
+class TestPoolMetrics:
+    """Checkout wait times are recorded per pool."""
+
+    def test_snapshot_reset(self):
+        metrics = PoolMetrics("test")
+        metrics.record(0.010)
+        metrics.record(0.030)
+
+        stats = metrics.snapshot(reset=True)
+
+        assert stats["checkouts"] == 2
+        assert round(stats["avg_wait_ms"]) == 20
+        assert round(stats["max_wait_ms"]) == 30
+        assert metrics.snapshot()["checkouts"] == 0
+
+    async def test_wait_for_busy_pool(self, tmp_path):
+        """Second checkout waits until the only connection is returned."""
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+            poolclass=TimedQueuePool, pool_size=1, max_overflow=0
+        )
+        engine.pool.metrics = metrics = PoolMetrics("test")
+
+        async def hold(seconds: float):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                await asyncio.sleep(seconds)
+
+        try:
+            await asyncio.gather(hold(0.2), hold(0))
+        finally:
+            await engine.dispose()
+
+        assert metrics.checkouts == 2
+        assert metrics.max_wait >= 0.15
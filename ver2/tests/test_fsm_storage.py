@@ -0,0 +1,147 @@
+"""Tests for database-backed FSM storage."""
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, update
+from aiogram.fsm.storage.base import StorageKey
+from database.models import FsmRecord
+from bot.fsm_storage import SQLStorage
+from bot.handlers.task_create import NewTaskStates
+
+KEY = StorageKey(bot_id=1, chat_id=42, user_id=42)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_storage(session_factory, **kwargs) -> SQLStorage:
+    return SQLStorage(session_factory=session_factory, flush_delay=kwargs.pop("flush_delay", 60), **kwargs)
+
+
+async def count_records(session_factory) -> int:
+    async with session_factory() as session:
+        return await session.scalar(select(func.count()).select_from(FsmRecord))
+
+
+class TestSQLStorage:
+    """FSM state survives restarts and expires when abandoned."""
+
+    async def test_survives_restart(self, session_factory):
+        storage = make_storage(session_factory)
+        await storage.set_state(KEY, NewTaskStates.difficulty)
+        await storage.update_data(KEY, {"title": "Написать отчёт"})
+        await storage.close()
+
+        restarted = make_storage(session_factory)
+        assert await restarted.get_state(KEY) == NewTaskStates.difficulty.state
+        assert await restarted.get_data(KEY) == {"title": "Написать отчёт"}
+
+    async def test_writes_batched(self, session_factory, query_counter):
+        storage = make_storage(session_factory)
+        await storage.get_state(KEY)
+        query_counter.reset()
+
+        await storage.set_state(KEY, NewTaskStates.title)
+        await storage.update_data(KEY, {"title": "a"})
+        await storage.update_data(KEY, {"difficulty": "easy"})
+        assert query_counter.count == 0
+
+        await storage.flush()
+        assert query_counter.count == 1
+
+    async def test_clear_deletes_record(self, session_factory):
+        storage = make_storage(session_factory)
+        await storage.set_state(KEY, NewTaskStates.title)
+        await storage.flush()
+        assert await count_records(session_factory) == 1
+
+        await storage.set_state(KEY, None)
+        await storage.set_data(KEY, {})
+        await storage.close()
+
+        assert await count_records(session_factory) == 0
+
+    async def test_abandoned_flow_expires(self, session_factory):
+        storage = make_storage(session_factory, ttl=timedelta(hours=1))
+        await storage.set_state(KEY, NewTaskStates.deadline)
+        await storage.close()
+        async with session_factory() as session:
+            await session.execute(update(FsmRecord).values(updated_at=datetime.utcnow() - timedelta(hours=2)))
+            await session.commit()
+
+        restarted = make_storage(session_factory, ttl=timedelta(hours=1))
+        assert await restarted.get_state(KEY) is None
+
+        await restarted.purge_expired()
+        assert await count_records(session_factory) == 0
+
+    async def test_delayed_flush(self, session_factory):
+        storage = make_storage(session_factory, flush_delay=0.01)
+        await storage.set_state(KEY, NewTaskStates.title)
+        await storage._flush_task
+
+        assert await count_records(session_factory) == 1
+
+
+class TestSeveralProcesses:
+    """Two storages on one database, like two bot replicas."""
+
+    async def test_write_visible_after_fresh_window(self, session_factory):
+        clock = FakeClock()
+        first = make_storage(session_factory)
+        second = make_storage(session_factory, fresh_for=1, clock=clock)
+        assert await second.get_state(KEY) is None
+
+        await first.set_state(KEY, NewTaskStates.deadline)
+        await first.update_data(KEY, {"title": "a"})
+        await first.flush()
+        assert await second.get_state(KEY) is None  # cached "no state" still fresh
+
+        clock.now = 1.5
+        assert await second.get_state(KEY) == NewTaskStates.deadline.state
+        assert await second.get_data(KEY) == {"title": "a"}
+
+    async def test_finished_flow_visible(self, session_factory):
+        """A flow finished on one replica doesn't linger on the other."""
+        clock = FakeClock()
+        first = make_storage(session_factory, fresh_for=1, clock=clock)
+        second = make_storage(session_factory, fresh_for=1, clock=clock)
+        await first.set_state(KEY, NewTaskStates.title)
+        await first.flush()
+        clock.now = 1.5
+        assert await second.get_state(KEY) == NewTaskStates.title.state
+
+        await second.set_state(KEY, None)
+        await second.flush()
+        clock.now = 3.0
+
+        assert await first.get_state(KEY) is None
+
+    async def test_unflushed_write_served_from_cache(self, session_factory):
+        clock = FakeClock()
+        storage = make_storage(session_factory, fresh_for=1, clock=clock)
+        await storage.set_state(KEY, NewTaskStates.title)
+        clock.now = 5.0
+
+        assert await storage.get_state(KEY) == NewTaskStates.title.state
+        assert await count_records(session_factory) == 0
+
+    async def test_reads_keep_record_age(self, session_factory):
+        """Reading an abandoned flow doesn't extend its TTL."""
+        written = datetime.utcnow() - timedelta(minutes=50)
+        storage = make_storage(session_factory, ttl=timedelta(hours=1))
+        await storage.set_state(KEY, NewTaskStates.deadline)
+        await storage.close()
+        async with session_factory() as session:
+            await session.execute(update(FsmRecord).values(updated_at=written))
+            await session.commit()
+
+        reader = make_storage(session_factory, ttl=timedelta(hours=1), fresh_for=0)
+        for _ in range(3):
+            assert await reader.get_state(KEY) == NewTaskStates.deadline.state
+        _, entry = await reader._load(KEY)
+
+        assert entry.updated_at == written
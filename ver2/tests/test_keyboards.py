@@ -0,0 +1,62 @@
+"""Tests for prebuilt and memoized keyboards and screen texts."""
+from dataclasses import replace
+from datetime import datetime
+from types import SimpleNamespace
+from database.models import TaskStatus
+from database.user_cache import UserSnapshot
+from bot import keyboards, texts
+
+
+def make_user(**overrides) -> UserSnapshot:
+    values = dict(id=1, telegram_id=42, username="player", level=2, xp=30, hp=80, max_hp=110,
+                  total_completed=3, total_failed=1, max_level_reached=2,
+                  created_at=datetime(2025, 1, 1), active_task_count=3)
+    values.update(overrides)
+    return UserSnapshot(**values)
+
+
+class TestKeyboards:
+    """Shared markups equal freshly built ones."""
+
+    def test_prebuilt_shared(self):
+        assert keyboards.back_to_menu_keyboard() is keyboards.back_to_menu_keyboard()
+        assert keyboards.difficulty_keyboard() == keyboards.difficulty_keyboard.__wrapped__()
+
+    def test_main_menu_per_count(self):
+        assert keyboards.main_menu_keyboard(3) is keyboards.main_menu_keyboard(3)
+        assert "(3)" in keyboards.main_menu_keyboard(3).inline_keyboard[0][1].text
+        assert keyboards.main_menu_keyboard(0).inline_keyboard[0][1].text == "📋 Мои задачи"
+
+    def test_deadline_rebuilt_next_minute(self, monkeypatch):
+        monkeypatch.setattr(keyboards.time, "time", lambda: 600.0)
+        first = keyboards.deadline_quick_keyboard()
+        assert keyboards.deadline_quick_keyboard() is first
+
+        monkeypatch.setattr(keyboards.time, "time", lambda: 660.0)
+        assert keyboards.deadline_quick_keyboard() is not first
+
+    def test_task_detail_by_status(self):
+        active = keyboards.task_detail_keyboard(SimpleNamespace(id=5, status=TaskStatus.ACTIVE))
+        done = keyboards.task_detail_keyboard(SimpleNamespace(id=5, status=TaskStatus.COMPLETED))
+
+        assert len(active.inline_keyboard[0]) == 2
+        assert len(done.inline_keyboard[0]) == 1
+
+
+class TestScreenTexts:
+    """Memoized texts follow the user's values."""
+
+    def test_menu_changes_with_hp(self):
+        user = make_user()
+        assert "80/110" in texts.main_menu_message(user)
+        assert "70/110" in texts.main_menu_message(replace(user, hp=70))
+
+    def test_character_changes_with_tasks(self):
+        user = make_user()
+        assert "Активных задач: 3" in texts.character_screen_message(user, 3, "—")
+        assert "Активных задач: 4" in texts.character_screen_message(user, 4, "—")
+
+    def test_statistics(self):
+        text = texts.statistics_screen_message(make_user())
+        assert "Успешность: 75%" in text
+        assert "01.01.2025" in text
@@ -0,0 +1,152 @@
+"""Tests for per-user ordered update processing."""
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+from aiogram import Bot, Router
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Chat, Message, Update, User
+from bot.middlewares import OrderedUpdatesMiddleware, ordered_dispatcher
+
+
+def make_update(update_id: int) -> Update:
+    return Update(update_id=update_id)
+
+
+def make_message_update(update_id: int, user_id: int) -> Update:
+    message = Message(
+        message_id=update_id,
+        date=datetime.now(),
+        chat=Chat(id=user_id, type="private"),
+        from_user=User(id=user_id, is_bot=False, first_name="player"),
+        text="next",
+    )
+    return Update(update_id=update_id, message=message)
+
+
+def user_data(user_id: int) -> dict:
+    return {"event_from_user": SimpleNamespace(id=user_id)}
+
+
+class Recorder:
+    """Handler recording start/finish order, blocked until released."""
+
+    def __init__(self):
+        self.events = []
+        self.running = 0
+        self.peak = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, event, data):
+        self.events.append(("start", event.update_id))
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await self.release.wait()
+        self.running -= 1
+        self.events.append(("end", event.update_id))
+        return event.update_id
+
+
+class TestOrderedUpdatesMiddleware:
+    """Ordering per user, parallelism across users, shedding."""
+
+    async def test_same_user_in_order(self):
+        middleware = OrderedUpdatesMiddleware(max_concurrency=10)
+        handler = Recorder()
+        tasks = [asyncio.create_task(middleware(handler, make_update(i), user_data(1))) for i in range(3)]
+        await asyncio.sleep(0.01)
+
+        assert handler.events == [("start", 0)]
+        handler.release.set()
+        assert await asyncio.gather(*tasks) == [0, 1, 2]
+        assert handler.events == [("start", 0), ("end", 0), ("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+        assert middleware._lanes == {}
+
+    async def test_users_in_parallel_within_limit(self):
+        middleware = OrderedUpdatesMiddleware(max_concurrency=2)
+        handler = Recorder()
+        tasks = [asyncio.create_task(middleware(handler, make_update(i), user_data(i))) for i in range(4)]
+        await asyncio.sleep(0.01)
+
+        assert handler.running == 2
+        assert middleware.stats()["pending"] == 2
+        handler.release.set()
+        await asyncio.gather(*tasks)
+        assert handler.peak == 2
+        assert middleware.stats()["processed"] == 4
+
+    async def test_shed_when_queue_full(self):
+        middleware = OrderedUpdatesMiddleware(max_concurrency=1, max_pending=1)
+        handler = Recorder()
+        first = asyncio.create_task(middleware(handler, make_update(1), user_data(1)))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(middleware(handler, make_update(2), user_data(2)))
+        await asyncio.sleep(0.01)
+
+        assert await middleware(handler, make_update(3), user_data(3)) is None
+        handler.release.set()
+        await asyncio.gather(first, second)
+        assert middleware.shed == 1
+        assert ("start", 3) not in handler.events
+
+    async def test_shed_after_max_wait(self):
+        now = [0.0]
+        middleware = OrderedUpdatesMiddleware(max_concurrency=1, max_wait=30, clock=lambda: now[0])
+        handler = Recorder()
+        first = asyncio.create_task(middleware(handler, make_update(1), user_data(1)))
+        await asyncio.sleep(0.01)
+        stale = asyncio.create_task(middleware(handler, make_update(2), user_data(2)))
+        await asyncio.sleep(0.01)
+
+        now[0] = 31
+        handler.release.set()
+        assert await first == 1
+        assert await stale is None
+        assert middleware.stats()["max_wait_ms"] == 31000
+
+    async def test_update_without_user_passes(self):
+        middleware = OrderedUpdatesMiddleware()
+
+        async def handler(event, data):
+            return "ok"
+
+        assert await middleware(handler, make_update(1), {}) == "ok"
+
+
+class Steps(StatesGroup):
+    first = State()
+    second = State()
+
+
+class TestOrderedDispatcher:
+    """The FSM state is read under the per-user lock."""
+
+    async def test_second_message_sees_updated_state(self):
+        storage = MemoryStorage()
+        bot = Bot("42:TEST")
+        dp = ordered_dispatcher(storage, OrderedUpdatesMiddleware())
+        router = Router()
+        seen = []
+
+        @router.message(Steps.first)
+        async def first_step(message: Message, state: FSMContext):
+            await asyncio.sleep(0.01)
+            await state.set_state(Steps.second)
+            seen.append("first")
+
+        @router.message(Steps.second)
+        async def second_step(message: Message, state: FSMContext):
+            seen.append("second")
+
+        dp.include_router(router)
+        await storage.set_state(StorageKey(bot_id=bot.id, chat_id=1, user_id=1), Steps.first)
+
+        await asyncio.gather(
+            dp.feed_update(bot, make_message_update(1, 1)),
+            dp.feed_update(bot, make_message_update(2, 1)),
+        )
+
+        assert seen == ["first", "second"]
+        await bot.session.close()
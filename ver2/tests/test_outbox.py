@@ -0,0 +1,81 @@
+"""Tests for notification outbox."""
+import pytest
+from datetime import datetime, timedelta
+from aiogram.methods import SendMessage
+from aiogram.exceptions import TelegramNetworkError
+from sqlalchemy import select
+from database.models import OutboxMessage
+from bot.keyboards import back_to_menu_keyboard
+from bot.logic.dispatcher import NotificationDispatcher
+from bot.logic.outbox import OutboxDrainer, enqueue_notifications
+from tests.test_dispatcher import FakeBot
+
+
+@pytest.fixture
+async def dispatcher():
+    dispatcher = NotificationDispatcher(workers=2, global_rate=1000, chat_rate=1000, max_retries=0)
+    yield dispatcher
+    await dispatcher.stop()
+
+
+class TestOutbox:
+    """Tests for outbox write and drain."""
+
+    async def test_drain_delivers_and_deletes(self, session_factory, dispatcher):
+        """Committed notifications are sent with keyboard and removed."""
+        bot = FakeBot()
+        dispatcher.start(bot)
+        async with session_factory() as session:
+            await enqueue_notifications(session, [
+                (1, "first", back_to_menu_keyboard()),
+                (2, "second", None),
+            ])
+            await session.commit()
+
+        drainer = OutboxDrainer(session_factory=session_factory, dispatcher=dispatcher)
+        assert await drainer.drain_once() == 2
+
+        assert sorted(bot.sent) == [(1, "first"), (2, "second")]
+        async with session_factory() as session:
+            assert (await session.execute(select(OutboxMessage))).all() == []
+
+    async def test_uncommitted_not_sent(self, session_factory, dispatcher):
+        """Rolled back notifications never reach the outbox."""
+        dispatcher.start(FakeBot())
+        async with session_factory() as session:
+            await enqueue_notifications(session, [(1, "lost", None)])
+            await session.rollback()
+
+        drainer = OutboxDrainer(session_factory=session_factory, dispatcher=dispatcher)
+        assert await drainer.drain_once() == 0
+
+    async def test_failed_rescheduled(self, session_factory, dispatcher):
+        """Transient failure keeps the message with backoff."""
+        method = SendMessage(chat_id=1, text="hi")
+        dispatcher.start(FakeBot([TelegramNetworkError(method, "timeout")]))
+        async with session_factory() as session:
+            await enqueue_notifications(session, [(1, "hi", None)])
+            await session.commit()
+
+        drainer = OutboxDrainer(session_factory=session_factory, dispatcher=dispatcher)
+        assert await drainer.drain_once() == 1
+        # Not due yet
+        assert await drainer.drain_once() == 0
+
+        async with session_factory() as session:
+            message = (await session.execute(select(OutboxMessage))).scalar_one()
+        assert message.attempts == 1
+        assert message.next_attempt_at > datetime.utcnow() + timedelta(seconds=5)
+
+    async def test_lease_hides_claimed(self, session_factory):
+        """Claimed batch is not handed to a second drainer."""
+        from database.outbox_repo import claim_outbox_batch
+        async with session_factory() as session:
+            await enqueue_notifications(session, [(1, "hi", None)])
+            await session.commit()
+
+        async with session_factory() as session:
+            first = await claim_outbox_batch(session, 10, timedelta(minutes=1))
+            second = await claim_outbox_batch(session, 10, timedelta(minutes=1))
+        assert len(first) == 1
+        assert second == []
@@ -0,0 +1,107 @@
+"""Tests for set-based overdue processing."""
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from database.models import User, Task, TaskDifficulty, TaskStatus
+from database.task_repo import fail_overdue_tasks
+
+
+def make_user(telegram_id: int, hp: int = 100, level: int = 1, max_hp: int = 100) -> User:
+    return User(
+        telegram_id=telegram_id, level=level, xp=0, hp=hp, max_hp=max_hp,
+        total_completed=0, total_failed=0, max_level_reached=level
+    )
+
+
+def make_task(user: User, difficulty: TaskDifficulty, deadline: datetime) -> Task:
+    return Task(user=user, title=f"{difficulty.value} task", difficulty=difficulty,
+                deadline=deadline, status=TaskStatus.ACTIVE)
+
+
+class TestFailOverdueTasks:
+    """Tests for the bulk overdue sweep (E9)."""
+
+    async def test_damage_summed_per_user(self, session):
+        """All overdue tasks of a user are failed and damage is summed."""
+        now = datetime(2025, 1, 1, 12, 0)
+        user = make_user(1)
+        session.add_all([
+            make_task(user, TaskDifficulty.EASY, now - timedelta(minutes=5)),
+            make_task(user, TaskDifficulty.HARD, now - timedelta(minutes=1)),
+            make_task(user, TaskDifficulty.EPIC, now + timedelta(hours=1)),
+        ])
+        await session.commit()
+
+        results = await fail_overdue_tasks(session, now)
+        await session.commit()
+
+        assert len(results) == 1
+        assert results[0].damage == 35
+        assert results[0].hp == 65
+        assert results[0].died is False
+        assert len(results[0].failed_tasks) == 2
+
+        await session.refresh(user)
+        assert user.hp == 65
+        assert user.total_failed == 2
+
+        statuses = (await session.execute(select(Task.status).order_by(Task.id))).scalars().all()
+        assert statuses == [TaskStatus.FAILED, TaskStatus.FAILED, TaskStatus.ACTIVE]
+
+    async def test_death_resets_and_deletes_active(self, session):
+        """Death resets character and deletes remaining active tasks."""
+        now = datetime(2025, 1, 1, 12, 0)
+        user = make_user(1, hp=40, level=3, max_hp=120)
+        session.add_all([
+            make_task(user, TaskDifficulty.EPIC, now - timedelta(minutes=5)),
+            make_task(user, TaskDifficulty.EASY, now + timedelta(hours=1)),
+        ])
+        await session.commit()
+
+        results = await fail_overdue_tasks(session, now)
+        await session.commit()
+
+        assert results[0].died is True
+        await session.refresh(user)
+        assert (user.level, user.xp, user.hp, user.max_hp) == (1, 0, 100, 100)
+        assert user.total_failed == 1
+
+        statuses = (await session.execute(select(Task.status).order_by(Task.id))).scalars().all()
+        assert statuses == [TaskStatus.FAILED, TaskStatus.DELETED]
+
+    async def test_restricted_to_task_ids(self, session):
+        """Only the given tasks are checked."""
+        now = datetime(2025, 1, 1, 12, 0)
+        user = make_user(1)
+        first = make_task(user, TaskDifficulty.EASY, now - timedelta(minutes=5))
+        second = make_task(user, TaskDifficulty.EASY, now - timedelta(minutes=5))
+        session.add_all([first, second])
+        await session.commit()
+
+        results = await fail_overdue_tasks(session, now, [second.id])
+
+        assert results[0].failed_tasks == [("easy task", 5)]
+
+    async def test_constant_query_count(self, session, query_counter):
+        """Sweep cost does not grow with the number of tasks."""
+        now = datetime(2025, 1, 1, 12, 0)
+        for telegram_id in range(1, 21):
+            user = make_user(telegram_id, hp=10 if telegram_id % 2 else 100)
+            session.add_all([
+                make_task(user, TaskDifficulty.MEDIUM, now - timedelta(minutes=i))
+                for i in range(1, 6)
+            ])
+        await session.commit()
+        query_counter.reset()
+
+        results = await fail_overdue_tasks(session, now)
+
+        assert len(results) == 20
+        assert query_counter.count == 4
+
+    async def test_nothing_due(self, session, query_counter):
+        """Empty sweep is a single statement."""
+        results = await fail_overdue_tasks(session, datetime(2025, 1, 1))
+
+        assert results == []
+        assert query_counter.count == 1
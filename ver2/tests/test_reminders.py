@@ -0,0 +1,121 @@
+"""Tests for the precomputed reminder schedule."""
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy import select
+from database.models import User, Task, TaskDifficulty, TaskStatus, OutboxMessage
+from database.task_repo import create_task
+from database.user_repo import get_cached_user
+from bot.handlers.settings import cmd_remind
+from bot.logic import notifications
+from bot.logic.reminders import user_horizons, parse_horizons, serialize_horizons, next_reminder_time
+
+NOW = datetime(2025, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def sweeps(monkeypatch, session_factory):
+    """Run the reminder sweep on the test database without waking the drainer."""
+    monkeypatch.setattr(notifications, "sweep_session", session_factory)
+    monkeypatch.setattr(notifications.outbox_drainer, "wake", lambda: None)
+
+
+class TestSchedule:
+    """Next reminder time and horizon settings."""
+
+    @pytest.mark.parametrize("left, expected", [
+        (timedelta(days=2), timedelta(days=1)),
+        (timedelta(hours=5), timedelta(hours=3)),
+        (timedelta(hours=2), timedelta(hours=1)),
+        (timedelta(minutes=30), timedelta(minutes=10)),
+        (timedelta(minutes=5), None),
+    ])
+    def test_next_reminder_time(self, left, expected):
+        """Remaining time until the deadline -> reminder at that distance from it."""
+        deadline = NOW + left
+        remind_at = next_reminder_time(deadline, (1440, 180, 60, 10), NOW)
+        assert remind_at == (None if expected is None else deadline - expected)
+
+    def test_user_horizons(self):
+        assert user_horizons(None) == (60,)
+        assert user_horizons("") == ()
+        assert user_horizons("10,1440,60") == (1440, 60, 10)
+        assert serialize_horizons((10, 1440)) == "1440,10"
+
+    @pytest.mark.parametrize("text, expected", [
+        ("24h 1h 10m", (1440, 60, 10)),
+        ("10m, 3h", (180, 10)),
+        ("1d 1ч 10мин", (1440, 60, 10)),
+        ("1h 1h", (60,)),
+        ("2h", None),
+        ("soon", None),
+        ("", None),
+    ])
+    def test_parse_horizons(self, text, expected):
+        assert parse_horizons(text) == expected
+
+    async def test_created_with_first_reminder(self, session):
+        user = User(telegram_id=1)
+        session.add(user)
+        await session.flush()
+        deadline = datetime.utcnow() + timedelta(hours=5)
+
+        far = await create_task(session, user.id, "far", TaskDifficulty.EASY, deadline, (1440, 180, 60))
+        near = await create_task(session, user.id, "near", TaskDifficulty.EASY, deadline, ())
+
+        assert far.next_remind_at == deadline - timedelta(hours=3)
+        assert near.next_remind_at is None
+
+
+class TestReminderSweep:
+    """Each horizon is reminded once, then the task moves on."""
+
+    async def test_advances_through_horizons(self, sweeps, session_factory):
+        now = datetime.utcnow()
+        deadline = now + timedelta(minutes=170)
+        async with session_factory() as session:
+            user = User(telegram_id=1, reminder_horizons="180,60")
+            session.add(Task(user=user, title="report", difficulty=TaskDifficulty.HARD, deadline=deadline,
+                             status=TaskStatus.ACTIVE, next_remind_at=deadline - timedelta(hours=3)))
+            await session.commit()
+
+        await notifications.check_upcoming_deadlines()
+        await notifications.check_upcoming_deadlines()
+
+        async with session_factory() as session:
+            remind_at = await session.scalar(select(Task.next_remind_at))
+            texts = (await session.execute(select(OutboxMessage.text))).scalars().all()
+        assert remind_at == deadline - timedelta(hours=1)
+        assert len(texts) == 1
+        assert "2 ч 50 мин" in texts[0]
+
+
+class TestRemindCommand:
+    """/remind changes the user's horizons and reschedules active tasks."""
+
+    async def test_set_and_reset(self, session_factory):
+        deadline = datetime.utcnow() + timedelta(hours=5)
+        async with session_factory() as session:
+            session.add(Task(user=User(telegram_id=1), title="task", difficulty=TaskDifficulty.EASY,
+                             deadline=deadline, status=TaskStatus.ACTIVE,
+                             next_remind_at=deadline - timedelta(hours=1)))
+            await session.commit()
+
+        message = MagicMock()
+        message.answer = AsyncMock()
+        for arg, stored, remind_before in (
+            ("3h 10m", "180,10", timedelta(hours=3)),
+            ("off", "", None),
+            ("default", None, timedelta(hours=1)),
+            ("2h", None, timedelta(hours=1)),
+        ):
+            async with session_factory() as session:
+                user = await get_cached_user(session, 1)
+                await cmd_remind(message, SimpleNamespace(args=arg), session, user)
+            async with session_factory() as session:
+                assert (await get_cached_user(session, 1)).reminder_horizons == stored
+                remind_at = await session.scalar(select(Task.next_remind_at))
+                assert remind_at == (None if remind_before is None else deadline - remind_before)
+
+        assert "❌" in message.answer.call_args.args[0]
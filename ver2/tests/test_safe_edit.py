@@ -0,0 +1,120 @@
+"""Tests for skipping edits that don't change the screen."""
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import EditMessageText
+from aiogram.types import Message
+from bot.safe_edit import RenderCache, safe_edit_text, render_cache
+from bot.keyboards import back_to_menu_keyboard, task_completed_keyboard
+
+
+EDITED = datetime(2025, 1, 1, 12, 0)
+
+
+def make_message(chat_id: int = 1, message_id: int = 10) -> MagicMock:
+    """Message whose edit_date moves on with every edit, like in Telegram."""
+    message = MagicMock()
+    message.chat.id = chat_id
+    message.message_id = message_id
+    message.edit_date = EDITED
+
+    async def edit_text(text, reply_markup=None):
+        message.edit_date += timedelta(seconds=1)
+        return Message.model_construct(edit_date=message.edit_date)
+
+    message.edit_text = AsyncMock(side_effect=edit_text)
+    return message
+
+
+def bad_request(text: str) -> TelegramBadRequest:
+    return TelegramBadRequest(method=EditMessageText(text="x"), message=text)
+
+
+class TestSafeEditText:
+    """Unchanged screens are answered without a Bot API call."""
+
+    async def test_repeated_edit_skipped(self):
+        message = make_message()
+        await safe_edit_text(message, "menu", back_to_menu_keyboard())
+        await safe_edit_text(message, "menu", back_to_menu_keyboard())
+
+        assert message.edit_text.await_count == 1
+        assert render_cache.stats()["skipped"] == 1
+
+    async def test_changed_text_or_markup_sent(self):
+        message = make_message()
+        await safe_edit_text(message, "menu", back_to_menu_keyboard())
+        await safe_edit_text(message, "menu", task_completed_keyboard())
+        await safe_edit_text(message, "stats", task_completed_keyboard())
+
+        assert message.edit_text.await_count == 3
+
+    async def test_messages_tracked_separately(self):
+        await safe_edit_text(make_message(message_id=10), "menu")
+        other = make_message(message_id=11)
+        await safe_edit_text(other, "menu")
+
+        other.edit_text.assert_awaited_once()
+
+    async def test_not_modified_remembered(self):
+        message = make_message()
+        message.edit_text.side_effect = bad_request("Bad Request: message is not modified")
+        await safe_edit_text(message, "menu")
+        await safe_edit_text(message, "menu")
+
+        assert message.edit_text.await_count == 1
+
+    async def test_failed_edit_forgotten(self):
+        message = make_message()
+        await safe_edit_text(message, "menu")
+        edit = message.edit_text.side_effect
+        message.edit_text.side_effect = bad_request("Bad Request: message to edit not found")
+        with pytest.raises(TelegramBadRequest):
+            await safe_edit_text(message, "stats")
+        message.edit_text.side_effect = edit
+
+        await safe_edit_text(message, "menu")
+
+        assert message.edit_text.await_count == 3
+
+    async def test_edit_by_another_process_sent(self):
+        """Menu here, character on another replica, then menu here again."""
+        message = make_message()
+        await safe_edit_text(message, "menu")
+        message.edit_date += timedelta(seconds=5)  # edited elsewhere
+
+        await safe_edit_text(message, "menu")
+
+        assert message.edit_text.await_count == 2
+
+    async def test_unedited_message_not_skipped(self):
+        """A message never edited has no version to compare."""
+        message = make_message()
+        message.edit_date = None
+        message.edit_text.side_effect = bad_request("Bad Request: message is not modified")
+        await safe_edit_text(message, "menu")
+        await safe_edit_text(message, "menu")
+
+        assert message.edit_text.await_count == 2
+
+
+class TestRenderCache:
+    """Bounded size and counters."""
+
+    def test_lru_eviction(self):
+        cache = RenderCache(max_size=2)
+        cache.put((1, 1), 1, EDITED)
+        cache.put((1, 2), 2, EDITED)
+        assert cache.is_current((1, 1), 1, EDITED)
+        cache.put((1, 3), 3, EDITED)
+
+        assert cache.is_current((1, 1), 1, EDITED)
+        assert not cache.is_current((1, 2), 2, EDITED)
+        assert cache.stats()["evictions"] == 1
+
+    def test_stats_reset(self):
+        cache = RenderCache()
+        cache.skipped = 3
+        assert cache.stats(reset=True)["skipped"] == 3
+        assert cache.stats()["skipped"] == 0
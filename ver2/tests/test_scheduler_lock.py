@@ -0,0 +1,105 @@
+"""Tests for the scheduler job lock."""
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from database.models import SchedulerLease
+from database.lease_repo import acquire_lease, release_lease
+from bot.logic.scheduler_lock import SchedulerLock, advisory_key
+
+
+def make_lock(session_factory, seconds: float = 60) -> SchedulerLock:
+    return SchedulerLock(mode="lease", lease=timedelta(seconds=seconds), session_factory=session_factory)
+
+
+class TestLeaseRepo:
+    """Lease takeover rules."""
+
+    async def test_held_until_expiry(self, session):
+        now = datetime(2025, 1, 1, 12, 0)
+        ttl = timedelta(minutes=1)
+
+        assert await acquire_lease(session, "sweep", "a", ttl, now)
+        assert not await acquire_lease(session, "sweep", "b", ttl, now + timedelta(seconds=30))
+        assert await acquire_lease(session, "sweep", "a", ttl, now + timedelta(seconds=30))
+        assert await acquire_lease(session, "sweep", "b", ttl, now + timedelta(minutes=2))
+
+    async def test_release_only_own(self, session):
+        ttl = timedelta(minutes=1)
+        await acquire_lease(session, "sweep", "a", ttl)
+
+        await release_lease(session, "sweep", "b")
+        assert not await acquire_lease(session, "sweep", "b", ttl)
+
+        await release_lease(session, "sweep", "a")
+        assert await acquire_lease(session, "sweep", "b", ttl)
+
+
+class TestSchedulerLock:
+    """One run per job name across processes and within one."""
+
+    async def test_other_process_skips(self, session_factory):
+        first, second = make_lock(session_factory), make_lock(session_factory)
+        started, finish = asyncio.Event(), asyncio.Event()
+        ran = []
+
+        async def slow_job():
+            started.set()
+            await finish.wait()
+            ran.append("first")
+
+        async def job():
+            ran.append("second")
+
+        running = asyncio.create_task(first.run("sweep", slow_job))
+        await started.wait()
+        assert await second.run("sweep", job) is False
+        assert await second.run("other", job) is True
+        finish.set()
+        assert await running is True
+
+        assert await second.run("sweep", job) is True
+        assert ran == ["second", "first", "second"]
+        assert second.skipped == 1
+
+        async with session_factory() as session:
+            assert await session.scalar(select(func.count()).select_from(SchedulerLease)) == 0
+
+    async def test_overlapping_run_skipped(self, session_factory):
+        lock = make_lock(session_factory)
+        finish = asyncio.Event()
+
+        guarded = lock.guard("sweep", finish.wait)
+        running = asyncio.create_task(guarded())
+        await asyncio.sleep(0.05)
+
+        assert await lock.run("sweep", finish.wait) is False
+        finish.set()
+        await running
+        assert lock.skipped == 1
+
+    async def test_lease_renewed_while_running(self, session_factory):
+        lock, other = make_lock(session_factory, seconds=0.15), make_lock(session_factory)
+
+        async def long_job():
+            await asyncio.sleep(0.3)
+            assert await other.run("sweep", asyncio.sleep, 0) is False
+
+        assert await lock.run("sweep", long_job) is True
+
+    async def test_failed_job_releases(self, session_factory):
+        lock = make_lock(session_factory)
+
+        async def broken():
+            raise RuntimeError("boom")
+
+        try:
+            await lock.run("sweep", broken)
+        except RuntimeError:
+            pass
+        assert await make_lock(session_factory).run("sweep", asyncio.sleep, 0) is True
+
+    def test_advisory_key(self):
+        key = advisory_key("check_deadlines")
+        assert key == advisory_key("check_deadlines")
+        assert key != advisory_key("check_upcoming_deadlines")
+        assert -2**63 <= key < 2**63
@@ -0,0 +1,150 @@
+"""Query-count tests for the most frequently hit screens."""
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from database.models import User, TaskDifficulty
+from database.task_repo import create_task, fail_overdue_tasks, get_active_tasks_page, get_task_by_id
+from bot.handlers import menu, start, task_list
+from bot.middlewares import DbSessionMiddleware
+from bot.callbacks import Op, encode_callback, route_callback
+
+
+def make_callback(telegram_id: int) -> MagicMock:
+    callback = MagicMock()
+    callback.from_user.id = telegram_id
+    callback.message.edit_text = AsyncMock()
+    callback.answer = AsyncMock()
+    return callback
+
+
+async def run_handler(session_factory, handler, event, telegram_id: int, resolve_user: bool = True):
+    """Run a handler through the session middleware like the dispatcher does."""
+    async def call(event, data):
+        kwargs = {"session": data["session"]}
+        if resolve_user:
+            kwargs["user"] = data["user"]
+        if "nearest_deadline" in data:
+            kwargs["nearest_deadline"] = data["nearest_deadline"]
+        return await handler(event, **kwargs)
+
+    data = {"event_from_user": SimpleNamespace(id=telegram_id)}
+    if not resolve_user:
+        data["handler"] = SimpleNamespace(flags={"resolve_user": False})
+    return await DbSessionMiddleware(session_factory)(call, event, data)
+
+
+@pytest.fixture
+async def seeded(session_factory):
+    """Existing user with a few active tasks."""
+    async with session_factory() as session:
+        user = User(telegram_id=42, username="player", level=2, xp=30, hp=80, max_hp=110,
+                    total_completed=3, total_failed=1, max_level_reached=2)
+        session.add(user)
+        await session.commit()
+        for hours in (5, 2, 9):
+            await create_task(session, user.id, f"task {hours}", TaskDifficulty.EASY,
+                              datetime.utcnow() + timedelta(hours=hours))
+        await session.commit()
+    return user
+
+
+class TestScreenQueryCount:
+    """Menu, character and /start cost a single query."""
+
+    async def test_menu(self, seeded, session_factory, query_counter):
+        callback = make_callback(42)
+        await run_handler(session_factory, menu.callback_menu, callback, 42)
+
+        assert query_counter.count == 1
+        assert "(3)" in str(callback.message.edit_text.call_args)
+
+    async def test_menu_cached(self, seeded, session_factory, query_counter):
+        """Repeated menu is served from the user cache."""
+        await run_handler(session_factory, menu.callback_menu, make_callback(42), 42)
+        query_counter.reset()
+        callback = make_callback(42)
+        await run_handler(session_factory, menu.callback_menu, callback, 42)
+
+        assert query_counter.count == 0
+        assert "(3)" in str(callback.message.edit_text.call_args)
+
+    async def test_character(self, seeded, session_factory, query_counter):
+        """Cold cache: user and nearest deadline come in one statement."""
+        callback = make_callback(42)
+        callback.data = encode_callback(Op.CHARACTER)
+        await run_handler(session_factory, route_callback, callback, 42)
+
+        assert query_counter.count == 1
+        text = callback.message.edit_text.call_args.args[0]
+        assert "Активных задач: 3" in text
+        assert "Ближайший дедлайн: —" not in text
+
+    async def test_character_cached(self, seeded, session_factory, query_counter):
+        """Cached user: only the nearest deadline is queried."""
+        await run_handler(session_factory, menu.callback_menu, make_callback(42), 42)
+        query_counter.reset()
+        callback = make_callback(42)
+        callback.data = encode_callback(Op.CHARACTER)
+        await run_handler(session_factory, route_callback, callback, 42)
+
+        assert query_counter.count == 1
+        assert "Ближайший дедлайн: —" not in callback.message.edit_text.call_args.args[0]
+
+    async def test_start_existing_user(self, seeded, session_factory, query_counter):
+        message = MagicMock()
+        message.from_user.id = 42
+        message.from_user.username = "player"
+        message.answer = AsyncMock()
+        await run_handler(session_factory, start.cmd_start, message, 42, resolve_user=False)
+
+        assert query_counter.count == 1
+
+
+class TestDbSessionMiddleware:
+    """One session per update, shared by chained handlers."""
+
+    async def test_unknown_user_gets_start_hint(self, session_factory):
+        callback = make_callback(7)
+        handler = AsyncMock()
+        await DbSessionMiddleware(session_factory)(handler, callback, {"event_from_user": SimpleNamespace(id=7)})
+
+        handler.assert_not_called()
+        assert "/start" in callback.answer.call_args.args[0]
+
+    async def test_delete_reuses_session(self, seeded, session_factory, query_counter):
+        """Deleting chains into the task list without another user lookup."""
+        async with session_factory() as session:
+            task = (await get_active_tasks_page(session, seeded.id)).tasks[0]
+        await run_handler(session_factory, menu.callback_menu, make_callback(42), 42)
+        query_counter.reset()
+        callback = make_callback(42)
+        callback.data = encode_callback(Op.TASK_DELETE, task.id)
+
+        await run_handler(session_factory, route_callback, callback, 42)
+
+        # load task, update counter, update status, list remaining tasks
+        assert query_counter.count == 4
+        assert "(2)" in callback.message.edit_text.call_args.args[0]
+        async with session_factory() as session:
+            assert await get_task_by_id(session, task.id) is None
+
+    async def test_delete_failed_keeps_count(self, seeded, session_factory):
+        """Deleting a failed task leaves the counter on a paged list header."""
+        now = datetime.utcnow()
+        async with session_factory() as session:
+            for day in range(1, 8):
+                await create_task(session, seeded.id, f"later {day}", TaskDifficulty.EASY,
+                                  now + timedelta(days=day))
+            task = await create_task(session, seeded.id, "overdue", TaskDifficulty.EASY,
+                                     now + timedelta(minutes=1))
+            await session.commit()
+            await fail_overdue_tasks(session, now + timedelta(minutes=2))
+            await session.commit()
+        await run_handler(session_factory, menu.callback_menu, make_callback(42), 42)
+        callback = make_callback(42)
+        callback.data = encode_callback(Op.TASK_DELETE, task.id)
+
+        await run_handler(session_factory, route_callback, callback, 42)
+
+        assert "(10)" in callback.message.edit_text.call_args.args[0]
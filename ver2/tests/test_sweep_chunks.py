@@ -0,0 +1,85 @@
+"""Tests for chunked overdue and reminder sweeps."""
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from database.models import User, Task, TaskDifficulty, TaskStatus, OutboxMessage
+from database.task_repo import get_overdue_tasks, get_tasks_for_reminder
+from bot.logic import notifications, tasks
+
+
+@pytest.fixture
+def sweeps(monkeypatch, session_factory):
+    """Sweeps on the test database in chunks of 2, without waking the drainer."""
+    for module in (notifications, tasks):
+        monkeypatch.setattr(module, "sweep_session", session_factory)
+        monkeypatch.setattr(module, "SWEEP_CHUNK_SIZE", 2)
+        monkeypatch.setattr(module.outbox_drainer, "wake", lambda: None)
+
+
+async def seed(session_factory, offsets: list[timedelta]) -> datetime:
+    """One user per task so no digests are formed, returns the seed time."""
+    now = datetime.utcnow().replace(microsecond=0)
+    async with session_factory() as session:
+        for i, offset in enumerate(offsets):
+            user = User(telegram_id=i + 1, active_task_count=1, digest_threshold=0)
+            session.add(Task(user=user, title=f"task {i}", difficulty=TaskDifficulty.EASY,
+                             deadline=now + offset, status=TaskStatus.ACTIVE,
+                             next_remind_at=now + offset - timedelta(hours=1)))
+        await session.commit()
+    return now
+
+
+class TestKeyset:
+    """Chunks follow the keyset order and never repeat or skip a task."""
+
+    async def test_overdue_chunks(self, session_factory):
+        # Equal deadlines straddle a chunk boundary
+        now = await seed(session_factory, [timedelta(minutes=-m) for m in (5, 3, 3, 3, 1)])
+
+        seen = []
+        after = None
+        async with session_factory() as session:
+            while keys := await get_overdue_tasks(session, now, after, 2):
+                seen.extend(task_id for _, task_id in keys)
+                after = keys[-1]
+
+        assert sorted(seen) == [1, 2, 3, 4, 5]
+        assert seen[0] == 1
+
+    async def test_reminder_chunks(self, session_factory):
+        now = await seed(session_factory, [timedelta(minutes=m) for m in (30, 10, 10, 20, 90)])
+
+        seen = []
+        after = None
+        async with session_factory() as session:
+            while rows := await get_tasks_for_reminder(session, now, after, 2):
+                seen.extend(row.id for row in rows)
+                after = (rows[-1].next_remind_at, rows[-1].id)
+
+        assert seen == [2, 3, 4, 1]
+
+
+class TestChunkedSweeps:
+    """Whole backlog is processed, one transaction per chunk."""
+
+    async def test_check_deadlines(self, sweeps, session_factory):
+        await seed(session_factory, [timedelta(minutes=-m) for m in range(1, 6)])
+
+        await tasks.check_deadlines()
+
+        async with session_factory() as session:
+            statuses = (await session.execute(select(Task.status))).scalars().all()
+            messages = await session.scalar(select(func.count()).select_from(OutboxMessage))
+        assert statuses == [TaskStatus.FAILED] * 5
+        assert messages == 5
+
+    async def test_check_upcoming_deadlines(self, sweeps, session_factory):
+        await seed(session_factory, [timedelta(minutes=m) for m in range(10, 60, 10)])
+
+        await notifications.check_upcoming_deadlines()
+
+        async with session_factory() as session:
+            pending = (await session.execute(select(Task.next_remind_at))).scalars().all()
+            chats = (await session.execute(select(OutboxMessage.chat_id))).scalars().all()
+        assert pending == [None] * 5
+        assert sorted(chats) == [1, 2, 3, 4, 5]
@@ -0,0 +1,96 @@
+"""Tests for keyset-paginated task lists."""
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from database.models import User, Task, TaskDifficulty, TaskStatus
+from database.task_repo import (
+    create_task, delete_task, get_active_tasks_page, get_failed_tasks_page, PageCursor
+)
+from bot.keyboards import task_list_keyboard
+
+BASE = datetime.utcnow() + timedelta(days=1)
+
+
+@pytest.fixture
+async def tasks(session):
+    """User with 7 active and 5 failed tasks, some sharing a deadline."""
+    user = User(telegram_id=42, username="player")
+    session.add(user)
+    await session.flush()
+    active = []
+    for i in range(7):
+        task = await create_task(session, user.id, f"active {i}", TaskDifficulty.EASY, BASE + timedelta(hours=i // 2))
+        active.append(task.id)
+    failed = []
+    for i in range(5):
+        task = await create_task(session, user.id, f"failed {i}", TaskDifficulty.EASY, BASE - timedelta(days=2, hours=i // 2))
+        failed.append(task.id)
+    await session.execute(update(Task).where(Task.id.in_(failed)).values(status=TaskStatus.FAILED))
+    await session.commit()
+    return user.id, active, failed
+
+
+def ids(page) -> list[int]:
+    return [task.id for task in page.tasks]
+
+
+class TestTaskPages:
+    """Walking pages forward and back visits every task once, in order."""
+
+    async def test_forward_and_back(self, session, tasks):
+        user_id, active, _ = tasks
+        pages = [await get_active_tasks_page(session, user_id, limit=3)]
+        while pages[-1].has_next:
+            pages.append(await get_active_tasks_page(session, user_id, pages[-1].next_cursor, limit=3))
+
+        assert [ids(page) for page in pages] == [active[0:3], active[3:6], active[6:7]]
+        assert [(p.has_prev, p.has_next) for p in pages] == [(False, True), (True, True), (True, False)]
+
+        back = await get_active_tasks_page(session, user_id, pages[2].prev_cursor, limit=3)
+        assert ids(back) == active[3:6]
+        assert (back.has_prev, back.has_next) == (True, True)
+        first = await get_active_tasks_page(session, user_id, back.prev_cursor, limit=3)
+        assert ids(first) == active[0:3]
+        assert (first.has_prev, first.has_next) == (False, True)
+
+    async def test_failed_most_recent_first(self, session, tasks):
+        user_id, _, failed = tasks
+        first = await get_failed_tasks_page(session, user_id, limit=3)
+        second = await get_failed_tasks_page(session, user_id, first.next_cursor, limit=3)
+
+        # Deadlines go back in time, ties broken by ID descending
+        assert ids(first) + ids(second) == [failed[1], failed[0], failed[3], failed[2], failed[4]]
+        assert not second.has_next
+
+    async def test_only_rendered_columns(self, session, tasks):
+        user_id, _, _ = tasks
+        page = await get_active_tasks_page(session, user_id, limit=1)
+
+        assert set(vars(page.tasks[0])) == {"id", "title", "deadline"}
+
+    async def test_cursor_past_deleted_tasks(self, session, tasks):
+        """A stale "next" button whose tasks are gone shows the first page."""
+        user_id, active, _ = tasks
+        page = await get_active_tasks_page(session, user_id, PageCursor(BASE + timedelta(hours=3), active[5], True), limit=3)
+        assert ids(page) == active[6:7]
+        await delete_task(session, active[6], user_id)
+
+        page = await get_active_tasks_page(session, user_id, PageCursor(BASE + timedelta(hours=3), active[5], True), limit=3)
+        assert ids(page) == active[0:3]
+
+
+class TestTaskListKeyboard:
+    """Navigation row only when there are other pages."""
+
+    async def test_navigation_buttons(self, session, tasks):
+        user_id, _, _ = tasks
+        first = await get_active_tasks_page(session, user_id, limit=3)
+        middle = await get_active_tasks_page(session, user_id, first.next_cursor, limit=3)
+        single = await get_active_tasks_page(session, user_id, limit=10)
+
+        def nav_texts(page):
+            return [button.text for button in task_list_keyboard(page).inline_keyboard[len(page.tasks)]]
+
+        assert nav_texts(first) == ["Далее ➡️"]
+        assert nav_texts(middle) == ["⬅️ Назад", "Далее ➡️"]
+        assert nav_texts(single) == ["⛔ Просроченные"]
@@ -0,0 +1,139 @@
+"""Tests for the read-through user cache."""
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from database.models import User, TaskDifficulty
+from database.task_repo import create_task, fail_overdue_tasks
+from database.user_cache import UserCache, user_cache
+from database.user_repo import get_cached_user
+from bot.logic.cache_sync import UserCacheSync
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_user(telegram_id: int, user_id: int = None, **stats) -> User:
+    """User with default stats, user_id defaults to telegram_id."""
+    values = dict(level=1, xp=0, hp=100, max_hp=100, total_completed=0, total_failed=0,
+                  max_level_reached=1, active_task_count=0, created_at=datetime(2025, 1, 1))
+    values.update(stats)
+    return User(id=user_id or telegram_id, telegram_id=telegram_id, **values)
+
+
+class TestUserCache:
+    """Tests for LRU and TTL bookkeeping."""
+
+    def test_hit_and_miss(self):
+        cache = UserCache(max_size=10, ttl=60)
+        assert cache.get(1) is None
+        cache.put(make_user(1))
+
+        assert cache.get(1).telegram_id == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_stats_reset(self):
+        cache = UserCache(max_size=10, ttl=60)
+        cache.put(make_user(1))
+        cache.get(1)
+        cache.get(2)
+
+        assert cache.stats(reset=True)["hit_rate"] == 0.5
+        stats = cache.stats()
+        assert stats["hits"] == stats["misses"] == 0
+        assert stats["size"] == 1
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = UserCache(max_size=10, ttl=60, clock=clock)
+        cache.put(make_user(1))
+        clock.now = 61
+
+        assert cache.get(1) is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        cache = UserCache(max_size=2, ttl=60)
+        cache.put(make_user(1))
+        cache.put(make_user(2))
+        cache.get(1)
+        cache.put(make_user(3))
+
+        assert cache.get(2) is None
+        assert cache.get(1) is not None
+        assert cache.evictions == 1
+
+    def test_invalidate_by_user_id(self):
+        cache = UserCache(max_size=10, ttl=60)
+        cache.put(make_user(100, user_id=5))
+        cache.invalidate_user_ids([5])
+
+        assert cache.get(100) is None
+
+
+class TestCacheInvalidation:
+    """Writes are visible on the next cached read."""
+
+    @staticmethod
+    async def cached_read(session_factory, telegram_id: int):
+        """Read in a fresh session, like a handler does."""
+        async with session_factory() as session:
+            return await get_cached_user(session, telegram_id)
+
+    async def test_task_creation_updates_count(self, session, session_factory):
+        user = make_user(42)
+        session.add(user)
+        await session.commit()
+        assert (await self.cached_read(session_factory, 42)).active_task_count == 0
+
+        await create_task(session, user.id, "task", TaskDifficulty.EASY, datetime.utcnow() + timedelta(hours=1))
+        await session.commit()
+
+        assert (await self.cached_read(session_factory, 42)).active_task_count == 1
+
+    async def test_overdue_sweep_invalidates(self, session, session_factory):
+        user = make_user(42)
+        session.add(user)
+        await session.commit()
+        await create_task(session, user.id, "late", TaskDifficulty.HARD, datetime.utcnow() - timedelta(minutes=1))
+        await session.commit()
+        await self.cached_read(session_factory, 42)
+
+        await fail_overdue_tasks(session)
+        await session.commit()
+
+        assert (await self.cached_read(session_factory, 42)).hp == 70
+
+
+class TestUserCacheSync:
+    """Writes of another process reach this process's cache."""
+
+    async def test_sweep_in_other_process(self, session, session_factory):
+        """The scheduler role damages a user the bot process has cached."""
+        session.add_all([make_user(telegram_id, changed_at=datetime(2025, 1, 1)) for telegram_id in (42, 43)])
+        await session.commit()
+        await create_task(session, 42, "late", TaskDifficulty.HARD, datetime.utcnow() - timedelta(minutes=1))
+        await session.execute(update(User).values(changed_at=datetime(2025, 1, 1)))
+        await session.commit()
+        bot_cache = UserCache(max_size=10, ttl=60)
+        sync = UserCacheSync(session_factory=session_factory, cache=bot_cache, lag=timedelta(seconds=10))
+        for telegram_id in (42, 43):
+            bot_cache.put(await session.get(User, telegram_id, populate_existing=True))
+
+        await fail_overdue_tasks(session)
+        await session.commit()
+        assert bot_cache.get(42).hp == 100
+
+        await sync.sync()
+
+        assert bot_cache.get(42) is None
+        assert bot_cache.get(43) is not None
+
+    async def test_empty_cache_skips_query(self, session_factory, query_counter):
+        sync = UserCacheSync(session_factory=session_factory, cache=UserCache())
+        assert await sync.sync() == 0
+        assert query_counter.count == 0
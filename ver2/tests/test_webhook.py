@@ -0,0 +1,95 @@
+"""Tests for webhook ingestion."""
+import asyncio
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+from bot.webhook import WebhookHandler, create_webhook_app, SECRET_HEADER
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1, "date": 1735725600, "text": "hello",
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "Test"}
+    }
+}
+
+
+@pytest.fixture
+def bot():
+    return Bot(token="42:TEST")
+
+
+async def make_client(handler: WebhookHandler) -> TestClient:
+    client = TestClient(TestServer(create_webhook_app(handler, "/webhook")))
+    await client.start_server()
+    return client
+
+
+class TestWebhookHandler:
+    """Secret check, dispatch and concurrency limit."""
+
+    async def test_rejects_wrong_secret(self, bot):
+        handler = WebhookHandler(Dispatcher(), bot, secret_token="s3cret")
+        client = await make_client(handler)
+        try:
+            response = await client.post("/webhook", json=UPDATE, headers={SECRET_HEADER: "wrong"})
+            missing = await client.post("/webhook", json=UPDATE)
+        finally:
+            await client.close()
+
+        assert response.status == 401
+        assert missing.status == 401
+        assert handler.received == 0
+
+    async def test_feeds_dispatcher(self, bot):
+        dp = Dispatcher()
+        received = asyncio.Queue()
+
+        @dp.message()
+        async def on_message(message: Message):
+            await received.put(message.text)
+
+        handler = WebhookHandler(dp, bot, secret_token="s3cret")
+        client = await make_client(handler)
+        try:
+            response = await client.post("/webhook", json=UPDATE, headers={SECRET_HEADER: "s3cret"})
+            assert response.status == 200
+            assert await asyncio.wait_for(received.get(), 2) == "hello"
+        finally:
+            await client.close()
+
+    async def test_concurrency_limit(self, bot):
+        dp = Dispatcher()
+        release = asyncio.Event()
+        running = 0
+        peak = 0
+
+        @dp.message()
+        async def on_message(message: Message):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await release.wait()
+            running -= 1
+
+        handler = WebhookHandler(dp, bot, max_concurrency=2)
+        client = await make_client(handler)
+        try:
+            posts = [
+                asyncio.create_task(client.post("/webhook", json={**UPDATE, "update_id": i}))
+                for i in range(5)
+            ]
+            await asyncio.sleep(0.2)
+            assert peak == 2
+            assert sum(post.done() for post in posts) == 2
+
+            release.set()
+            await asyncio.gather(*posts)
+            await handler.drain()
+        finally:
+            await client.close()
+
+        assert handler.received == 5
+        assert peak == 2